@@ -0,0 +1,286 @@
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from signalpy_metapodatkovna_baza import (  # noqa: E402
+    db2crux,
+    db2log,
+    synthetic,
+    templates,
+)
+from utils import transformations  # noqa: E402
+
+GRA_FILE = os.path.join(ROOT, "data", "antenna.gra")
+
+
+def measure(f, number: int, repeat: int) -> dict:
+    # seconds per call; min is the least noisy estimate, median shows the spread
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            f()
+        times.append((time.perf_counter() - start) / number)
+
+    return {
+        "number": number,
+        "repeat": repeat,
+        "min": min(times),
+        "median": statistics.median(times),
+    }
+
+
+def get_benchmarks(work_dir: str, stations: int, history: int) -> list:
+    snapshot_file = os.path.join(work_dir, "synthetic.sqlite")
+    synthetic.make_snapshot(snapshot_file, stations, history, gra_file=GRA_FILE)
+
+    # make_log_file reads antenna.gra from the working directory
+    shutil.copy(GRA_FILE, os.path.join(work_dir, "antenna.gra"))
+
+    nine_char_id = synthetic.get_nine_char_id(1)
+
+    # both overwrite the output of the previous call, as a scheduled export does
+    def make_log_file():
+        db2log.make_log_file(
+            nine_char_id, save_dir=work_dir, snapshot_file=snapshot_file
+        )
+
+    def get_crux_file():
+        db2crux.get_crux_file(save_dir=work_dir, snapshot_file=snapshot_file)
+
+    names = list(db2log.read_antenna_gra(GRA_FILE))
+    hits = random.Random(0).sample(names, min(1000, len(names)))
+    misses = [f"{name[:15]}X{i}" for i, name in enumerate(hits)]
+
+    def antenna_graphic_hits():
+        for name in hits:
+            db2log.get_antenna_graphic(name, GRA_FILE)
+
+    def antenna_graphic_misses():
+        for name in misses:
+            db2log.get_antenna_graphic(name, GRA_FILE)
+
+    def read_antenna_gra():
+        db2log.read_antenna_gra.cache_clear()
+        db2log.read_antenna_gra(GRA_FILE)
+
+    long_text = "\n".join([synthetic.ADDITIONAL_INFO * 20] * 20)
+
+    def format_multiple_lines():
+        templates.format_multiple_lines(long_text)
+
+    rng = random.Random(0)
+    points = [
+        (
+            rng.uniform(-6.4e6, 6.4e6),
+            rng.uniform(-6.4e6, 6.4e6),
+            rng.uniform(-6.4e6, 6.4e6),
+        )
+        for _ in range(100000)
+    ]
+
+    def ecef2geodetic():
+        for x, y, z in points:
+            transformations.ecef2geodetic(x, y, z)
+
+    # name, function, calls per repetition
+    return [
+        ("make_log_file", make_log_file, 20),
+        (f"get_crux_file[{stations}]", get_crux_file, 5),
+        ("get_antenna_graphic[1000 hits]", antenna_graphic_hits, 10),
+        ("get_antenna_graphic[1000 misses]", antenna_graphic_misses, 10),
+        ("read_antenna_gra", read_antenna_gra, 5),
+        ("format_multiple_lines[400 lines]", format_multiple_lines, 20),
+        ("ecef2geodetic[1e5 points]", ecef2geodetic, 1),
+    ]
+
+
+def run(stations: int, history: int, repeat: int, name_filter: str = None) -> dict:
+    results = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.chdir(work_dir)
+        try:
+            for name, f, number in get_benchmarks(work_dir, stations, history):
+                if name_filter and name_filter not in name:
+                    continue
+
+                # the exporters print a line per file
+                with contextlib.redirect_stdout(io.StringIO()):
+                    f()  # warm-up
+                    results[name] = measure(f, number, repeat)
+                print(f"{name:<36} {results[name]['min'] * 1000:12.3f} ms")
+        finally:
+            os.chdir(cwd)
+
+    return {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.node(),
+        "stations": stations,
+        "history": history,
+        "results": results,
+    }
+
+
+def scaling(sizes: list, history: int) -> None:
+    # per-station cost should stay flat as the network grows
+    print(
+        f"{'stations':>10} {'get_crux_file s':>16} {'ms/station':>11} {'make_log_file ms':>17}"
+    )
+    cwd = os.getcwd()
+    for stations in sizes:
+        with tempfile.TemporaryDirectory() as work_dir:
+            os.chdir(work_dir)
+            try:
+                benchmarks = {
+                    name: f
+                    for name, f, _ in get_benchmarks(work_dir, stations, history)
+                }
+                with contextlib.redirect_stdout(io.StringIO()):
+                    crux = measure(benchmarks[f"get_crux_file[{stations}]"], 1, 1)
+                    log = measure(benchmarks["make_log_file"], 5, 1)
+            finally:
+                os.chdir(cwd)
+
+        print(
+            f"{stations:>10} {crux['min']:16.3f} {crux['min'] / stations * 1000:11.3f} {log['min'] * 1000:17.3f}"
+        )
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> str:
+    lines = [
+        f"baseline: {baseline['date']} ({baseline['machine']}, Python {baseline['python']})",
+        f"{'benchmark':<36} {'baseline ms':>12} {'current ms':>12} {'ratio':>8}",
+    ]
+    for name, result in current["results"].items():
+        if name not in baseline["results"]:
+            lines.append(f"{name:<36} {'-':>12} {result['min'] * 1000:12.3f}")
+            continue
+
+        base = baseline["results"][name]["min"]
+        ratio = result["min"] / base
+        flag = (
+            "  slower"
+            if ratio > 1 + threshold
+            else "  faster"
+            if ratio < 1 - threshold
+            else ""
+        )
+        lines.append(
+            f"{name:<36} {base * 1000:12.3f} {result['min'] * 1000:12.3f} {ratio:8.2f}{flag}"
+        )
+
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+
+    arg_parser.add_argument(
+        "-b",
+        "--baseline",
+        help="Baseline results to compare against.",
+        type=str,
+        default=os.path.join(ROOT, "bench", "baseline.json"),
+    )
+
+    arg_parser.add_argument(
+        "--save",
+        help="Store this run as the new baseline instead of comparing.",
+        action="store_true",
+    )
+
+    arg_parser.add_argument(
+        "-o",
+        "--out",
+        help="Also write the results of this run to this JSON file.",
+        type=str,
+        default=None,
+    )
+
+    arg_parser.add_argument(
+        "-n",
+        "--stations",
+        help="Number of stations in the synthetic database.",
+        type=int,
+        default=50,
+    )
+
+    arg_parser.add_argument(
+        "-H",
+        "--history",
+        help="Receiver and antenna history entries per synthetic station.",
+        type=int,
+        default=5,
+    )
+
+    arg_parser.add_argument(
+        "--scale",
+        help="Instead of the benchmarks, time the exports for these comma separated network sizes (e.g. 100,1000,10000).",
+        type=str,
+        default=None,
+    )
+
+    arg_parser.add_argument(
+        "-r", "--repeat", help="Repetitions per benchmark.", type=int, default=5
+    )
+
+    arg_parser.add_argument(
+        "-k",
+        "--filter",
+        help="Only run benchmarks whose name contains this string.",
+        type=str,
+        default=None,
+    )
+
+    arg_parser.add_argument(
+        "-t",
+        "--threshold",
+        help="Relative change reported as slower/faster.",
+        type=float,
+        default=0.10,
+    )
+
+    input_arguments = arg_parser.parse_args()
+
+    if input_arguments.scale:
+        scaling(
+            [int(n) for n in input_arguments.scale.split(",")], input_arguments.history
+        )
+        sys.exit(0)
+
+    current = run(
+        input_arguments.stations,
+        input_arguments.history,
+        input_arguments.repeat,
+        input_arguments.filter,
+    )
+
+    if input_arguments.out:
+        with open(input_arguments.out, "w", encoding="UTF-8") as f:
+            json.dump(current, f, indent=2)
+
+    if input_arguments.save:
+        with open(input_arguments.baseline, "w", encoding="UTF-8") as f:
+            json.dump(current, f, indent=2)
+        print(f"Baseline {input_arguments.baseline} saved.")
+    elif os.path.exists(input_arguments.baseline):
+        with open(input_arguments.baseline, "r", encoding="UTF-8") as f:
+            print()
+            print(compare(current, json.load(f), input_arguments.threshold))
+    else:
+        print(f"No baseline {input_arguments.baseline}. Run with --save to create it.")
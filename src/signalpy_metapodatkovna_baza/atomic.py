@@ -0,0 +1,123 @@
+import hashlib
+import os
+
+from signalpy_metapodatkovna_baza import compressed
+
+# what to do when the target file exists; if-changed leaves files with identical content untouched
+OVERWRITE = ("always", "never", "if-changed")
+
+
+def get_file_hash(file_path: str) -> str:
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+
+    return h.hexdigest()
+
+
+def fsync(path: str) -> None:
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        # directories cannot be opened on Windows; the rename is durable there anyway
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def keep_existing(file_path: str, overwrite: str = "always") -> bool:
+    # checked before rendering, so a file that is kept is not rendered at all
+    return overwrite == "never" and os.path.exists(file_path)
+
+
+class AtomicWriter(object):
+    # written next to the target, fsynced and renamed over it, so readers never see a partial file
+    def __init__(
+        self,
+        file_path: str,
+        overwrite: str = "always",
+        compression: str = None,
+        background=False,
+        count=False,
+    ):
+        self.file_path = file_path
+        self.tmp_path = f"{file_path}.{os.getpid()}.tmp"
+        self.overwrite = overwrite
+        self.compression = compression
+        self.background = background
+        self.count = count
+        self.raw = None
+        self.f = None
+        self.written = False
+
+    @property
+    def bytes_written(self):
+        # with count, bytes written to the file after compression, otherwise None
+        return self.raw.bytes_written if self.count else None
+
+    def open(self):
+        self.raw = (
+            compressed.CountingFile(self.tmp_path)
+            if self.count
+            else open(self.tmp_path, "wb")
+        )
+        try:
+            self.f = compressed.open_compressed(
+                self.raw, self.compression, self.background
+            )
+        except BaseException:
+            # e.g. zstandard not installed; no temporary file is left behind
+            self.raw.close()
+            os.remove(self.tmp_path)
+            raise
+        return self.f
+
+    def close(self, discard=False) -> bool:
+        # returns whether the target was replaced
+        self.f.close()
+
+        if discard or (
+            self.overwrite != "always"
+            and os.path.exists(self.file_path)
+            and (
+                self.overwrite == "never"
+                or get_file_hash(self.tmp_path) == get_file_hash(self.file_path)
+            )
+        ):
+            os.remove(self.tmp_path)
+            return False
+
+        fsync(self.tmp_path)
+        os.replace(self.tmp_path, self.file_path)
+        fsync(os.path.dirname(os.path.abspath(self.file_path)))
+        self.written = True
+
+        return True
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close(discard=exc_type is not None)
+
+
+def write_file(file_path: str, text: str, overwrite: str = "always") -> bool:
+    # returns whether the file was written
+    content = text.encode("UTF-8")
+    if os.path.exists(file_path) and (
+        overwrite == "never"
+        or overwrite == "if-changed"
+        and get_file_hash(file_path) == hashlib.sha256(content).hexdigest()
+    ):
+        return False
+
+    writer = AtomicWriter(file_path)
+    with writer as f:
+        f.write(content)
+
+    return writer.written
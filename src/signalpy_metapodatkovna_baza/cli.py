@@ -0,0 +1,79 @@
+import argparse
+import runpy
+import sys
+
+# subcommand -> (module run as a script, description); a module is only imported when its command runs
+COMMANDS = {
+    "log": ("db2log", "Write the site log of one station."),
+    "crux": ("db2crux", "Write the crux file of the network, whole or in shards."),
+    "export": ("export", "Write site logs, crux and log archives in one pass."),
+    "geodesyml": ("geodesyml", "Write GeodesyML site logs."),
+    "sinex": ("sinex", "Write the SINEX site blocks of the network."),
+    "stationinfo": ("stationinfo", "Write Bernese .STA and GAMIT station.info files."),
+    "parquet": ("parquet", "Write station metadata to Parquet files."),
+    "publish": ("publish", "Upload changed output files to an FTP/SFTP directory."),
+    "intervals": ("intervals", "Print the equipment of one station at an epoch."),
+    "snapshot": ("snapshot", "Copy the station tables to a local SQLite snapshot."),
+    "synthetic": (
+        "synthetic",
+        "Fill the database or a snapshot with synthetic stations.",
+    ),
+    "ingest": ("ingest", "Import a directory of site logs into the database."),
+    "sitelog": ("sitelog", "Parse site logs and print a summary."),
+    "rinex": ("rinex", "Check RINEX headers against the station metadata."),
+    "daemon": (
+        "daemon",
+        "Rewrite site logs and the crux file when the database changes.",
+    ),
+    "server": ("server", "Serve site logs and the crux file over HTTP."),
+    "antenna-gra": (None, "Download antenna.gra from IGS now."),
+}
+
+
+def get_arg_parser() -> argparse.ArgumentParser:
+    arg_parser = argparse.ArgumentParser(
+        prog="signalpy",
+        description="Export and publish SIGNAL station metadata. "
+        "Run 'signalpy COMMAND -h' for the options of a command.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="commands:\n"
+        + "\n".join(
+            f"  {name:<14}{description}" for name, (_, description) in COMMANDS.items()
+        ),
+    )
+
+    arg_parser.add_argument(
+        "command", help="Command to run.", metavar="COMMAND", choices=list(COMMANDS)
+    )
+
+    arg_parser.add_argument(
+        "arguments",
+        help="Options of the command.",
+        nargs=argparse.REMAINDER,
+    )
+
+    return arg_parser
+
+
+def main(argv: list = None) -> None:
+    input_arguments = get_arg_parser().parse_args(argv)
+
+    module, _ = COMMANDS[input_arguments.command]
+    if module is None:
+        from signalpy_metapodatkovna_baza import db2log
+
+        if not db2log.download_antenna_gra():
+            print("antenna.gra could not be downloaded.")
+            sys.exit(-1)
+        print("antenna.gra successfully downloaded.")
+        return
+
+    # the module's own argument parser reads the rest of the command line
+    sys.argv = [f"signalpy {input_arguments.command}"] + input_arguments.arguments
+    runpy.run_module(
+        f"signalpy_metapodatkovna_baza.{module}", run_name="__main__", alter_sys=True
+    )
+
+
+if __name__ == "__main__":
+    main()
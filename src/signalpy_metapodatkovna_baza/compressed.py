@@ -0,0 +1,124 @@
+import gzip
+import queue
+import sys
+import threading
+
+# compression -> file name extension
+EXTENSIONS = {
+    "gzip": ".gz",
+    "zstd": ".zst",
+}
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 10
+
+
+class GzipWriter(gzip.GzipFile):
+    # no file name or time in the header, so the same content always gives the same file
+    def __init__(self, raw):
+        super().__init__(
+            filename="",
+            mode="wb",
+            compresslevel=GZIP_LEVEL,
+            fileobj=raw,
+            mtime=0,
+        )
+
+    def close(self):
+        fileobj = self.fileobj
+        super().close()
+        if fileobj is not None:
+            fileobj.close()
+
+
+class CountingFile(object):
+    # output file that counts the bytes reaching it, i.e. after compression
+    def __init__(self, file_path: str):
+        self.f = open(file_path, "wb")
+        self.bytes_written = 0
+
+    def write(self, chunk: bytes) -> int:
+        n = self.f.write(chunk)
+        self.bytes_written += n
+        return n
+
+    def flush(self):
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+    @property
+    def closed(self) -> bool:
+        return self.f.closed
+
+
+class BackgroundWriter(object):
+    # write() only queues the chunk; compressing and writing to disk run in a separate thread
+    def __init__(self, f, max_chunks: int = 64):
+        self.f = f
+        self.queue = queue.Queue(max_chunks)
+        self.error = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while True:
+            chunk = self.queue.get()
+            if chunk is None:
+                return
+
+            # after an error the queue is still drained, so write() never blocks
+            if self.error is None:
+                try:
+                    self.f.write(chunk)
+                except Exception as e:
+                    self.error = e
+
+    def write(self, chunk: bytes) -> int:
+        if self.error is not None:
+            raise self.error
+
+        self.queue.put(bytes(chunk))
+        return len(chunk)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        self.f.close()
+
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def open_compressed(raw, compression: str = None, background=False):
+    # binary file object for writing to raw, compressed as it is written; closing it closes raw
+    if compression is None:
+        f = raw
+
+    elif compression == "gzip":
+        f = GzipWriter(raw)
+
+    elif compression == "zstd":
+        # only needed, and imported, for zstd output
+        try:
+            import zstandard
+        except ModuleNotFoundError:
+            print("Module zstandard not installed. pip install zstandard")
+            sys.exit(-1)
+        f = zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw)
+
+    else:
+        print(f"Unknown compression {compression}.")
+        sys.exit(-1)
+
+    return BackgroundWriter(f) if background else f
@@ -0,0 +1,425 @@
+import argparse
+import os
+import select
+import sys
+import time
+import typing
+
+if typing.TYPE_CHECKING:
+    import psycopg2.extensions
+
+from signalpy_metapodatkovna_baza import (
+    atomic,
+    database,
+    db2crux,
+    db2log,
+    manifest,
+    queries,
+    templates,
+)
+
+CHANNEL = "signalpy_station_changed"
+
+# for every table read by queries.py: query returning the station_ids affected by a changed row ($1 is the row as jsonb)
+STATION_ID = "SELECT ($1->>'station_id')::integer AS station_id"
+TRIGGER_SOURCES = {
+    "station_information": STATION_ID,
+    "coordinates": STATION_ID,
+    "receiver_log": STATION_ID,
+    "antenna_log": STATION_ID,
+    "surveyed_local_ties_to_station_information": STATION_ID,
+    "frequency_standard_log": STATION_ID,
+    "collocation_information_to_station_information": STATION_ID,
+    "humidity_sensor_log": STATION_ID,
+    "pressure_sensor_log": STATION_ID,
+    "temperature_sensor_log": STATION_ID,
+    "water_vapor_radiometer_log": STATION_ID,
+    "other_meteorological_instrumentation_log": STATION_ID,
+    "radio_interference_log": STATION_ID,
+    "multipath_source_log": STATION_ID,
+    "signal_obstruction_log": STATION_ID,
+    "local_episodic_effect_log": STATION_ID,
+    "point_of_contact_agency_log": STATION_ID,
+    "more_information_log": STATION_ID,
+    "country": (
+        "SELECT station_id FROM station_information "
+        "WHERE country_iso3_code = $1->>'country_iso3_code'"
+    ),
+    "receiver": (
+        "SELECT station_id FROM receiver_log "
+        "WHERE receiver_id::text = $1->>'receiver_id'"
+    ),
+    "antenna": (
+        "SELECT station_id FROM antenna_log "
+        "WHERE antenna_id::text = $1->>'antenna_id'"
+    ),
+    "antenna_type": (
+        "SELECT al.station_id FROM antenna_log AS al, antenna AS a "
+        "WHERE al.antenna_id = a.antenna_id AND a.antenna_igs_name = $1->>'antenna_igs_name'"
+    ),
+    "surveyed_local_ties": (
+        "SELECT station_id FROM surveyed_local_ties_to_station_information "
+        "WHERE local_tie_id::text = $1->>'local_tie_id'"
+    ),
+    "collocation_information": (
+        "SELECT station_id FROM collocation_information_to_station_information "
+        "WHERE collocation_id::text = $1->>'collocation_id'"
+    ),
+    "humidity_sensor": (
+        "SELECT station_id FROM humidity_sensor_log "
+        "WHERE humidity_sensor_id::text = $1->>'humidity_sensor_id'"
+    ),
+    "humidity_sensor_type": (
+        "SELECT hsl.station_id FROM humidity_sensor_log AS hsl, humidity_sensor AS hs "
+        "WHERE hsl.humidity_sensor_id = hs.humidity_sensor_id AND "
+        "hs.model = $1->>'humidity_sensor_model' AND hs.manufacturer = $1->>'manufacturer'"
+    ),
+    "pressure_sensor": (
+        "SELECT station_id FROM pressure_sensor_log "
+        "WHERE pressure_sensor_id::text = $1->>'pressure_sensor_id'"
+    ),
+    "pressure_sensor_type": (
+        "SELECT psl.station_id FROM pressure_sensor_log AS psl, pressure_sensor AS ps "
+        "WHERE psl.pressure_sensor_id = ps.pressure_sensor_id AND "
+        "ps.model = $1->>'pressure_sensor_model' AND ps.manufacturer = $1->>'manufacturer'"
+    ),
+    "temperature_sensor": (
+        "SELECT station_id FROM temperature_sensor_log "
+        "WHERE temperature_sensor_id::text = $1->>'temperature_sensor_id'"
+    ),
+    "temperature_sensor_type": (
+        "SELECT tsl.station_id FROM temperature_sensor_log AS tsl, temperature_sensor AS ts "
+        "WHERE tsl.temperature_sensor_id = ts.temperature_sensor_id AND "
+        "ts.model = $1->>'temperature_sensor_model' AND ts.manufacturer = $1->>'manufacturer'"
+    ),
+    "water_vapor_radiometer": (
+        "SELECT station_id FROM water_vapor_radiometer_log "
+        "WHERE water_vapor_radiometer_id::text = $1->>'water_vapor_radiometer_id'"
+    ),
+    "water_vapor_radiometer_type": (
+        "SELECT wvrl.station_id FROM water_vapor_radiometer_log AS wvrl, water_vapor_radiometer AS wvr "
+        "WHERE wvrl.water_vapor_radiometer_id = wvr.water_vapor_radiometer_id AND "
+        "wvr.model = $1->>'water_vapor_radiometer_model' AND wvr.manufacturer = $1->>'manufacturer'"
+    ),
+    "agency": (
+        "SELECT station_id FROM point_of_contact_agency_log "
+        "WHERE point_of_contact_agency_id::text = $1->>'agency_id'"
+    ),
+    "contact": (
+        "SELECT poc.station_id FROM point_of_contact_agency_log AS poc, agency AS a "
+        "WHERE poc.point_of_contact_agency_id = a.agency_id AND "
+        "$1->>'contact_id' IN (a.primary_contact_id::text, a.secondary_contact_id::text)"
+    ),
+}
+
+notify_function = (
+    "CREATE OR REPLACE FUNCTION signalpy_notify_station_change() RETURNS trigger AS $$ "
+    "DECLARE changed_row jsonb; station record; "
+    "BEGIN "
+    "FOR changed_row IN "
+    "SELECT to_jsonb(OLD) WHERE TG_OP <> 'INSERT' "
+    "UNION ALL SELECT to_jsonb(NEW) WHERE TG_OP <> 'DELETE' "
+    "LOOP "
+    "FOR station IN EXECUTE TG_ARGV[0] USING changed_row LOOP "
+    f"PERFORM pg_notify('{CHANNEL}', station.station_id::text); "
+    "END LOOP; "
+    "END LOOP; "
+    "RETURN NULL; "
+    "END $$ LANGUAGE plpgsql"
+)
+
+
+def install_triggers(db_connection: "psycopg2.extensions.connection") -> None:
+    cur = db_connection.cursor()  # type: psycopg2.extensions.cursor
+    cur.execute(notify_function)
+    for table, source in TRIGGER_SOURCES.items():
+        cur.execute(f"DROP TRIGGER IF EXISTS signalpy_notify ON {table}")
+        cur.execute(
+            f"CREATE TRIGGER signalpy_notify "
+            f"AFTER INSERT OR UPDATE OR DELETE ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION signalpy_notify_station_change(%s)",
+            (source,),
+        )
+    cur.close()
+    db_connection.commit()
+
+
+def uninstall_triggers(db_connection: "psycopg2.extensions.connection") -> None:
+    cur = db_connection.cursor()  # type: psycopg2.extensions.cursor
+    for table in TRIGGER_SOURCES:
+        cur.execute(f"DROP TRIGGER IF EXISTS signalpy_notify ON {table}")
+    cur.execute("DROP FUNCTION IF EXISTS signalpy_notify_station_change()")
+    cur.close()
+    db_connection.commit()
+
+
+def listen(config_file: str = "database.ini") -> "psycopg2.extensions.connection":
+    psycopg2 = database.get_psycopg2()
+    listen_connection = psycopg2.connect(
+        **database.get_connection_settings(config_file)
+    )
+    listen_connection.set_isolation_level(
+        psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT
+    )
+    cur = listen_connection.cursor()  # type: psycopg2.extensions.cursor
+    cur.execute(f"LISTEN {CHANNEL}")
+    cur.close()
+
+    return listen_connection
+
+
+def wait_for_changes(
+    listen_connection: "psycopg2.extensions.connection",
+    debounce: float = 2.0,
+    max_delay: float = 30.0,
+    timeout=None,
+) -> set:
+    # block until the first notification, then keep collecting until the channel is quiet for `debounce` seconds
+    changed = set()
+    first = None
+    while True:
+        if first is None:
+            wait = timeout
+        else:
+            wait = min(debounce, max(0.0, first + max_delay - time.monotonic()))
+
+        if select.select([listen_connection], [], [], wait) == ([], [], []):
+            return changed
+
+        listen_connection.poll()
+        while listen_connection.notifies:
+            notify = listen_connection.notifies.pop(0)
+            changed.add(int(notify.payload))
+
+        if changed and first is None:
+            first = time.monotonic()
+
+        if first is not None and time.monotonic() - first >= max_delay:
+            return changed
+
+
+class Regenerator(object):
+    def __init__(
+        self,
+        db_connection: "psycopg2.extensions.connection",
+        save_dir: str = ".",
+        crux_dir: str = ".",
+        prepared_by: str = "",
+        gra_file: str = "antenna.gra",
+        overwrite: str = "if-changed",
+    ):
+        self.db_connection = db_connection
+        self.save_dir = save_dir
+        self.crux_dir = crux_dir
+        self.prepared_by = prepared_by
+        self.gra_file = gra_file
+        self.overwrite = overwrite
+
+        # station_id -> (sort key, crux block)
+        self.crux_blocks = {}
+
+    def crux_file_path(self) -> str:
+        return os.path.join(self.crux_dir, "SI-CORS.crux")
+
+    def load_crux_blocks(self) -> None:
+        self.crux_blocks = {}
+        for station in database.execute_query(
+            self.db_connection, queries.station_list, ()
+        ):
+            self.update_crux_block(station.station_id)
+        self.db_connection.rollback()
+
+        db2crux.write_crux_file(self.crux_file_path(), self.sorted_crux_blocks())
+
+    def sorted_crux_blocks(self):
+        return [block for _, block in sorted(self.crux_blocks.values())]
+
+    def update_crux_block(self, station_id: int) -> None:
+        data = db2crux.get_station_data(self.db_connection, station_id)
+        if data is None:
+            self.crux_blocks.pop(station_id, None)
+            return
+
+        station_qr = database.execute_query(
+            self.db_connection, queries.station_data_by_id, (station_id,)
+        )
+        sort_key = (station_qr[0].country_iso3_code, station_qr[0].four_char_id)
+        self.crux_blocks[station_id] = (sort_key, db2crux.get_crux_block(data))
+
+    def regenerate_log(self, station_id: int, log_manifest: manifest.Manifest) -> bool:
+        # returns whether the station still exists
+        station_qr = database.execute_query(
+            self.db_connection, queries.station_data_by_id, (station_id,)
+        )
+        if not station_qr:
+            return False
+
+        nine_char_id = station_qr[0].nine_char_id
+        data = db2log.get_station_data(self.db_connection, nine_char_id)
+        if data is None:
+            return False
+
+        # written like db2log.make_log_file, which also reports what was saved
+        file_path = db2log.write_log_file(
+            nine_char_id,
+            data,
+            templates.Header(site_name=nine_char_id),
+            db2log.get_form(self.prepared_by),
+            self.save_dir,
+            overwrite=self.overwrite,
+            gra_file=self.gra_file,
+            log_manifest=log_manifest,
+        )
+        if file_path:
+            log_manifest.add(
+                file_path, manifest.get_source_fingerprint(data), station=nine_char_id
+            )
+
+        return True
+
+    def regenerate(self, station_ids: set) -> None:
+        log_manifest = manifest.Manifest(self.save_dir)
+        for station_id in sorted(station_ids):
+            if not self.regenerate_log(station_id, log_manifest):
+                print(f"Station {station_id} no longer exists, log file not written.")
+            self.update_crux_block(station_id)
+
+        # close the read transaction so the next burst sees fresh data
+        self.db_connection.rollback()
+
+        log_manifest.write()
+
+        db2crux.write_crux_file(self.crux_file_path(), self.sorted_crux_blocks())
+
+
+def run_daemon(
+    save_dir=".",
+    crux_dir=".",
+    prepared_by="",
+    config_file="database.ini",
+    debounce=2.0,
+    max_delay=30.0,
+    once=False,
+    overwrite="if-changed",
+):
+    for directory in (save_dir, crux_dir):
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+    psycopg2 = database.get_psycopg2()
+
+    while True:
+        try:
+            listen_connection = listen(config_file)
+            db_connection = psycopg2.connect(
+                **database.get_connection_settings(config_file)
+            )
+
+            regenerator = Regenerator(
+                db_connection, save_dir, crux_dir, prepared_by, overwrite=overwrite
+            )
+            # notifications may have been missed while disconnected, rebuild the whole crux file
+            regenerator.load_crux_blocks()
+            print(f"Listening on channel {CHANNEL}.")
+
+            while True:
+                changed = wait_for_changes(listen_connection, debounce, max_delay)
+                if changed:
+                    regenerator.regenerate(changed)
+                    if once:
+                        return
+        except psycopg2.OperationalError as e:
+            print(f"Lost database connection: {e}. Reconnecting in 5 s.")
+            time.sleep(5)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+
+    arg_parser.add_argument(
+        "-o",
+        "--out_dir",
+        help="Saving directory for log files.",
+        type=str,
+        default=".",
+    )
+
+    arg_parser.add_argument(
+        "--crux_dir",
+        help="Saving directory for the crux file (default: same as --out_dir).",
+        type=str,
+        default=None,
+    )
+
+    arg_parser.add_argument(
+        "-a",
+        "--author",
+        help="Value for " "Prepared by" " field in log files.",
+        type=str,
+        default="",
+    )
+
+    arg_parser.add_argument(
+        "--overwrite",
+        help="What to do with an existing log file: always replace it, never replace it, "
+        "or replace it only if the content changed (default: if-changed).",
+        choices=atomic.OVERWRITE,
+        default="if-changed",
+    )
+
+    arg_parser.add_argument(
+        "-c",
+        "--config",
+        help="Database connection settings file.",
+        type=str,
+        default="database.ini",
+    )
+
+    arg_parser.add_argument(
+        "-d",
+        "--debounce",
+        help="Seconds without notifications before a burst of changes is regenerated.",
+        type=float,
+        default=2.0,
+    )
+
+    arg_parser.add_argument(
+        "--install-triggers",
+        help="Install notification triggers on all tables read by the log and crux export and exit.",
+        action="store_true",
+    )
+
+    arg_parser.add_argument(
+        "--uninstall-triggers",
+        help="Remove notification triggers and exit.",
+        action="store_true",
+    )
+
+    arg_parser.add_argument(
+        "--once",
+        help="Exit after the first regenerated burst of changes.",
+        action="store_true",
+    )
+
+    input_arguments = arg_parser.parse_args()
+
+    if input_arguments.install_triggers or input_arguments.uninstall_triggers:
+        connection = database.connect(input_arguments.config)
+        if input_arguments.install_triggers:
+            install_triggers(connection)
+            print("Notification triggers installed.")
+        else:
+            uninstall_triggers(connection)
+            print("Notification triggers removed.")
+        connection.close()
+        sys.exit(0)
+
+    run_daemon(
+        save_dir=input_arguments.out_dir,
+        crux_dir=input_arguments.crux_dir or input_arguments.out_dir,
+        prepared_by=input_arguments.author,
+        config_file=input_arguments.config,
+        debounce=input_arguments.debounce,
+        once=input_arguments.once,
+        overwrite=input_arguments.overwrite,
+    )
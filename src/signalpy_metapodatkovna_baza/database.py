@@ -0,0 +1,148 @@
+import collections
+import configparser
+import datetime
+import decimal
+import functools
+import sqlite3
+import sys
+import typing
+
+from signalpy_metapodatkovna_baza import metrics, profiling
+
+if typing.TYPE_CHECKING:
+    import psycopg2.extensions
+
+# snapshot column types; first word selects the converter, TEXT keeps numerics as written (e.g. 1.500)
+SQLITE_TYPES = {
+    16: "BOOLEAN",  # bool
+    20: "INTEGER",  # int8
+    21: "INTEGER",  # int2
+    23: "INTEGER",  # int4
+    700: "REAL",  # float4
+    701: "REAL",  # float8
+    1082: "DATE",  # date
+    1114: "TIMESTAMP",  # timestamp
+    1184: "TIMESTAMP",  # timestamptz
+    1700: "DECIMAL TEXT",  # numeric
+}
+
+sqlite3.register_adapter(decimal.Decimal, str)
+sqlite3.register_adapter(bool, int)
+sqlite3.register_adapter(datetime.datetime, lambda d: d.isoformat(" "))
+sqlite3.register_adapter(datetime.date, lambda d: d.isoformat())
+sqlite3.register_converter("BOOLEAN", lambda b: bool(int(b)))
+sqlite3.register_converter("DATE", lambda b: datetime.date.fromisoformat(b.decode()))
+sqlite3.register_converter(
+    "TIMESTAMP", lambda b: datetime.datetime.fromisoformat(b.decode())
+)
+sqlite3.register_converter("DECIMAL", lambda b: decimal.Decimal(b.decode()))
+
+
+@functools.lru_cache(maxsize=None)
+def get_psycopg2():
+    # imported on first use; runs from a snapshot never load it
+    try:
+        import psycopg2
+        import psycopg2.errors
+        import psycopg2.extensions
+        import psycopg2.extras
+        import psycopg2.pool
+    except ModuleNotFoundError:
+        print("Module psycopg2 not installed. pip install psycopg2")
+        sys.exit(-1)
+
+    return psycopg2
+
+
+def get_connection_settings(config_file: str = "database.ini") -> dict:
+    database_config = configparser.ConfigParser()
+    database_config.read(config_file)
+    return {
+        "host": database_config.get("connection_settings", "host"),
+        "port": database_config.get("connection_settings", "port"),
+        "database": database_config.get("connection_settings", "database_name"),
+        "user": database_config.get("connection_settings", "username"),
+        "password": database_config.get("connection_settings", "password"),
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def _record_type(fields: tuple):
+    return collections.namedtuple("Record", fields, rename=True)
+
+
+def _named_tuple_row(cursor: sqlite3.Cursor, row: tuple):
+    return _record_type(tuple(d[0] for d in cursor.description))(*row)
+
+
+def connect_snapshot(snapshot_file: str) -> sqlite3.Connection:
+    db_connection = sqlite3.connect(
+        snapshot_file, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False
+    )
+    db_connection.row_factory = _named_tuple_row
+
+    return db_connection
+
+
+def connect(config_file: str = "database.ini", snapshot_file: str = None):
+    if snapshot_file:
+        return connect_snapshot(snapshot_file)
+
+    psycopg2 = get_psycopg2()
+    try:
+        db_connection = psycopg2.connect(
+            **get_connection_settings(config_file)
+        )  # type: psycopg2.extensions.connection
+    except psycopg2.OperationalError as e:
+        print(f"Failed to connect to database: {e}")
+        sys.exit(-1)
+
+    return db_connection
+
+
+def execute_query(db_connection: "psycopg2.extensions.connection", q: str, v: tuple):
+    with profiling.query_stage(q) as record:
+        if isinstance(db_connection, sqlite3.Connection):
+            # same queries, sqlite parameter style
+            cur = db_connection.execute(q.replace("%s", "?"), v)
+        else:
+            cur = db_connection.cursor(
+                cursor_factory=get_psycopg2().extras.NamedTupleCursor
+            )  # type: psycopg2.extensions.cursor
+            cur.execute(q, v)
+        results = cur.fetchall()
+        cur.close()
+
+        record["rows"] = len(results)
+    metrics.query(len(results))
+
+    return results
+
+
+def iterate_query(
+    db_connection: "psycopg2.extensions.connection",
+    q: str,
+    v: tuple,
+    name: str = "iterate",
+    batch_size: int = 5000,
+):
+    # rows are yielded as they arrive; PostgreSQL sends them in batches through a server-side cursor,
+    # so memory does not grow with the result (the profiled time includes the caller's work)
+    n = 0
+    with profiling.query_stage(q) as record:
+        if isinstance(db_connection, sqlite3.Connection):
+            cur = db_connection.execute(q.replace("%s", "?"), v)
+        else:
+            cur = db_connection.cursor(
+                name=name, cursor_factory=get_psycopg2().extras.NamedTupleCursor
+            )  # type: psycopg2.extensions.cursor
+            cur.itersize = batch_size
+            cur.execute(q, v)
+
+        for row in cur:
+            n += 1
+            yield row
+        cur.close()
+
+        record["rows"] = n
+    metrics.query(n)
@@ -1,33 +1,40 @@
 import argparse
-import configparser
 import datetime
+import itertools
+import json
 import os
+import re
+import sqlite3
 import sys
-
-try:
-    import psycopg2
+import typing
+
+from signalpy_metapodatkovna_baza import (
+    atomic,
+    compressed,
+    manifest,
+    metrics,
+    profiling,
+    queries,
+    templates,
+)
+from signalpy_metapodatkovna_baza.database import connect, execute_query, get_psycopg2
+
+if typing.TYPE_CHECKING:
     import psycopg2.extensions
-    from psycopg2.extras import NamedTupleCursor
-except ModuleNotFoundError:
-    print("Module psycopg2 not installed. pip install psycopg2")
-    exit(-1)
-
-from signalpy_metapodatkovna_baza import queries, templates
 
 
-def execute_query(db_connection: psycopg2.extensions.connection, q: str, v: tuple):
-    cur = db_connection.cursor(
-        cursor_factory=NamedTupleCursor
-    )  # type: psycopg2.extensions.cursor
-    cur.execute(q, v)
-    results = cur.fetchall()
+def refresh_crux_view(db_connection: "psycopg2.extensions.connection") -> None:
+    cur = db_connection.cursor()  # type: psycopg2.extensions.cursor
+    cur.execute(queries.crux_view_create)
+    cur.execute(queries.crux_view_index)
+    cur.execute(queries.crux_view_refresh)
     cur.close()
-    return results
+    db_connection.commit()
 
 
-def get_station_data(db_connection: psycopg2.extensions.connection, station_id: int):
+def get_station_data(db_connection: "psycopg2.extensions.connection", station_id: int):
     # get station info
-    station_qr = execute_query(db_connection, queries.station_data, (station_id,))
+    station_qr = execute_query(db_connection, queries.station_data_by_id, (station_id,))
 
     # get station coordinates
     coordinates_qr = execute_query(
@@ -65,75 +72,331 @@ def get_station_data(db_connection: psycopg2.extensions.connection, station_id:
     }
 
 
-def get_crux_file(save_dir=""):
-    # --- CONNECT TO DATABASE ---
-    database_config = configparser.ConfigParser()
-    database_config.read("database.ini")
-    connection_settings = {
-        "host": database_config.get("connection_settings", "host"),
-        "port": database_config.get("connection_settings", "port"),
-        "database": database_config.get("connection_settings", "database_name"),
-        "user": database_config.get("connection_settings", "username"),
-        "password": database_config.get("connection_settings", "password"),
-    }
+def get_network_data(
+    db_connection: "psycopg2.extensions.connection", since: datetime.datetime = None
+):
+    # one scan of the crux_export view, grouped into the same structure get_station_data returns;
+    # with since, only stations with changes after that date and only their changed intervals
+    # psycopg2 is only loaded for a database connection, a snapshot does not need it
+    missing_view = (
+        sqlite3.OperationalError
+        if isinstance(db_connection, sqlite3.Connection)
+        else get_psycopg2().errors.UndefinedTable
+    )
     try:
-        db_connection = psycopg2.connect(
-            **connection_settings
-        )  # type: psycopg2.extensions.connection
-    except psycopg2.OperationalError as e:
-        print(f"Failed to connect to database: {e}")
+        if since is None:
+            crux_qr = execute_query(db_connection, queries.crux_view_data, ())
+        else:
+            crux_qr = execute_query(
+                db_connection, queries.crux_view_data_since, (since, since, since)
+            )
+    except missing_view:
+        print("Materialized view crux_export does not exist. Run with --refresh.")
         sys.exit(-1)
 
-    # get list of all stations in database
-    query = "SELECT station_id FROM station_information ORDER BY country_iso3_code,four_char_id"
-    stations_qr = execute_query(db_connection, query, ())
+    network = []
+    for _, station_rows in itertools.groupby(crux_qr, key=lambda row: row.station_id):
+        station_rows = list(station_rows)
 
-    # crux_file_name = f'SI-CORS_{datetime.datetime.now().strftime("%Y-%m-%d")}.crux'
-    crux_file_name = "SI-CORS.crux"
-    if not os.path.exists(save_dir):
-        os.makedirs(save_dir)
+        receivers = []
+        antennas = []
+        for row in station_rows:
+            if row.equipment == "receiver":
+                receivers.append(templates.Receiver.from_crux_view(row))
+            elif row.equipment == "antenna":
+                antennas.append(templates.Antenna.from_crux_view(row))
+
+        network.append(
+            {
+                "station": templates.Site.from_crux_view(station_rows[0]),
+                "country_iso3_code": station_rows[0].country_iso3_code,
+                "receivers": receivers,
+                "antennas": antennas,
+                "agency": templates.Agency.from_crux_view(station_rows[0]),
+            }
+        )
+
+    return network
 
-    file_path = os.path.join(save_dir, crux_file_name)
 
-    if os.path.exists(file_path):
-        overwrite = input("File already exists. Overwrite? Y = yes, N = no\n")
-        if overwrite.lower() == "n":
-            print(f"Crux file {crux_file_name} was not saved.")
+def get_crux_block(data) -> str:
+    block = "#*B\n"
+    block += f"    O - {data['station'].four_char_id}:\n"
+    block += data["station"].print_to_crux()
+    block += data["agency"].print_to_crux()
 
-    crux = open(os.path.join(file_path), "w", encoding="UTF-8")
-    crux.write(f"# file created: {datetime.datetime.now().strftime('%Y-%m-%d')}\n\n")
-    crux.write("update_insert:\n\n")
+    block += "\n"
 
-    for station_qr in stations_qr:
-        station_id = station_qr.station_id
-        data = get_station_data(db_connection, station_id)
+    for r in data["receivers"]:
+        block += r.print_to_crux()
 
-        if not data:
-            continue
+    block += "\n"
 
-        crux.write("#*B\n")
-        crux.write(f"    O - {data['station'].four_char_id}:\n")
-        crux.write(data["station"].print_to_crux())
-        crux.write(data["agency"].print_to_crux())
+    for a in data["antennas"]:
+        block += a.print_to_crux()
 
-        crux.write("\n")
+    block += "\n"
 
-        for r in data["receivers"]:
-            crux.write(r.print_to_crux())
+    for a in data["antennas"]:
+        block += a.print_eccentricities_to_crux()
 
-        crux.write("\n")
+    block += "#*E\n"
 
-        for a in data["antennas"]:
-            crux.write(a.print_to_crux())
+    return block
 
-        crux.write("\n")
 
-        for a in data["antennas"]:
-            crux.write(a.print_eccentricities_to_crux())
+def get_crux_header() -> str:
+    return (
+        f"# file created: {datetime.datetime.now().strftime('%Y-%m-%d')}\n\n"
+        "update_insert:\n\n"
+    )
+
 
-        crux.write("#*E\n")
+def write_crux_file(
+    file_path: str,
+    blocks,
+    compression: str = None,
+    background=False,
+    overwrite: str = "always",
+) -> bool:
+    # returns whether the file was written; each block is written as soon as it is rendered,
+    # so with background compression the blocks are compressed while the next ones are rendered
+    # bytes are only counted, after compression, when metrics are collected
+    writer = atomic.AtomicWriter(
+        file_path, overwrite, compression, background, count=metrics.enabled()
+    )
+    stations = 0
+    with profiling.stage("write", os.path.basename(file_path)):
+        with writer as crux:
+            crux.write(get_crux_header().encode("UTF-8"))
+
+            for block in blocks:
+                crux.write(block.encode("UTF-8"))
+                stations += 1
+
+    if writer.written:
+        metrics.file_written(writer.bytes_written, stations)
+
+    return writer.written
+
+
+def write_crux_manifest(
+    file_path: str, crux_file_path: str, network: list, since: datetime.datetime
+) -> None:
+    manifest = {
+        "file": os.path.basename(crux_file_path),
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "since": since.isoformat(),
+        "stations": [data["station"].four_char_id for data in network],
+        "intervals": sum(
+            len(data["receivers"]) + len(data["antennas"]) for data in network
+        ),
+    }
+    atomic.write_file(file_path, json.dumps(manifest, indent=2) + "\n")
+
+
+def get_shards(network: list, by_country=False, patterns: dict = None) -> dict:
+    # shard name -> indices into network, in network order; a station can be in more than one shard
+    shards = {}
+    for i, data in enumerate(network):
+        if by_country:
+            shards.setdefault(data["country_iso3_code"], []).append(i)
+        for name, pattern in (patterns or {}).items():
+            if re.search(pattern, data["station"].four_char_id):
+                shards.setdefault(name, []).append(i)
+
+    return shards
+
+
+def render_shard(
+    file_path: str,
+    shard: list,
+    compression: str = None,
+    background=False,
+    overwrite: str = "always",
+    count=False,
+) -> tuple:
+    # runs in a worker process; shard is [(network index, data)]
+    # a worker's metrics are lost with its process, so the bytes it wrote are returned
+    collector = metrics.start("shard") if count else None
+    blocks = []
+
+    def render():
+        # blocks are kept for --merge while they are written
+        for i, data in shard:
+            blocks.append((i, get_crux_block(data)))
+            yield blocks[-1][1]
+
+    written = write_crux_file(file_path, render(), compression, background, overwrite)
+
+    return blocks, written, collector.bytes_written if collector else None
+
+
+def print_saved(file_name: str, written: bool) -> None:
+    if written:
+        print(f"Crux file {file_name} successfully saved.")
+    else:
+        print(f"Crux file {file_name} not saved, existing file kept.")
+
+
+def write_crux_shards(
+    save_dir: str,
+    file_name: str,
+    network: list,
+    shards: dict,
+    merge=False,
+    jobs: int = None,
+    compression: str = None,
+    background=False,
+    overwrite: str = "always",
+    since: datetime.datetime = None,
+) -> None:
+    # one bulk load is shared by all shards; each worker renders and writes one shard;
+    # with since, every written shard gets its own manifest of the changed stations
+    import concurrent.futures
+
+    stem, extension = os.path.splitext(file_name)
+    extension += compressed.EXTENSIONS.get(compression, "")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            name: executor.submit(
+                render_shard,
+                os.path.join(save_dir, f"{stem}_{name}{extension}"),
+                [(i, network[i]) for i in indices],
+                compression,
+                background,
+                overwrite,
+                metrics.enabled(),
+            )
+            for name, indices in shards.items()
+        }
+
+        fingerprints = [manifest.get_source_fingerprint(data) for data in network]
+
+        merged = {}
+        for name, future in futures.items():
+            blocks, written, size = future.result()
+            if written:
+                metrics.file_written(size, stations=len(blocks))
+            # a shard kept with --overwrite=never may hold older data than its fingerprint
+            if written or overwrite != "never":
+                manifest.write_network_file(
+                    os.path.join(save_dir, f"{stem}_{name}{extension}"),
+                    [fingerprints[i] for i, _ in blocks],
+                )
+            if written and since is not None:
+                write_crux_manifest(
+                    os.path.join(save_dir, f"{stem}_{name}.json"),
+                    os.path.join(save_dir, f"{stem}_{name}{extension}"),
+                    [network[i] for i, _ in blocks],
+                    since,
+                )
+            merged.update(blocks)
+            print_saved(f"{stem}_{name}{extension}", written)
+
+    if merge:
+        # network order, every station once
+        file_name = f"{stem}{extension}"
+        written = write_crux_file(
+            os.path.join(save_dir, file_name),
+            (merged[i] for i in sorted(merged)),
+            compression,
+            background,
+            overwrite,
+        )
+        if written or overwrite != "never":
+            manifest.write_network_file(
+                os.path.join(save_dir, file_name),
+                [fingerprints[i] for i in sorted(merged)],
+            )
+        if written and since is not None:
+            write_crux_manifest(
+                os.path.join(save_dir, f"{stem}.json"),
+                os.path.join(save_dir, file_name),
+                [network[i] for i in sorted(merged)],
+                since,
+            )
+        print_saved(file_name, written)
+
+
+def get_crux_file(
+    save_dir="",
+    refresh=False,
+    snapshot_file=None,
+    since=None,
+    by_country=False,
+    shard_patterns=None,
+    merge=False,
+    jobs=None,
+    compression=None,
+    background=False,
+    overwrite="always",
+):
+    # --- CONNECT TO DATABASE ---
+    db_connection = connect("database.ini", snapshot_file)
 
-    crux.close()
+    if refresh and snapshot_file:
+        print(
+            "The crux_export view can only be refreshed in the database, not in a snapshot."
+        )
+        sys.exit(-1)
+
+    if refresh:
+        refresh_crux_view(db_connection)
+
+    network = get_network_data(db_connection, since)
+    db_connection.close()
+
+    # crux_file_name = f'SI-CORS_{datetime.datetime.now().strftime("%Y-%m-%d")}.crux'
+    crux_file_name = "SI-CORS.crux" if since is None else f"SI-CORS_{since:%Y%m%d}.crux"
+    if not os.path.exists(save_dir):
+        os.makedirs(save_dir)
+
+    manifest_path = os.path.join(
+        save_dir, os.path.splitext(crux_file_name)[0] + ".json"
+    )
+
+    if by_country or shard_patterns:
+        write_crux_shards(
+            save_dir,
+            crux_file_name,
+            network,
+            get_shards(network, by_country, shard_patterns),
+            merge,
+            jobs,
+            compression,
+            background,
+            overwrite,
+            since,
+        )
+        return
+
+    crux_file_name += compressed.EXTENSIONS.get(compression, "")
+    file_path = os.path.join(save_dir, crux_file_name)
+
+    if atomic.keep_existing(file_path, overwrite):
+        print_saved(crux_file_name, False)
+        return
+
+    written = write_crux_file(
+        file_path,
+        (get_crux_block(data) for data in network),
+        compression,
+        background,
+        overwrite,
+    )
+    manifest.write_network_file(
+        file_path, [manifest.get_source_fingerprint(data) for data in network]
+    )
+
+    if since is None or not written:
+        print_saved(crux_file_name, written)
+        return
+
+    write_crux_manifest(manifest_path, file_path, network, since)
+    print(
+        f"Crux file {crux_file_name} with changes of {len(network)} stations since {since:%Y-%m-%d} successfully saved."
+    )
 
 
 if __name__ == "__main__":
@@ -147,6 +410,143 @@ if __name__ == "__main__":
         default=".",
     )
 
+    arg_parser.add_argument(
+        "-r",
+        "--refresh",
+        help="Create (if missing) and refresh the crux_export materialized view before export.",
+        action="store_true",
+    )
+
+    arg_parser.add_argument(
+        "--since",
+        help="Only write intervals installed or removed after this date (e.g. 2024-01-01), "
+        "and a JSON manifest of the changed stations.",
+        type=datetime.datetime.fromisoformat,
+        default=None,
+    )
+
+    arg_parser.add_argument(
+        "--by_country",
+        help="Write one crux file per country (SI-CORS_<country code>.crux).",
+        action="store_true",
+    )
+
+    arg_parser.add_argument(
+        "--shard",
+        help="Write the stations whose four character id matches REGEX to SI-CORS_<NAME>.crux. "
+        "Can be given more than once.",
+        metavar="NAME=REGEX",
+        type=str,
+        action="append",
+        default=[],
+    )
+
+    arg_parser.add_argument(
+        "--merge",
+        help="With --by_country or --shard, also write all sharded stations to SI-CORS.crux.",
+        action="store_true",
+    )
+
+    arg_parser.add_argument(
+        "-j",
+        "--jobs",
+        help="Number of worker processes rendering shards (default: number of CPUs).",
+        type=int,
+        default=None,
+    )
+
+    arg_parser.add_argument(
+        "-c",
+        "--compression",
+        help=f"Compress crux files while they are written ({', '.join(compressed.EXTENSIONS)}).",
+        choices=list(compressed.EXTENSIONS),
+        default=None,
+    )
+
+    arg_parser.add_argument(
+        "--background",
+        help="With --compression, compress and write in a background thread while blocks are rendered.",
+        action="store_true",
+    )
+
+    arg_parser.add_argument(
+        "--overwrite",
+        help="What to do with existing crux files: always replace them, never replace them, "
+        "or replace them only if the content changed (default: if-changed).",
+        choices=atomic.OVERWRITE,
+        default="if-changed",
+    )
+
+    arg_parser.add_argument(
+        "-s",
+        "--snapshot",
+        help="Read station data from a local SQLite snapshot (see snapshot.py) instead of the database.",
+        type=str,
+        default=None,
+    )
+
+    arg_parser.add_argument(
+        "--profile",
+        help="Write per-query and per-section timings to this JSON file.",
+        type=str,
+        default=None,
+    )
+
+    arg_parser.add_argument(
+        "--profile_dump",
+        help="With --profile, also write cProfile statistics to this file.",
+        type=str,
+        default=None,
+    )
+
+    arg_parser.add_argument(
+        "--metrics",
+        help="Write run metrics (queries, rows, bytes, throughput, peak RSS) to this Prometheus textfile-collector file.",
+        type=str,
+        default=None,
+    )
+
+    arg_parser.add_argument(
+        "--metrics_json",
+        help="Write the same run metrics as a JSON summary to this file.",
+        type=str,
+        default=None,
+    )
+
     input_arguments = arg_parser.parse_args()
 
-    get_crux_file(save_dir=input_arguments.out_dir)
+    shard_patterns = {}
+    for shard in input_arguments.shard:
+        name, _, pattern = shard.partition("=")
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            print(f"Invalid regular expression for shard {name}: {e}")
+            sys.exit(-1)
+        shard_patterns[name] = pattern
+
+    # only collected when requested; without a collector no output bytes are counted
+    if input_arguments.metrics or input_arguments.metrics_json:
+        metrics.start("db2crux")
+
+    if input_arguments.profile:
+        profiling.start(input_arguments.profile_dump)
+
+    get_crux_file(
+        save_dir=input_arguments.out_dir,
+        refresh=input_arguments.refresh,
+        snapshot_file=input_arguments.snapshot,
+        since=input_arguments.since,
+        by_country=input_arguments.by_country,
+        shard_patterns=shard_patterns,
+        merge=input_arguments.merge,
+        jobs=input_arguments.jobs,
+        compression=input_arguments.compression,
+        background=input_arguments.background,
+        overwrite=input_arguments.overwrite,
+    )
+
+    if input_arguments.profile:
+        profiling.stop(input_arguments.profile)
+
+    metrics.stop(input_arguments.metrics, input_arguments.metrics_json)
@@ -1,77 +1,96 @@
 import argparse
-import configparser
 import datetime
+import functools
 import os
+import shutil
 import string
 import sys
-import urllib.request
+import time
 
-try:
-    import psycopg2
-    import psycopg2.extensions
-    from psycopg2.extras import NamedTupleCursor
-except ModuleNotFoundError:
-    print("Module psycopg2 not installed. pip install psycopg2")
-    sys.exit(-1)
+from signalpy_metapodatkovna_baza import (
+    atomic,
+    manifest,
+    metrics,
+    profiling,
+    queries,
+    sitelog,
+    templates,
+)
+from signalpy_metapodatkovna_baza.database import connect, execute_query
 
-from signalpy_metapodatkovna_baza import queries, templates
+# hours a downloaded antenna.gra is used before it is fetched again; IGS updates it a few times a year
+GRA_MAX_AGE = 24.0
 
 
-def execute_query(db_connection: psycopg2.extensions.connection, q: str, v: tuple):
-    cur = db_connection.cursor(
-        cursor_factory=NamedTupleCursor
-    )  # type: psycopg2.extensions.cursor
-    cur.execute(q, v)
-    results = cur.fetchall()
-    cur.close()
-
-    return results
-
-
-def download_antenna_gra() -> None:
+def download_antenna_gra(max_age: float = 0) -> bool:
+    # returns whether a new copy was downloaded
     directory = os.path.dirname(os.path.realpath(__file__))
     # TODO: kam se zapise gra file (mora se v data folder)
     #  https://stackoverflow.com/questions/4519127/setuptools-package-data-folder-location
+    file_path = os.path.join(directory, "antenna.gra")
+
+    # max_age in hours, 0 always downloads
+    if (
+        max_age
+        and os.path.exists(file_path)
+        and time.time() - os.path.getmtime(file_path) < max_age * 3600
+    ):
+        return False
 
+    # slow to import, so only loaded when the file is fetched
+    import http.client
+    import urllib.request
+
+    # a failed or interrupted download leaves the previous copy in place
     try:
-        urllib.request.urlretrieve(
-            url="https://files.igs.org/pub/station/general/antenna.gra",
-            filename=os.path.join(directory, "antenna.gra"),
-        )
-    except Exception:
-        pass
+        with urllib.request.urlopen(
+            "https://files.igs.org/pub/station/general/antenna.gra", timeout=60
+        ) as response, atomic.AtomicWriter(file_path) as f:
+            shutil.copyfileobj(response, f)
+    except (OSError, http.client.HTTPException) as e:
+        print(f"Failed to download antenna.gra: {e}")
+        return False
 
+    read_antenna_gra.cache_clear()
 
-def get_antenna_graphic(antenna_igs_name: str, gra_file: str) -> str:
-    graphic = ""
-    header = ""
+    return True
 
-    antenna_not_found = False
 
-    line = ""
+@functools.lru_cache(maxsize=None)
+def read_antenna_gra(gra_file: str) -> dict:
+    # antenna name -> (header line, graphic); every name in a block of header lines shares the graphic below it
+    graphics = {}
+
+    headers = []
+    graphic = ""
     with open(gra_file, "r", encoding="utf-8") as f:
-        while antenna_igs_name not in line:
-            line = f.readline()
+        for line in f:
             if "Machine-readable quick reference section begins here." in line:
-                antenna_not_found = True
                 break
-        else:
-            header = line
 
-            while line[0] in string.ascii_uppercase or line == "\n":
-                line = f.readline()
+            if line[0] in string.ascii_uppercase + string.digits:
+                if graphic:
+                    for h in headers:
+                        graphics.setdefault(h.strip(), (h, graphic))
+                    headers = []
+                    graphic = ""
+                headers.append(line)
+            elif headers and (graphic or line != "\n"):
+                graphic += line
 
-            graphic += line
+    for h in headers:
+        graphics.setdefault(h.strip(), (h, graphic))
 
-            line = f.readline()
-            while line[0] not in string.ascii_uppercase:
-                graphic += line
-                line = f.readline()
+    return graphics
 
-    if not antenna_not_found:
-        return (header + "\n" + graphic).rstrip() + "\n"
 
-    return antenna_igs_name + "\n" + "Antenna not found in antennas.gra.\n\n"
+def get_antenna_graphic(antenna_igs_name: str, gra_file: str) -> str:
+    try:
+        header, graphic = read_antenna_gra(gra_file)[antenna_igs_name]
+    except KeyError:
+        return antenna_igs_name + "\n" + "Antenna not found in antennas.gra.\n\n"
+
+    return (header + "\n" + graphic).rstrip() + "\n"
 
 
 def get_antenna_graphic_abbreviation_list(antennas_graphic: str) -> str:
@@ -112,37 +131,36 @@ def get_antenna_graphic_abbreviation_list(antennas_graphic: str) -> str:
     return abbreviations
 
 
-def make_log_file(nine_char_id, save_dir="", prepared_by="", is_new=False):
+def get_log_file_name(nine_char_id: str, date_prepared: datetime.datetime) -> str:
+    return f"{nine_char_id}_{date_prepared.year}{date_prepared.month:02d}{date_prepared.day:02d}.log"
 
-    header = templates.Header(site_name=nine_char_id)
 
-    form = templates.Form(
-        prepared_by=prepared_by,
-        date_prepared=datetime.datetime.now(),
-        report_type="UPDATE" if not is_new else "NEW",
-        previous_site_log="vnesi rocno" if not is_new else "",
-        modified_added_sections="vnesi rocno" if not is_new else "",
+def find_previous_log(save_dir: str, nine_char_id: str, exclude: str = None):
+    # log file names end with the date prepared, so the newest log of a station sorts last
+    logs = sorted(
+        name
+        for name in os.listdir(save_dir or ".")
+        if name.startswith(nine_char_id + "_")
+        and name.endswith(".log")
+        and name != exclude
     )
 
-    # --- CONNECT TO DATABASE ---
-    database_config = configparser.ConfigParser()
-    database_config.read("database.ini")
-    # TODO database.ini kot vhodni parameter skripte
-    connection_settings = {
-        "host": database_config.get("connection_settings", "host"),
-        "port": database_config.get("connection_settings", "port"),
-        "database": database_config.get("connection_settings", "database_name"),
-        "user": database_config.get("connection_settings", "username"),
-        "password": database_config.get("connection_settings", "password"),
-    }
-    try:
-        db_connection = psycopg2.connect(
-            **connection_settings
-        )  # type: psycopg2.extensions.connection
-    except psycopg2.OperationalError as e:
-        print(f"Failed to connect to database: {e}")
-        sys.exit(-1)
+    return os.path.join(save_dir, logs[-1]) if logs else None
+
+
+def read_section_hashes(file_path: str) -> dict:
+    with open(file_path, "r", encoding="UTF-8", errors="replace") as f:
+        return sitelog.get_section_hashes(f)
+
 
+def get_modified_sections(previous_hashes: dict, hashes: dict) -> list:
+    # changed or added sections in log order, then removed ones
+    return [s for s, h in hashes.items() if previous_hashes.get(s) != h] + [
+        s for s in previous_hashes if s not in hashes
+    ]
+
+
+def get_station_data(db_connection, nine_char_id: str):
     # --- EXECUTE ALL QUERIES ---
     # station info query
     var = (nine_char_id,)
@@ -153,8 +171,7 @@ def make_log_file(nine_char_id, save_dir="", prepared_by="", is_new=False):
     try:
         var = (station_info_qr[0].station_id,)
     except IndexError:
-        print(f"Station {nine_char_id} does not exist.")
-        sys.exit(-1)
+        return None
 
     coordinates_qr = execute_query(db_connection, queries.station_coordinates, var)
 
@@ -284,8 +301,58 @@ def make_log_file(nine_char_id, save_dir="", prepared_by="", is_new=False):
         db_connection, queries.more_information, var
     )
 
-    db_connection.close()
+    return get_station_data_from_query(
+        station_info_qr,
+        coordinates_qr,
+        receiver_log_qr,
+        antenna_log_qr,
+        local_ties_qr,
+        frequency_standard_log_qr,
+        collocation_information_log_qr,
+        humidity_sensor_log_qr,
+        pressure_sensor_log_qr,
+        temperature_sensor_log_qr,
+        water_vapor_radiometer_log_qr,
+        other_meteorological_instrumentation_log_qr,
+        radio_interference_log_qr,
+        multipath_source_log_qr,
+        signal_obstruction_log_qr,
+        local_episodic_effect_log_qr,
+        point_of_contact_agency_log_qr,
+        point_of_contact_agency_primary_contact_qr,
+        point_of_contact_agency_secondary_contact_qr,
+        responsible_agency_log_qr,
+        responsible_agency_primary_contact_qr,
+        responsible_agency_secondary_contact_qr,
+        more_information_log_qr,
+    )
+
 
+def get_station_data_from_query(
+    station_info_qr,
+    coordinates_qr,
+    receiver_log_qr,
+    antenna_log_qr,
+    local_ties_qr,
+    frequency_standard_log_qr,
+    collocation_information_log_qr,
+    humidity_sensor_log_qr,
+    pressure_sensor_log_qr,
+    temperature_sensor_log_qr,
+    water_vapor_radiometer_log_qr,
+    other_meteorological_instrumentation_log_qr,
+    radio_interference_log_qr,
+    multipath_source_log_qr,
+    signal_obstruction_log_qr,
+    local_episodic_effect_log_qr,
+    point_of_contact_agency_log_qr,
+    point_of_contact_agency_primary_contact_qr,
+    point_of_contact_agency_secondary_contact_qr,
+    responsible_agency_log_qr,
+    responsible_agency_primary_contact_qr,
+    responsible_agency_secondary_contact_qr,
+    more_information_log_qr,
+):
     # --- QUERIES TO TEMPLATES ---
     station_info = templates.Site.from_query(station_info_qr, coordinates_qr)
 
@@ -406,136 +473,300 @@ def make_log_file(nine_char_id, save_dir="", prepared_by="", is_new=False):
 
     more_information = templates.MoreInformation.from_query(more_information_log_qr)
 
+    return {
+        "station_id": station_info_qr[0].station_id,
+        "nine_char_id": station_info_qr[0].nine_char_id,
+        "country_iso3_code": station_info_qr[0].country_iso3_code,
+        "station_info": station_info,
+        "receivers": receivers,
+        "antennas": antennas,
+        "local_ties": local_ties,
+        "frequency_standards": frequency_standards,
+        "collocations": collocations,
+        "humidity_sensors": humidity_sensors,
+        "pressure_sensors": pressure_sensors,
+        "temperature_sensors": temperature_sensors,
+        "water_vapor_radiometers": water_vapor_radiometers,
+        "other_meteorological_instrumentation": other_meteorological_instrumentation,
+        "radio_interferences": radio_interferences,
+        "multipath_sources": multipath_sources,
+        "signal_obstructions": signal_obstructions,
+        "local_episodic_effects": local_episodic_effects,
+        "point_of_contact_agency": point_of_contact_agency,
+        "responsible_agency": responsible_agency,
+        "more_information": more_information,
+    }
+
+
+def get_log_text(header, form, data, gra_file="antenna.gra") -> str:
     antennas_graphic = ""
-    for antenna in antennas:
-        antennas_graphic += (
-            get_antenna_graphic(antenna.antenna_type.rstrip(), "antenna.gra") + "\n\n"
-        )
+    for antenna in data["antennas"]:
+        with profiling.stage("antenna_graphic", antenna.antenna_type.rstrip()):
+            antennas_graphic += (
+                get_antenna_graphic(antenna.antenna_type.rstrip(), gra_file) + "\n\n"
+            )
 
     abbreviations = get_antenna_graphic_abbreviation_list(antennas_graphic)
 
-    # --- WRITE LOG FILE ---
-    log_file_name = f"{nine_char_id}_{form.date_prepared.year}{form.date_prepared.month:02d}{form.date_prepared.day:02d}.log"
+    o = []
+
+    # write header
+    o.append(header.to_txt())
+
+    # write 0. Form
+    o.append(form.to_txt())
+
+    # write 1.   Site Identification of the GNSS Monument and 2.   Site Location Information
+    o.append(data["station_info"].print_to_log())
+
+    # write 3.   GNSS Receiver Information
+    o.append(templates.get_title(3))
+    for r in data["receivers"]:
+        o.append(r.print_to_log())
+    o.append(templates.Receiver.print_blank_to_log())
+
+    # write 4.   GNSS Antenna Information
+    o.append(templates.get_title(4))
+    for a in data["antennas"]:
+        o.append(a.print_to_log())
+    o.append(templates.Antenna.print_blank_to_log())
+
+    # write 5.   Surveyed Local Ties
+    o.append(templates.get_title(5))
+    for lt in data["local_ties"]:
+        o.append(lt.print_to_log())
+    o.append(templates.LocalTie.print_blank_to_log())
+
+    # write 6.   Frequency Standard
+    o.append(templates.get_title(6))
+    for fs in data["frequency_standards"]:
+        o.append(fs.print_to_log())
+    o.append(templates.FrequencyStandard.print_blank_to_log())
+
+    # write 7.   Collocation Information
+    o.append(templates.get_title(7))
+    for c in data["collocations"]:
+        o.append(c.print_to_log())
+    o.append(templates.CollocationInformation.print_blank_to_log())
+
+    # write 8.   Meteorological Instrumentation
+    # write 8.1 Humidity Sensor Model
+    o.append(templates.get_title(8))
+    for hs in data["humidity_sensors"]:
+        o.append(hs.print_to_log())
+    o.append(templates.HumiditySensor.print_blank_to_log())
+
+    # write 8.2 Pressure Sensor Model
+    for ps in data["pressure_sensors"]:
+        o.append(ps.print_to_log())
+    o.append(templates.PressureSensor.print_blank_to_log())
+
+    # write 8.3 Temp. Sensor Model
+    for ts in data["temperature_sensors"]:
+        o.append(ts.print_to_log())
+    o.append(templates.TemperatureSensor.print_blank_to_log())
+
+    # write 8.4 Water Vapor Radiometer
+    for wvr in data["water_vapor_radiometers"]:
+        o.append(wvr.print_to_log())
+    o.append(templates.WaterVaporRadiometer.print_blank_to_log())
+
+    # write 8.5 Other Instrumentation
+    o.append(templates.OtherMeteorologicalInstrumentation.print_blank_to_log())
+
+    # write 9.  Local Ongoing Conditions Possibly Affecting Computed Position
+    # write 9.1 Radio Interferences
+    o.append(templates.get_title(9))
+    for ri in data["radio_interferences"]:
+        o.append(ri.to_txt())
+    o.append(templates.RadioInterference.blank_entry())
+
+    # write 9.2 Multipath Sources
+    for ms in data["multipath_sources"]:
+        o.append(ms.print_to_log())
+    o.append(templates.MultipathSource.print_blank_to_log())
+
+    # write 9.3 Signal Obstructions
+    for so in data["signal_obstructions"]:
+        o.append(so.to_txt())
+    o.append(templates.SignalObstruction.blank_entry())
+
+    # write 10.  Local Episodic Effects Possibly Affecting Data Quality
+    o.append(templates.get_title(10))
+    for lee in data["local_episodic_effects"]:
+        o.append(lee.print_to_log())
+    o.append(templates.LocalEpisodicEffect.print_blank_to_log())
+
+    # write 11.   On-Site, Point of Contact Agency Information
+    o.append(templates.get_title(11))
+    o.append(data["point_of_contact_agency"].print_to_log())
+
+    # write 12.  Responsible Agency
+    o.append(templates.get_title(12))
+    o.append(data["responsible_agency"].print_to_log())
+
+    # write 13.  More Information
+    o.append(templates.get_title(13))
+    o.append(data["more_information"].print_to_log())
+    o.append(antennas_graphic)
+    o.append(abbreviations)
+
+    return "".join(o)
+
+
+def get_form(prepared_by="", is_new=False) -> templates.Form:
+    return templates.Form(
+        prepared_by=prepared_by,
+        date_prepared=datetime.datetime.now(),
+        report_type="UPDATE" if not is_new else "NEW",
+        previous_site_log="vnesi rocno" if not is_new else "",
+        modified_added_sections="vnesi rocno" if not is_new else "",
+    )
+
+
+def make_log_file(
+    nine_char_id,
+    save_dir="",
+    prepared_by="",
+    is_new=False,
+    db_connection=None,
+    snapshot_file=None,
+    overwrite="always",
+):
+
+    header = templates.Header(site_name=nine_char_id)
+
+    form = get_form(prepared_by, is_new)
 
-    while not os.path.exists(save_dir):
-        save_dir = input(
-            "Save directory does not exist. Enter existing directory or press X to exit.\n"
+    # --- CONNECT TO DATABASE ---
+    # TODO database.ini kot vhodni parameter skripte
+    close_connection = db_connection is None
+    if db_connection is None:
+        db_connection = connect("database.ini", snapshot_file)
+
+    data = get_station_data(db_connection, nine_char_id)
+
+    if close_connection:
+        db_connection.close()
+
+    if data is None:
+        print(f"Station {nine_char_id} does not exist.")
+        sys.exit(-1)
+
+    log_manifest = manifest.Manifest(save_dir or ".")
+    file_path = write_log_file(
+        nine_char_id,
+        data,
+        header,
+        form,
+        save_dir,
+        is_new,
+        overwrite,
+        log_manifest=log_manifest,
+    )
+
+    if file_path:
+        log_manifest.add(
+            file_path, manifest.get_source_fingerprint(data), station=nine_char_id
         )
-        if save_dir.lower() == "x":
-            print(f"Log file {log_file_name} was not saved.")
-            sys.exit(-1)
+        log_manifest.write()
+
+
+def render_log(
+    nine_char_id: str,
+    data: dict,
+    header: templates.Header,
+    form: templates.Form,
+    save_dir: str = "",
+    is_new: bool = False,
+    gra_file: str = "antenna.gra",
+) -> tuple:
+    # file name and text of the station's log; for an update, 0. Form is filled from the previous log in save_dir
+    log_file_name = get_log_file_name(nine_char_id, form.date_prepared)
+    text = get_log_text(header, form, data, gra_file)
+
+    # --- COMPARE WITH THE PREVIOUS LOG ---
+    with profiling.stage("compare", log_file_name):
+        previous_log = find_previous_log(save_dir, nine_char_id, exclude=log_file_name)
+        if previous_log and not is_new:
+            hashes = sitelog.get_section_hashes(text.splitlines())
+            form_text = form.to_txt()
+            form.previous_site_log = os.path.basename(previous_log)
+            form.modified_added_sections = ", ".join(
+                get_modified_sections(read_section_hashes(previous_log), hashes)
+            )
+            text = text.replace(form_text, form.to_txt(), 1)
+
+    return log_file_name, text
+
+
+def write_log_file(
+    nine_char_id: str,
+    data: dict,
+    header: templates.Header,
+    form: templates.Form,
+    save_dir: str = "",
+    is_new: bool = False,
+    overwrite: str = "always",
+    gra_file: str = "antenna.gra",
+    log_manifest: manifest.Manifest = None,
+):
+    # returns the station's current log file, None if it was not rendered
+    # --- WRITE LOG FILE ---
+    log_file_name = get_log_file_name(nine_char_id, form.date_prepared)
+
+    if save_dir and not os.path.exists(save_dir):
+        os.makedirs(save_dir)
 
     file_path = os.path.join(save_dir, log_file_name)
 
-    if os.path.exists(file_path):
-        overwrite = input("File already exists. Overwrite? Y = yes, N = no\n")
-        if overwrite.lower() == "n":
-            print(f"Log file {log_file_name} was not saved.")
-
-    with open(file_path, "w", encoding="UTF-8") as o:
-        # write header
-        o.writelines(header.to_txt())
-
-        # write 0. Form
-        o.writelines(form.to_txt())
-
-        # write 1.   Site Identification of the GNSS Monument and 2.   Site Location Information
-        o.writelines(station_info.print_to_log())
-
-        # write 3.   GNSS Receiver Information
-        o.writelines(templates.get_title(3))
-        for r in receivers:
-            o.writelines(r.print_to_log())
-        o.writelines(templates.Receiver.print_blank_to_log())
-
-        # write 4.   GNSS Antenna Information
-        o.writelines(templates.get_title(4))
-        for a in antennas:
-            o.writelines(a.print_to_log())
-        o.writelines(templates.Antenna.print_blank_to_log())
-
-        # write 5.   Surveyed Local Ties
-        o.writelines(templates.get_title(5))
-        for lt in local_ties:
-            o.writelines(lt.print_to_log())
-        o.writelines(templates.LocalTie.print_blank_to_log())
-
-        # write 6.   Frequency Standard
-        o.writelines(templates.get_title(6))
-        for fs in frequency_standards:
-            o.writelines(fs.print_to_log())
-        o.writelines(templates.FrequencyStandard.print_blank_to_log())
-
-        # write 7.   Collocation Information
-        o.writelines(templates.get_title(7))
-        for c in collocations:
-            o.writelines(c.print_to_log())
-        o.writelines(templates.CollocationInformation.print_blank_to_log())
-
-        # write 8.   Meteorological Instrumentation
-        # write 8.1 Humidity Sensor Model
-        o.writelines(templates.get_title(8))
-        for hs in humidity_sensors:
-            o.writelines(hs.print_to_log())
-        o.writelines(templates.HumiditySensor.print_blank_to_log())
-
-        # write 8.2 Pressure Sensor Model
-        for ps in pressure_sensors:
-            o.writelines(ps.print_to_log())
-        o.writelines(templates.PressureSensor.print_blank_to_log())
-
-        # write 8.3 Temp. Sensor Model
-        for ts in temperature_sensors:
-            o.writelines(ts.print_to_log())
-        o.writelines(templates.TemperatureSensor.print_blank_to_log())
-
-        # write 8.4 Water Vapor Radiometer
-        for wvr in water_vapor_radiometers:
-            o.writelines(wvr.print_to_log())
-        o.writelines(templates.WaterVaporRadiometer.print_blank_to_log())
-
-        # write 8.5 Other Instrumentation
-        o.writelines(templates.OtherMeteorologicalInstrumentation.print_blank_to_log())
-
-        # write 9.  Local Ongoing Conditions Possibly Affecting Computed Position
-        # write 9.1 Radio Interferences
-        o.writelines(templates.get_title(9))
-        for ri in radio_interferences:
-            o.writelines(ri.to_txt())
-        o.writelines(templates.RadioInterference.blank_entry())
-
-        # write 9.2 Multipath Sources
-        for ms in multipath_sources:
-            o.writelines(ms.print_to_log())
-        o.writelines(templates.MultipathSource.print_blank_to_log())
-
-        # write 9.3 Signal Obstructions
-        for so in signal_obstructions:
-            o.writelines(so.to_txt())
-        o.writelines(templates.SignalObstruction.blank_entry())
-
-        # write 10.  Local Episodic Effects Possibly Affecting Data Quality
-        o.writelines(templates.get_title(10))
-        for lee in local_episodic_effects:
-            o.writelines(lee.print_to_log())
-        o.writelines(templates.LocalEpisodicEffect.print_blank_to_log())
-
-        # write 11.   On-Site, Point of Contact Agency Information
-        o.writelines(templates.get_title(11))
-        o.writelines(point_of_contact_agency.print_to_log())
-
-        # write 12.  Responsible Agency
-        o.writelines(templates.get_title(12))
-        o.writelines(responsible_agency.print_to_log())
-
-        # write 13.  More Information
-        o.writelines(templates.get_title(13))
-        o.writelines(more_information.print_to_log())
-        o.write(antennas_graphic)
-        o.write(abbreviations)
+    if atomic.keep_existing(file_path, overwrite):
+        print(f"Log file {log_file_name} not saved, existing file kept.")
+        return None
+
+    # today's log if it was already written, else the previous one
+    latest_log = (
+        file_path
+        if os.path.exists(file_path)
+        else find_previous_log(save_dir, nine_char_id, exclude=log_file_name)
+    )
+
+    # a log rendered from the same database content, per the manifest, is not rendered again
+    if overwrite == "if-changed" and latest_log:
+        if log_manifest is None:
+            log_manifest = manifest.Manifest(save_dir or ".")
+        if log_manifest.is_current(latest_log, manifest.get_source_fingerprint(data)):
+            print(
+                f"Log file {log_file_name} not saved, station {nine_char_id} unchanged."
+            )
+            return latest_log
+
+    log_file_name, text = render_log(
+        nine_char_id, data, header, form, save_dir, is_new, gra_file
+    )
+
+    # --- COMPARE WITH THE LATEST LOG ---
+    with profiling.stage("compare", log_file_name):
+        hashes = sitelog.get_section_hashes(text.splitlines())
+        latest_hashes = read_section_hashes(latest_log) if latest_log else None
+
+    if latest_hashes == hashes:
+        print(f"Log file {log_file_name} not saved, station {nine_char_id} unchanged.")
+        return latest_log
+
+    with profiling.stage("write", log_file_name):
+        written = atomic.write_file(file_path, text, overwrite)
+
+    if not written:
+        print(f"Log file {log_file_name} not saved, existing file kept.")
+        return file_path
+
+    metrics.written(text)
 
     print(f"Log file {log_file_name} successfully saved.")
 
+    return file_path
+
 
 if __name__ == "__main__":
 
@@ -570,10 +801,76 @@ if __name__ == "__main__":
         action="store_true",
     )
 
+    arg_parser.add_argument(
+        "--overwrite",
+        help="What to do with an existing log file: always replace it, never replace it, "
+        "or replace it only if the content changed (default: if-changed).",
+        choices=atomic.OVERWRITE,
+        default="if-changed",
+    )
+
+    arg_parser.add_argument(
+        "--gra_max_age",
+        help="Download antenna.gra only if the local copy is older than this many hours "
+        "(default: 24, 0 always downloads).",
+        type=float,
+        default=GRA_MAX_AGE,
+    )
+
+    arg_parser.add_argument(
+        "--offline",
+        help="Do not download antenna.gra, use the local copy.",
+        action="store_true",
+    )
+
+    arg_parser.add_argument(
+        "-s",
+        "--snapshot",
+        help="Read station data from a local SQLite snapshot (see snapshot.py) instead of the database.",
+        type=str,
+        default=None,
+    )
+
+    arg_parser.add_argument(
+        "--profile",
+        help="Write per-query and per-section timings to this JSON file.",
+        type=str,
+        default=None,
+    )
+
+    arg_parser.add_argument(
+        "--profile_dump",
+        help="With --profile, also write cProfile statistics to this file.",
+        type=str,
+        default=None,
+    )
+
+    arg_parser.add_argument(
+        "--metrics",
+        help="Write run metrics (queries, rows, bytes, throughput, peak RSS) to this Prometheus textfile-collector file.",
+        type=str,
+        default=None,
+    )
+
+    arg_parser.add_argument(
+        "--metrics_json",
+        help="Write the same run metrics as a JSON summary to this file.",
+        type=str,
+        default=None,
+    )
+
     input_arguments = arg_parser.parse_args()
 
+    # only collected when requested; without a collector no output bytes are counted
+    if input_arguments.metrics or input_arguments.metrics_json:
+        metrics.start("db2log")
+
+    if input_arguments.profile:
+        profiling.start(input_arguments.profile_dump)
+
     # posodobi antenna.gra file
-    download_antenna_gra()
+    if not input_arguments.offline:
+        download_antenna_gra(input_arguments.gra_max_age)
 
     # naredi log-datoteko
     make_log_file(
@@ -581,4 +878,11 @@ if __name__ == "__main__":
         save_dir=input_arguments.out_dir,
         prepared_by=input_arguments.author,
         is_new=input_arguments.new,
+        snapshot_file=input_arguments.snapshot,
+        overwrite=input_arguments.overwrite,
     )
+
+    if input_arguments.profile:
+        profiling.stop(input_arguments.profile)
+
+    metrics.stop(input_arguments.metrics, input_arguments.metrics_json)
@@ -0,0 +1,495 @@
+import argparse
+import datetime
+import io
+import os
+import sys
+import tarfile
+
+from signalpy_metapodatkovna_baza import (
+    atomic,
+    compressed,
+    db2crux,
+    db2log,
+    manifest,
+    metrics,
+    profiling,
+    publish,
+    queries,
+    templates,
+)
+from signalpy_metapodatkovna_baza.database import connect, execute_query
+
+# per-station query results get_station_data_from_query takes, loaded for the whole network
+NETWORK_QUERIES = {
+    "coordinates": queries.coordinates_all,
+    "receivers": queries.receiver_history_all,
+    "antennas": queries.antenna_history_all,
+    "local_ties": queries.surveyed_local_ties_all,
+    "frequency_standards": queries.frequency_standard_history_all,
+    "collocations": queries.collocation_information_all,
+    "humidity_sensors": queries.humidity_sensor_all,
+    "pressure_sensors": queries.pressure_sensor_all,
+    "temperature_sensors": queries.temperature_sensor_all,
+    "water_vapor_radiometers": queries.water_vapor_radiometer_all,
+    "other_meteorological_instrumentation": queries.other_meteorological_instrumentation_all,
+    "radio_interferences": queries.radio_interference_all,
+    "multipath_sources": queries.multipath_source_all,
+    "signal_obstructions": queries.signal_obstruction_all,
+    "local_episodic_effects": queries.local_episodic_effect_all,
+    "agencies": queries.agency_all,
+    "more_information": queries.more_information_all,
+}
+
+
+def group_by_station(rows) -> dict:
+    # station_id -> rows, in query order
+    stations = {}
+    for row in rows:
+        stations.setdefault(row.station_id, []).append(row)
+
+    return stations
+
+
+def load_network(db_connection, stations: list = None) -> list:
+    # every table is read once for all stations instead of ~20 queries per station;
+    # stations without current coordinates are left out, like in the crux_export view
+    station_info_qr = execute_query(db_connection, queries.station_data_all, ())
+    if stations:
+        stations = {s.upper() for s in stations}
+        station_info_qr = [s for s in station_info_qr if s.nine_char_id in stations]
+
+    qr = {
+        name: group_by_station(execute_query(db_connection, q, ()))
+        for name, q in NETWORK_QUERIES.items()
+    }
+    contacts = {
+        c.contact_id: [c] for c in execute_query(db_connection, queries.contact_all, ())
+    }
+
+    network = []
+    for si in station_info_qr:
+        rows = {name: qr[name].get(si.station_id, []) for name in NETWORK_QUERIES}
+        if not rows["coordinates"]:
+            continue
+
+        # the responsible agency is read with the same query as the point of contact
+        agency_qr = rows["agencies"]
+        primary_contact_qr = (
+            contacts.get(agency_qr[0].primary_contact_id, []) if agency_qr else None
+        )
+        secondary_contact_qr = (
+            contacts.get(agency_qr[0].secondary_contact_id, []) if agency_qr else None
+        )
+
+        network.append(
+            db2log.get_station_data_from_query(
+                station_info_qr=[si],
+                coordinates_qr=rows["coordinates"],
+                receiver_log_qr=rows["receivers"],
+                antenna_log_qr=rows["antennas"],
+                local_ties_qr=rows["local_ties"],
+                frequency_standard_log_qr=rows["frequency_standards"],
+                collocation_information_log_qr=rows["collocations"],
+                humidity_sensor_log_qr=rows["humidity_sensors"],
+                pressure_sensor_log_qr=rows["pressure_sensors"],
+                temperature_sensor_log_qr=rows["temperature_sensors"],
+                water_vapor_radiometer_log_qr=rows["water_vapor_radiometers"],
+                other_meteorological_instrumentation_log_qr=rows[
+                    "other_meteorological_instrumentation"
+                ],
+                radio_interference_log_qr=rows["radio_interferences"],
+                multipath_source_log_qr=rows["multipath_sources"],
+                signal_obstruction_log_qr=rows["signal_obstructions"],
+                local_episodic_effect_log_qr=rows["local_episodic_effects"],
+                point_of_contact_agency_log_qr=agency_qr,
+                point_of_contact_agency_primary_contact_qr=primary_contact_qr,
+                point_of_contact_agency_secondary_contact_qr=secondary_contact_qr,
+                responsible_agency_log_qr=agency_qr,
+                responsible_agency_primary_contact_qr=primary_contact_qr,
+                responsible_agency_secondary_contact_qr=secondary_contact_qr,
+                more_information_log_qr=rows["more_information"],
+            )
+        )
+
+    return network
+
+
+class LogSink(object):
+    # one site log per station, written like db2log.make_log_file
+    def __init__(
+        self,
+        save_dir: str,
+        prepared_by: str = "",
+        is_new: bool = False,
+        overwrite: str = "always",
+    ):
+        self.save_dir = save_dir
+        self.prepared_by = prepared_by
+        self.is_new = is_new
+        self.overwrite = overwrite
+        self.manifest = manifest.Manifest(save_dir)
+
+    def start(self):
+        os.makedirs(self.save_dir, exist_ok=True)
+
+    def write(self, data: dict):
+        nine_char_id = data["nine_char_id"]
+        file_path = db2log.write_log_file(
+            nine_char_id,
+            data,
+            templates.Header(site_name=nine_char_id),
+            db2log.get_form(self.prepared_by, self.is_new),
+            self.save_dir,
+            self.is_new,
+            self.overwrite,
+            log_manifest=self.manifest,
+        )
+        if file_path:
+            self.manifest.add(
+                file_path, manifest.get_source_fingerprint(data), station=nine_char_id
+            )
+
+    def stop(self):
+        self.manifest.write()
+
+
+class ArchiveSink(object):
+    # all site logs in one tar archive; each log is added as soon as it is rendered
+    def __init__(
+        self,
+        save_dir: str,
+        prepared_by: str = "",
+        is_new: bool = False,
+        compression: str = "gzip",
+        background=False,
+        overwrite: str = "always",
+        file_name: str = "SI-CORS_logs.tar",
+    ):
+        self.file_path = os.path.join(
+            save_dir, file_name + compressed.EXTENSIONS.get(compression, "")
+        )
+        self.save_dir = save_dir
+        self.prepared_by = prepared_by
+        self.is_new = is_new
+        self.writer = atomic.AtomicWriter(
+            self.file_path, overwrite, compression, background, count=metrics.enabled()
+        )
+        self.tar = None
+        self.fingerprints = []
+
+    def start(self):
+        os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+        # stream mode, the archive is never read back or seeked
+        self.tar = tarfile.open(fileobj=self.writer.open(), mode="w|")
+        self.fingerprints = []
+
+    def write(self, data: dict):
+        nine_char_id = data["nine_char_id"]
+        form = db2log.get_form(self.prepared_by, self.is_new)
+        # the same text the log sink writes, with the form filled from the previous log in save_dir
+        log_file_name, text = db2log.render_log(
+            nine_char_id,
+            data,
+            templates.Header(site_name=nine_char_id),
+            form,
+            self.save_dir,
+            self.is_new,
+        )
+        content = text.encode("UTF-8")
+
+        info = tarfile.TarInfo(log_file_name)
+        info.size = len(content)
+        # the day the log is prepared, so an archive of unchanged logs has the same content all day
+        info.mtime = int(
+            datetime.datetime.combine(
+                form.date_prepared.date(), datetime.time()
+            ).timestamp()
+        )
+        info.mode = 0o644
+        self.tar.addfile(info, io.BytesIO(content))
+        self.fingerprints.append(manifest.get_source_fingerprint(data))
+
+    def stop(self):
+        self.tar.close()
+        if not self.writer.close():
+            print(
+                f"Archive {os.path.basename(self.file_path)} not saved, existing file kept."
+            )
+            return
+
+        metrics.file_written(self.writer.bytes_written, len(self.fingerprints))
+        manifest.write_network_file(self.file_path, self.fingerprints)
+        print(f"Archive {os.path.basename(self.file_path)} successfully saved.")
+
+
+class CruxSink(object):
+    # all stations in one crux file, written like db2crux.get_crux_file; each block is written as soon as it is rendered
+    def __init__(
+        self,
+        save_dir: str,
+        file_name: str = "SI-CORS.crux",
+        compression: str = None,
+        background=False,
+        overwrite: str = "always",
+    ):
+        self.file_path = os.path.join(
+            save_dir, file_name + compressed.EXTENSIONS.get(compression, "")
+        )
+        self.writer = atomic.AtomicWriter(
+            self.file_path, overwrite, compression, background, count=metrics.enabled()
+        )
+        self.overwrite = overwrite
+        self.crux = None
+        self.fingerprints = []
+
+    def start(self):
+        os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+        self.crux = self.writer.open()
+        self.fingerprints = []
+        self.crux.write(db2crux.get_crux_header().encode("UTF-8"))
+
+    def write(self, data: dict):
+        crux_data = {
+            "station": data["station_info"],
+            "receivers": data["receivers"],
+            "antennas": data["antennas"],
+            "agency": data["point_of_contact_agency"],
+        }
+        self.crux.write(db2crux.get_crux_block(crux_data).encode("UTF-8"))
+        self.fingerprints.append(manifest.get_source_fingerprint(crux_data))
+
+    def stop(self):
+        written = self.writer.close()
+        if written:
+            metrics.file_written(self.writer.bytes_written, len(self.fingerprints))
+        if written or self.overwrite != "never":
+            manifest.write_network_file(self.file_path, self.fingerprints)
+        db2crux.print_saved(os.path.basename(self.file_path), written)
+
+
+# output formats by name; a sink has start(), write(data) for every station and stop()
+SINKS = {
+    "log": LogSink,
+    "archive": ArchiveSink,
+    "crux": CruxSink,
+}
+
+
+def export(db_connection, sinks: list, stations: list = None) -> int:
+    # one data load, then every station goes through all sinks in a single pass
+    network = load_network(db_connection, stations)
+
+    for sink in sinks:
+        sink.start()
+
+    for data in network:
+        for sink in sinks:
+            with profiling.stage("sink", type(sink).__name__):
+                sink.write(data)
+
+    for sink in sinks:
+        sink.stop()
+
+    return len(network)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+
+    arg_parser.add_argument(
+        "formats",
+        help=f"Output formats ({', '.join(SINKS)}).",
+        nargs="+",
+        choices=list(SINKS),
+    )
+
+    arg_parser.add_argument(
+        "-o",
+        "--out_dir",
+        help="Saving directory. If not set, files are saved in the script directory.",
+        type=str,
+        default=".",
+    )
+
+    arg_parser.add_argument(
+        "--stations",
+        help="Comma separated long station names to export (default: all stations).",
+        type=str,
+        default=None,
+    )
+
+    arg_parser.add_argument(
+        "-a",
+        "--author",
+        help="Value for " "Prepared by" " field in log files.",
+        type=str,
+        default="",
+    )
+
+    arg_parser.add_argument(
+        "-n",
+        "--new",
+        help="If this flag is set, "
+        "Report Type"
+        " field in log files is set to NEW (default: UPDATE).",
+        action="store_true",
+    )
+
+    arg_parser.add_argument(
+        "-c",
+        "--compression",
+        help=f"Compression of the crux file and the log archive ({', '.join(compressed.EXTENSIONS)}). "
+        "The log archive is always compressed, with gzip if not set.",
+        choices=list(compressed.EXTENSIONS),
+        default=None,
+    )
+
+    arg_parser.add_argument(
+        "--background",
+        help="Compress and write in a background thread while stations are rendered.",
+        action="store_true",
+    )
+
+    arg_parser.add_argument(
+        "--overwrite",
+        help="What to do with existing output files: always replace them, never replace them, "
+        "or replace them only if the content changed (default: if-changed).",
+        choices=atomic.OVERWRITE,
+        default="if-changed",
+    )
+
+    arg_parser.add_argument(
+        "--publish",
+        help="After the export, upload the files that changed to this ftp:// or sftp:// directory (see publish.py).",
+        type=str,
+        default=None,
+    )
+
+    arg_parser.add_argument(
+        "--connections",
+        help="With --publish, number of concurrent uploads (default: 4).",
+        type=int,
+        default=4,
+    )
+
+    arg_parser.add_argument(
+        "--gra_max_age",
+        help="Download antenna.gra only if the local copy is older than this many hours "
+        "(default: 24, 0 always downloads).",
+        type=float,
+        default=db2log.GRA_MAX_AGE,
+    )
+
+    arg_parser.add_argument(
+        "--offline",
+        help="Do not download antenna.gra, use the local copy.",
+        action="store_true",
+    )
+
+    arg_parser.add_argument(
+        "-s",
+        "--snapshot",
+        help="Read station data from a local SQLite snapshot (see snapshot.py) instead of the database.",
+        type=str,
+        default=None,
+    )
+
+    arg_parser.add_argument(
+        "--profile",
+        help="Write per-query and per-section timings to this JSON file.",
+        type=str,
+        default=None,
+    )
+
+    arg_parser.add_argument(
+        "--metrics",
+        help="Write run metrics (queries, rows, bytes, throughput, peak RSS) to this Prometheus textfile-collector file.",
+        type=str,
+        default=None,
+    )
+
+    arg_parser.add_argument(
+        "--metrics_json",
+        help="Write the same run metrics as a JSON summary to this file.",
+        type=str,
+        default=None,
+    )
+
+    input_arguments = arg_parser.parse_args()
+
+    # only collected when requested; without a collector no output bytes are counted
+    if input_arguments.metrics or input_arguments.metrics_json:
+        metrics.start("export")
+
+    if input_arguments.profile:
+        profiling.start(None)
+
+    sinks = []
+    formats = list(dict.fromkeys(input_arguments.formats))
+    if ("log" in formats or "archive" in formats) and not input_arguments.offline:
+        # posodobi antenna.gra file
+        db2log.download_antenna_gra(input_arguments.gra_max_age)
+
+    for name in formats:
+        if name == "log":
+            sinks.append(
+                LogSink(
+                    input_arguments.out_dir,
+                    prepared_by=input_arguments.author,
+                    is_new=input_arguments.new,
+                    overwrite=input_arguments.overwrite,
+                )
+            )
+        elif name == "archive":
+            sinks.append(
+                ArchiveSink(
+                    input_arguments.out_dir,
+                    prepared_by=input_arguments.author,
+                    is_new=input_arguments.new,
+                    compression=input_arguments.compression or "gzip",
+                    background=input_arguments.background,
+                    overwrite=input_arguments.overwrite,
+                )
+            )
+        else:
+            sinks.append(
+                SINKS[name](
+                    input_arguments.out_dir,
+                    compression=input_arguments.compression,
+                    background=input_arguments.background,
+                    overwrite=input_arguments.overwrite,
+                )
+            )
+
+    connection = connect("database.ini", input_arguments.snapshot)
+    n = export(
+        connection,
+        sinks,
+        input_arguments.stations.split(",") if input_arguments.stations else None,
+    )
+    connection.close()
+
+    if n == 0:
+        print("No stations to export.")
+        sys.exit(-1)
+
+    print(
+        f"{n} stations exported to {', '.join(dict.fromkeys(input_arguments.formats))}."
+    )
+
+    if input_arguments.profile:
+        profiling.stop(input_arguments.profile)
+
+    metrics.stop(input_arguments.metrics, input_arguments.metrics_json)
+
+    if input_arguments.publish:
+        uploaded, failed = publish.publish(
+            input_arguments.out_dir,
+            input_arguments.publish,
+            input_arguments.connections,
+        )
+        print(
+            f"{len(uploaded)} files published to {publish.get_target_key(input_arguments.publish)}."
+        )
+        if failed:
+            sys.exit(-1)
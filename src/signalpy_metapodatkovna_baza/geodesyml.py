@@ -0,0 +1,519 @@
+import argparse
+import contextlib
+import datetime
+import os
+import sys
+from xml.sax.saxutils import XMLGenerator
+
+from signalpy_metapodatkovna_baza import db2log, profiling, queries
+from signalpy_metapodatkovna_baza.database import connect, execute_query
+from utils import transformations
+
+NAMESPACES = {
+    "xmlns:geo": "urn:xml-gov-au:icsm:egeodesy:0.5",
+    "xmlns:gml": "http://www.opengis.net/gml/3.2",
+    "xmlns:gmd": "http://www.isotc211.org/2005/gmd",
+    "xmlns:gco": "http://www.isotc211.org/2005/gco",
+    "xmlns:xlink": "http://www.w3.org/1999/xlink",
+}
+
+IGS_CODES = "https://files.igs.org/pub/station/general/rcvr_ant.tab"
+ROLE_CODES = (
+    "http://www.isotc211.org/2005/resources/Codelist/gmxCodelists.xml#CI_RoleCode"
+)
+
+
+def xml_value(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, datetime.datetime):
+        return value.strftime("%Y-%m-%dT%H:%M:%SZ")
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+
+    return str(value)
+
+
+class XMLWriter(object):
+    # elements go to the output as soon as they are started/ended, nothing is kept in memory
+    def __init__(self, out, indent: str = "  "):
+        self.xml = XMLGenerator(out, encoding="UTF-8", short_empty_elements=True)
+        self.indent = indent
+        self.depth = 0
+
+    def start_document(self):
+        self.xml.startDocument()
+
+    def end_document(self):
+        self.xml.ignorableWhitespace("\n")
+        self.xml.endDocument()
+
+    def start(self, name: str, attrs: dict = None):
+        if self.depth:
+            self.xml.ignorableWhitespace("\n" + self.indent * self.depth)
+        self.xml.startElement(name, attrs or {})
+        self.depth += 1
+
+    def end(self, name: str):
+        self.depth -= 1
+        self.xml.ignorableWhitespace("\n" + self.indent * self.depth)
+        self.xml.endElement(name)
+
+    @contextlib.contextmanager
+    def element(self, name: str, attrs: dict = None):
+        self.start(name, attrs)
+        yield
+        self.end(name)
+
+    def leaf(self, name: str, value=None, attrs: dict = None):
+        self.xml.ignorableWhitespace("\n" + self.indent * self.depth)
+        self.xml.startElement(name, attrs or {})
+        if value is not None:
+            self.xml.characters(xml_value(value))
+        self.xml.endElement(name)
+
+    def code(self, name: str, value, code_space: str):
+        self.leaf(name, value, {"codeSpace": code_space})
+
+    def string(self, name: str, value):
+        # ISO 19139 wraps every string in gco:CharacterString
+        with self.element(name):
+            self.leaf("gco:CharacterString", value)
+
+
+def write_valid_time(w: XMLWriter, gml_id: str, dates: tuple):
+    with w.element("geo:validTime"):
+        with w.element("gml:TimePeriod", {"gml:id": gml_id}):
+            w.leaf("gml:beginPosition", dates[0])
+            w.leaf("gml:endPosition", dates[1])
+
+
+def write_form(w: XMLWriter, form):
+    with w.element("geo:formInformation"):
+        w.leaf("geo:preparedBy", form.prepared_by)
+        w.leaf("geo:datePrepared", form.date_prepared.date())
+        w.leaf("geo:reportType", form.report_type)
+
+
+def write_site_identification(w: XMLWriter, site):
+    with w.element("geo:siteIdentification"):
+        w.leaf("geo:siteName", site.site_name)
+        w.leaf("geo:fourCharacterID", site.four_char_id)
+        w.leaf("geo:monumentInscription", site.monument_inscription)
+        w.leaf("geo:iersDOMESNumber", site.domes_number)
+        w.leaf("geo:cdpNumber", site.cdp_number)
+        w.code(
+            "geo:monumentDescription",
+            site.monument_description,
+            "eGeodesy/monumentDescription",
+        )
+        w.leaf("geo:heightOfTheMonument", site.monument_height)
+        w.leaf("geo:monumentFoundation", site.monument_foundation)
+        w.leaf("geo:foundationDepth", site.foundation_depth)
+        w.leaf("geo:markerDescription", site.marker_description)
+        w.leaf("geo:dateInstalled", site.date_installed)
+        w.code(
+            "geo:geologicCharacteristic",
+            site.geologic_characteristic,
+            "eGeodesy/geologicCharacteristic",
+        )
+        w.leaf("geo:bedrockType", site.bedrock_type)
+        w.leaf("geo:bedrockCondition", site.bedrock_condition)
+        w.leaf("geo:fractureSpacing", site.fracture_spacing)
+        w.code(
+            "geo:faultZonesNearby", site.fault_zones_nearby, "eGeodesy/faultZonesNearby"
+        )
+        w.leaf("geo:distance-Activity", site.distance_activity)
+        w.leaf("geo:notes", site.additional_information_1)
+
+
+def write_site_location(w: XMLWriter, site, four_char_id: str, country_code: str):
+    xyz = site.position_XYZ
+    llh = transformations.ecef2geodetic(
+        xyz["X"], xyz["Y"], xyz["Z"], unit="deg", ellipsoid=transformations.GRS80
+    )
+    with w.element("geo:siteLocation"):
+        w.leaf("geo:city", site.city)
+        w.leaf("geo:state", site.state)
+        w.code("geo:countryCodeISO", country_code, "urn:iso:std:iso:3166")
+        w.code("geo:tectonicPlate", site.tectonic_plate, "eGeodesy/tectonicPlate")
+        with w.element("geo:approximatePositionITRF"):
+            with w.element("geo:cartesianPosition"):
+                with w.element(
+                    "gml:Point",
+                    {
+                        "gml:id": f"{four_char_id}-itrf-cartesian",
+                        "srsName": "EPSG:7789",
+                    },
+                ):
+                    w.leaf("gml:pos", f"{xyz['X']:.3f} {xyz['Y']:.3f} {xyz['Z']:.3f}")
+            with w.element("geo:geodeticPosition"):
+                with w.element(
+                    "gml:Point",
+                    {"gml:id": f"{four_char_id}-itrf-geodetic", "srsName": "EPSG:7912"},
+                ):
+                    w.leaf(
+                        "gml:pos", f"{llh['lat']:.8f} {llh['lon']:.8f} {llh['h']:.3f}"
+                    )
+        w.leaf("geo:notes", site.additional_information_2)
+
+
+def write_receiver(w: XMLWriter, r, four_char_id: str):
+    with w.element("geo:gnssReceiver"):
+        with w.element(
+            "geo:GnssReceiver", {"gml:id": f"{four_char_id}-receiver-{r.i}"}
+        ):
+            w.leaf("geo:manufacturerSerialNumber", r.serial_number)
+            w.code("geo:igsModelCode", r.receiver_type.rstrip(), IGS_CODES)
+            for system, used in (r.satellite_system or {}).items():
+                if used:
+                    w.code("geo:satelliteSystem", system, "eGeodesy/satelliteSystem")
+            w.leaf(
+                "geo:firmwareVersion",
+                f"{r.receiver_fw_version} / {r.me_fw_version}"
+                if r.me_fw_version
+                else r.receiver_fw_version,
+            )
+            w.leaf("geo:elevationCutoffSetting", r.elevation_cutoff)
+            w.leaf("geo:dateInstalled", r.date_installed)
+            w.leaf("geo:dateRemoved", r.date_removed)
+            w.leaf("geo:temperatureStabilization", r.temperature_stabilization)
+            w.leaf("geo:notes", r.additional_information)
+
+
+def write_antenna(w: XMLWriter, a, four_char_id: str):
+    with w.element("geo:gnssAntenna"):
+        with w.element("geo:GnssAntenna", {"gml:id": f"{four_char_id}-antenna-{a.i}"}):
+            w.leaf("geo:manufacturerSerialNumber", a.serial_number)
+            w.code("geo:igsModelCode", a.antenna_type.rstrip(), IGS_CODES)
+            w.code("geo:antennaReferencePoint", a.arp, "eGeodesy/antennaReferencePoint")
+            w.leaf("geo:marker-arpUpEcc.", a.delta_h)
+            w.leaf("geo:marker-arpNorthEcc.", a.delta_n)
+            w.leaf("geo:marker-arpEastEcc.", a.delta_e)
+            w.leaf("geo:alignmentFromTrueNorth", a.alignment)
+            w.code("geo:antennaRadomeType", a.radome_type, IGS_CODES)
+            w.leaf("geo:radomeSerialNumber", a.radome_serial_number)
+            w.leaf("geo:antennaCableType", a.cable_type)
+            w.leaf("geo:antennaCableLength", a.cable_length)
+            w.leaf("geo:dateInstalled", a.date_installed)
+            w.leaf("geo:dateRemoved", a.date_removed)
+            w.leaf("geo:notes", a.additional_information)
+
+
+def write_local_tie(w: XMLWriter, t, four_char_id: str):
+    with w.element("geo:surveyedLocalTie"):
+        with w.element(
+            "geo:SurveyedLocalTie", {"gml:id": f"{four_char_id}-local-tie-{t.i}"}
+        ):
+            w.leaf("geo:tiedMarkerName", t.tied_marker_name)
+            w.leaf("geo:tiedMarkerUsage", t.tied_marker_usage)
+            w.leaf("geo:tiedMarkerCDPNumber", t.tied_marker_cdp_number)
+            w.leaf("geo:tiedMarkerDOMESNumber", t.tied_marker_domes_number)
+            with w.element("geo:differentialComponentsGNSSMarkerToTiedMonumentITRS"):
+                w.leaf("geo:dx", t.dx)
+                w.leaf("geo:dy", t.dy)
+                w.leaf("geo:dz", t.dz)
+            w.leaf("geo:localSiteTiesAccuracy", t.accuracy)
+            w.leaf("geo:surveyMethod", t.survey_method)
+            w.leaf("geo:dateMeasured", t.date_measured)
+            w.leaf("geo:notes", t.additional_information)
+
+
+def write_frequency_standard(w: XMLWriter, f, four_char_id: str):
+    gml_id = f"{four_char_id}-frequency-standard-{f.i}"
+    with w.element("geo:frequencyStandard"):
+        with w.element("geo:FrequencyStandard", {"gml:id": gml_id}):
+            w.code("geo:standardType", f.standard_type, "eGeodesy/standardType")
+            w.leaf("geo:inputFrequency", f.input_frequency)
+            write_valid_time(w, f"{gml_id}-time", f.effective_dates)
+            w.leaf("geo:notes", f.notes)
+
+
+def write_collocation(w: XMLWriter, c, four_char_id: str):
+    gml_id = f"{four_char_id}-collocation-{c.i}"
+    with w.element("geo:collocationInformation"):
+        with w.element("geo:CollocationInformation", {"gml:id": gml_id}):
+            w.code(
+                "geo:instrumentationType",
+                c.instrumentation_type,
+                "eGeodesy/instrumentationType",
+            )
+            w.code("geo:status", c.status, "eGeodesy/status")
+            write_valid_time(w, f"{gml_id}-time", c.effective_dates)
+            w.leaf("geo:notes", c.notes)
+
+
+def write_sensor(w: XMLWriter, s, four_char_id: str, name: str, accuracy: str):
+    # humidity, pressure and temperature sensors and water vapor radiometers share most fields
+    gml_id = f"{four_char_id}-{name}-{s.i}"
+    with w.element(f"geo:{name[0].lower()}{name[1:]}"):
+        with w.element(f"geo:{name}", {"gml:id": gml_id}):
+            w.code("geo:type", s.sensor_model, f"eGeodesy/{name}")
+            w.leaf("geo:manufacturer", s.manufacturer)
+            w.leaf("geo:serialNumber", s.serial_number)
+            w.leaf("geo:heightDiffToAntenna", s.delta_h)
+            w.leaf("geo:calibrationDate", s.calibration_date)
+            write_valid_time(w, f"{gml_id}-time", s.effective_dates)
+            if hasattr(s, "data_sampling_interval"):
+                w.leaf("geo:dataSamplingInterval", s.data_sampling_interval)
+            if accuracy:
+                w.leaf(f"geo:{accuracy}", s.accuracy)
+            if hasattr(s, "aspiration"):
+                w.leaf("geo:aspiration", s.aspiration)
+            if hasattr(s, "distance_to_antenna"):
+                w.leaf("geo:distanceToAntenna", s.distance_to_antenna)
+            w.leaf("geo:notes", s.notes)
+
+
+def write_condition(w: XMLWriter, c, four_char_id: str, name: str):
+    # radio interferences, multipath sources and signal obstructions
+    gml_id = f"{four_char_id}-{name}-{c.i}"
+    with w.element(f"geo:{name[0].lower()}{name[1:]}"):
+        with w.element(f"geo:{name}", {"gml:id": gml_id}):
+            w.leaf("geo:possibleProblemSource", c.source)
+            write_valid_time(w, f"{gml_id}-time", c.effective_dates)
+            if hasattr(c, "observed_degradations"):
+                w.leaf("geo:observedDegradation", c.observed_degradations)
+            w.leaf("geo:notes", c.additional_information)
+
+
+def write_contact(w: XMLWriter, agency, contact: int, role: str):
+    # one CI_ResponsibleParty per contact person (1 = primary, 2 = secondary)
+    with w.element("gmd:CI_ResponsibleParty"):
+        w.string("gmd:individualName", getattr(agency, f"contact_name_{contact}"))
+        w.string("gmd:organisationName", agency.agency)
+        w.string("gmd:positionName", agency.abbreviation)
+        with w.element("gmd:contactInfo"):
+            with w.element("gmd:CI_Contact"):
+                with w.element("gmd:phone"):
+                    with w.element("gmd:CI_Telephone"):
+                        w.string(
+                            "gmd:voice",
+                            getattr(agency, f"telephone_primary_{contact}"),
+                        )
+                        w.string(
+                            "gmd:voice",
+                            getattr(agency, f"telephone_secondary_{contact}"),
+                        )
+                        w.string("gmd:facsimile", getattr(agency, f"fax_{contact}"))
+                with w.element("gmd:address"):
+                    with w.element("gmd:CI_Address"):
+                        w.string("gmd:deliveryPoint", agency.address)
+                        w.string(
+                            "gmd:electronicMailAddress",
+                            getattr(agency, f"email_{contact}"),
+                        )
+        with w.element("gmd:role"):
+            w.leaf(
+                "gmd:CI_RoleCode",
+                role,
+                {"codeList": ROLE_CODES, "codeListValue": role},
+            )
+
+
+def write_more_information(w: XMLWriter, m, antennas: list, gra_file: str):
+    with w.element("geo:moreInformation"):
+        w.leaf("geo:dataCenter", m.primary_data_center)
+        w.leaf("geo:dataCenter", m.secondary_data_center)
+        w.leaf("geo:urlForMoreInformation", m.url_more_info)
+        w.leaf("geo:siteMap", m.site_map)
+        w.leaf("geo:siteDiagram", m.site_diagram)
+        w.leaf("geo:horizonMask", m.horizon_mask)
+        w.leaf("geo:monumentDescription", m.monument_description)
+        w.leaf("geo:sitePictures", m.site_pictures)
+        w.leaf("geo:notes", m.additional_information)
+        w.leaf(
+            "geo:antennaGraphicsWithDimensions",
+            "\n".join(
+                db2log.get_antenna_graphic(a.antenna_type.rstrip(), gra_file)
+                for a in antennas
+            )
+            if gra_file
+            else None,
+        )
+
+
+def write_site_log(w: XMLWriter, data: dict, form, gra_file: str = "antenna.gra"):
+    four_char_id = data["station_info"].four_char_id
+    with w.element("geo:siteLog", {"gml:id": f"{four_char_id}-site-log"}):
+        write_form(w, form)
+        write_site_identification(w, data["station_info"])
+        write_site_location(
+            w, data["station_info"], four_char_id, data["country_iso3_code"]
+        )
+
+        for r in data["receivers"]:
+            write_receiver(w, r, four_char_id)
+        for a in data["antennas"]:
+            write_antenna(w, a, four_char_id)
+        for t in data["local_ties"]:
+            write_local_tie(w, t, four_char_id)
+        for f in data["frequency_standards"]:
+            write_frequency_standard(w, f, four_char_id)
+        for c in data["collocations"]:
+            write_collocation(w, c, four_char_id)
+
+        for s in data["humidity_sensors"]:
+            write_sensor(
+                w, s, four_char_id, "HumiditySensor", "accuracy-percentRelativeHumidity"
+            )
+        for s in data["pressure_sensors"]:
+            write_sensor(w, s, four_char_id, "PressureSensor", "accuracy-hPa")
+        for s in data["temperature_sensors"]:
+            write_sensor(
+                w, s, four_char_id, "TemperatureSensor", "accuracy-degreesCelcius"
+            )
+        for s in data["water_vapor_radiometers"]:
+            write_sensor(w, s, four_char_id, "WaterVaporSensor", None)
+        for o in data["other_meteorological_instrumentation"]:
+            with w.element("geo:otherInstrumentation"):
+                with w.element(
+                    "geo:OtherInstrumentation",
+                    {"gml:id": f"{four_char_id}-other-instrumentation-{o.i}"},
+                ):
+                    w.leaf("geo:instrumentation", o.description)
+
+        for c in data["radio_interferences"]:
+            write_condition(w, c, four_char_id, "RadioInterference")
+        for c in data["multipath_sources"]:
+            write_condition(w, c, four_char_id, "MultipathSource")
+        for c in data["signal_obstructions"]:
+            write_condition(w, c, four_char_id, "SignalObstruction")
+        for e in data["local_episodic_effects"]:
+            gml_id = f"{four_char_id}-local-episodic-effect-{e.i}"
+            with w.element("geo:localEpisodicEffect"):
+                with w.element("geo:LocalEpisodicEffect", {"gml:id": gml_id}):
+                    w.leaf("geo:event", e.event)
+                    write_valid_time(w, f"{gml_id}-time", e.dates)
+
+        # 11. On-Site, Point of Contact Agency and 12. Responsible Agency
+        for contact in (1, 2):
+            if getattr(data["point_of_contact_agency"], f"contact_name_{contact}"):
+                with w.element("geo:siteContact"):
+                    write_contact(
+                        w, data["point_of_contact_agency"], contact, "pointOfContact"
+                    )
+        with w.element("geo:siteMetadataCustodian"):
+            write_contact(w, data["responsible_agency"], 1, "custodian")
+
+        write_more_information(w, data["more_information"], data["antennas"], gra_file)
+
+
+def write_geodesyml_file(
+    file_path: str,
+    db_connection,
+    stations: list = None,
+    prepared_by: str = "",
+    is_new: bool = False,
+    gra_file: str = "antenna.gra",
+) -> int:
+    # stations are queried, written and dropped one at a time, so memory does not grow with the network
+    if not stations:
+        stations = [
+            s.nine_char_id
+            for s in execute_query(db_connection, queries.station_list, ())
+        ]
+
+    n = 0
+    form = db2log.get_form(prepared_by, is_new)
+    with open(file_path, "w", encoding="UTF-8") as o:
+        w = XMLWriter(o)
+        w.start_document()
+        w.start("geo:GeodesyML", {**NAMESPACES, "gml:id": "SI-CORS"})
+
+        for nine_char_id in stations:
+            data = db2log.get_station_data(db_connection, nine_char_id)
+            if data is None:
+                print(f"Station {nine_char_id} does not exist.")
+                continue
+
+            with profiling.stage("write", nine_char_id):
+                write_site_log(w, data, form, gra_file)
+            n += 1
+
+        w.end("geo:GeodesyML")
+        w.end_document()
+
+    return n
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+
+    arg_parser.add_argument(
+        "stations",
+        help="Long station names (e.g. GSR100SVN). If none are given, the whole network is exported.",
+        type=str,
+        nargs="*",
+    )
+
+    arg_parser.add_argument(
+        "-o",
+        "--out",
+        help="GeodesyML file to write (default: SI-CORS.xml in the script directory).",
+        type=str,
+        default="SI-CORS.xml",
+    )
+
+    arg_parser.add_argument(
+        "-a",
+        "--author",
+        help="Value for " "Prepared by" " field.",
+        type=str,
+        default="",
+    )
+
+    arg_parser.add_argument(
+        "-n",
+        "--new",
+        help="If this flag is set, "
+        "Report Type"
+        " field is set to NEW (default: UPDATE).",
+        action="store_true",
+    )
+
+    arg_parser.add_argument(
+        "--gra_max_age",
+        help="Download antenna.gra only if the local copy is older than this many hours "
+        "(default: 24, 0 always downloads).",
+        type=float,
+        default=db2log.GRA_MAX_AGE,
+    )
+
+    arg_parser.add_argument(
+        "--offline",
+        help="Do not download antenna.gra, use the local copy.",
+        action="store_true",
+    )
+
+    arg_parser.add_argument(
+        "-s",
+        "--snapshot",
+        help="Read station data from a local SQLite snapshot (see snapshot.py) instead of the database.",
+        type=str,
+        default=None,
+    )
+
+    input_arguments = arg_parser.parse_args()
+
+    # posodobi antenna.gra file
+    if not input_arguments.offline:
+        db2log.download_antenna_gra(input_arguments.gra_max_age)
+
+    connection = connect("database.ini", input_arguments.snapshot)
+    n = write_geodesyml_file(
+        input_arguments.out,
+        connection,
+        [s.upper() for s in input_arguments.stations],
+        prepared_by=input_arguments.author,
+        is_new=input_arguments.new,
+    )
+    connection.close()
+
+    if n == 0:
+        print("No stations exported.")
+        sys.exit(-1)
+
+    print(
+        f"GeodesyML file {os.path.basename(input_arguments.out)} with {n} stations successfully saved."
+    )
@@ -0,0 +1,605 @@
+import argparse
+import datetime
+import decimal
+import io
+import os
+import sys
+import time
+import typing
+
+if typing.TYPE_CHECKING:
+    import psycopg2.extensions
+
+from signalpy_metapodatkovna_baza import database, queries, sitelog, templates
+
+SENSOR_KINDS = ("humidity", "pressure", "temperature")
+
+# temporary tables filled with COPY; every row carries the nine character id of its site log
+STAGING = {
+    "staging_receiver_log": [
+        "nine_char_id text",
+        "receiver_igs_name text",
+        "serial_number text",
+        "gps boolean",
+        "glo boolean",
+        "gal boolean",
+        "bds boolean",
+        "qzss boolean",
+        "irnss boolean",
+        "sbas boolean",
+        "receiver_fw_version text",
+        "me_fw_version text",
+        "elevation_cutoff integer",
+        "date_installed timestamp",
+        "date_removed timestamp",
+        "temperature_stabilization text",
+        "additional_info text",
+    ],
+    "staging_antenna_log": [
+        "nine_char_id text",
+        "antenna_igs_name text",
+        "serial_number text",
+        "arp_code text",
+        "radome_igs_code text",
+        "radome_serial_number text",
+        "delta_h numeric",
+        "delta_n numeric",
+        "delta_e numeric",
+        "alignment_from_north integer",
+        "cable_type text",
+        "cable_length numeric",
+        "date_installed timestamp",
+        "date_removed timestamp",
+        "additional_info text",
+    ],
+    "staging_local_tie": [
+        "nine_char_id text",
+        "local_tie_id integer",
+        "marker_name text",
+        "marker_usage text",
+        "marker_cdp_number text",
+        "marker_domes_number text",
+        "dx numeric",
+        "dy numeric",
+        "dz numeric",
+        "accuracy numeric",
+        "survey_method text",
+        "date_measured timestamp",
+        "additional_info text",
+    ],
+}
+
+for kind in SENSOR_KINDS:
+    STAGING[f"staging_{kind}_sensor_log"] = [
+        "nine_char_id text",
+        "model text",
+        "manufacturer text",
+        "serial_number text",
+        "accuracy numeric",
+        "aspiration text",
+        "data_sampling_interval integer",
+        "delta_h numeric",
+        "calibration_date date",
+        "effective_date_start date",
+        "effective_date_end date",
+        "notes text",
+    ]
+
+STAGING["staging_water_vapor_radiometer_log"] = [
+    "nine_char_id text",
+    "model text",
+    "manufacturer text",
+    "serial_number text",
+    "distance_to_antenna numeric",
+    "delta_h numeric",
+    "calibration_date date",
+    "effective_date_start date",
+    "effective_date_end date",
+    "notes text",
+]
+
+STATION = "JOIN station_information AS si ON si.nine_char_id = s.nine_char_id"
+
+
+def get_upsert(
+    table: str, columns: dict, key: tuple, source: str, update: bool = True
+) -> list:
+    # set-based upsert that needs no unique constraint: update the rows matching key, insert the rest;
+    # returns (table, action, query)
+    select = ", ".join(f"{e} AS {c}" for c, e in columns.items())
+    src = f"(SELECT DISTINCT ON ({', '.join(key)}) {select} FROM {source}) AS src"
+    match = " AND ".join(f"t.{k} = src.{k}" for k in key)
+
+    upsert = []
+    rest = [c for c in columns if c not in key]
+    if update and rest:
+        upsert.append(
+            (
+                table,
+                "updated",
+                f"UPDATE {table} AS t SET {', '.join(f'{c} = src.{c}' for c in rest)} "
+                f"FROM {src} WHERE {match}",
+            )
+        )
+    upsert.append(
+        (
+            table,
+            "inserted",
+            f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"SELECT {', '.join('src.' + c for c in columns)} FROM {src} "
+            f"WHERE NOT EXISTS (SELECT 1 FROM {table} AS t WHERE {match})",
+        )
+    )
+
+    return upsert
+
+
+def get_ingest_queries() -> list:
+    q = []
+
+    # --- RECEIVERS ---
+    # receiver names are blank padded in the database, site logs have them trimmed
+    q.append(
+        (
+            "staging_receiver_log",
+            "matched",
+            "UPDATE staging_receiver_log AS s SET receiver_igs_name = r.receiver_igs_name "
+            "FROM receiver AS r WHERE rtrim(r.receiver_igs_name) = s.receiver_igs_name "
+            "AND r.receiver_igs_name <> s.receiver_igs_name",
+        )
+    )
+    q += get_upsert(
+        "receiver",
+        {
+            "receiver_igs_name": "s.receiver_igs_name",
+            "serial_number": "s.serial_number",
+        },
+        ("receiver_igs_name", "serial_number"),
+        f"staging_receiver_log AS s {STATION}",
+    )
+    q += get_upsert(
+        "receiver_log",
+        {
+            "station_id": "si.station_id",
+            "receiver_id": "r.receiver_id",
+            "gps": "s.gps",
+            "glo": "s.glo",
+            "gal": "s.gal",
+            "bds": "s.bds",
+            "qzss": "s.qzss",
+            "irnss": "s.irnss",
+            "sbas": "s.sbas",
+            "receiver_fw_version": "s.receiver_fw_version",
+            "me_fw_version": "s.me_fw_version",
+            "elevation_cutoff": "s.elevation_cutoff",
+            "date_installed": "s.date_installed",
+            "date_removed": "s.date_removed",
+            "temperature_stabilization": "s.temperature_stabilization",
+            "additional_info": "s.additional_info",
+        },
+        ("station_id", "date_installed"),
+        f"staging_receiver_log AS s {STATION} "
+        "JOIN receiver AS r ON r.receiver_igs_name = s.receiver_igs_name AND r.serial_number = s.serial_number",
+    )
+
+    # --- ANTENNAS ---
+    # antenna names are blank padded in the database like receiver names
+    q.append(
+        (
+            "staging_antenna_log",
+            "matched",
+            "UPDATE staging_antenna_log AS s SET antenna_igs_name = at.antenna_igs_name "
+            "FROM antenna_type AS at WHERE rtrim(at.antenna_igs_name) = s.antenna_igs_name "
+            "AND at.antenna_igs_name <> s.antenna_igs_name",
+        )
+    )
+    q += get_upsert(
+        "antenna_type",
+        {"antenna_igs_name": "s.antenna_igs_name", "arp_code": "s.arp_code"},
+        ("antenna_igs_name",),
+        f"staging_antenna_log AS s {STATION}",
+        update=False,
+    )
+    q += get_upsert(
+        "antenna",
+        {
+            "antenna_igs_name": "s.antenna_igs_name",
+            "serial_number": "s.serial_number",
+            "radome_igs_code": "s.radome_igs_code",
+            "radome_serial_number": "s.radome_serial_number",
+        },
+        ("antenna_igs_name", "serial_number", "radome_igs_code"),
+        f"staging_antenna_log AS s {STATION}",
+    )
+    q += get_upsert(
+        "antenna_log",
+        {
+            "station_id": "si.station_id",
+            "antenna_id": "a.antenna_id",
+            "delta_h": "s.delta_h",
+            "delta_n": "s.delta_n",
+            "delta_e": "s.delta_e",
+            "alignment_from_north": "s.alignment_from_north",
+            "cable_type": "s.cable_type",
+            "cable_length": "s.cable_length",
+            "date_installed": "s.date_installed",
+            "date_removed": "s.date_removed",
+            "additional_info": "s.additional_info",
+        },
+        ("station_id", "date_installed"),
+        f"staging_antenna_log AS s {STATION} "
+        "JOIN antenna AS a ON a.antenna_igs_name = s.antenna_igs_name AND a.serial_number = s.serial_number "
+        "AND a.radome_igs_code = s.radome_igs_code",
+    )
+
+    # --- LOCAL TIES ---
+    # a tie belongs to a station through the link table, so existing ties are found by station and marker name
+    # and new ones get their id from the table's sequence before both tables are written
+    q.append(
+        (
+            "staging_local_tie",
+            "matched",
+            "UPDATE staging_local_tie AS s SET local_tie_id = slt.local_tie_id "
+            "FROM station_information AS si, surveyed_local_ties_to_station_information AS slt2si, "
+            "surveyed_local_ties AS slt "
+            "WHERE si.nine_char_id = s.nine_char_id AND slt2si.station_id = si.station_id AND "
+            "slt.local_tie_id = slt2si.local_tie_id AND slt.marker_name = s.marker_name",
+        )
+    )
+    q.append(
+        (
+            "staging_local_tie",
+            "numbered",
+            "UPDATE staging_local_tie AS s "
+            "SET local_tie_id = nextval(pg_get_serial_sequence('surveyed_local_ties', 'local_tie_id')) "
+            "WHERE s.local_tie_id IS NULL AND "
+            "EXISTS (SELECT 1 FROM station_information AS si WHERE si.nine_char_id = s.nine_char_id)",
+        )
+    )
+    q += get_upsert(
+        "surveyed_local_ties",
+        {
+            "local_tie_id": "s.local_tie_id",
+            "marker_name": "s.marker_name",
+            "marker_usage": "s.marker_usage",
+            "marker_cdp_number": "s.marker_cdp_number",
+            "marker_domes_number": "s.marker_domes_number",
+            "dx": "s.dx",
+            "dy": "s.dy",
+            "dz": "s.dz",
+            "accuracy": "s.accuracy",
+            "survey_method": "s.survey_method",
+            "date_measured": "s.date_measured",
+            "additional_info": "s.additional_info",
+        },
+        ("local_tie_id",),
+        "staging_local_tie AS s WHERE s.local_tie_id IS NOT NULL",
+    )
+    q += get_upsert(
+        "surveyed_local_ties_to_station_information",
+        {"local_tie_id": "s.local_tie_id", "station_id": "si.station_id"},
+        ("local_tie_id", "station_id"),
+        f"staging_local_tie AS s {STATION}",
+    )
+
+    # --- METEOROLOGICAL SENSORS ---
+    for kind in SENSOR_KINDS + ("water_vapor_radiometer",):
+        sensor = kind if kind == "water_vapor_radiometer" else f"{kind}_sensor"
+        staging = f"staging_{sensor}_log"
+
+        sensor_type = {
+            f"{sensor}_model": "s.model",
+            "manufacturer": "s.manufacturer",
+        }
+        if kind in SENSOR_KINDS:
+            sensor_type["accuracy"] = "s.accuracy"
+        if kind in ("humidity", "temperature"):
+            sensor_type["aspiration"] = "s.aspiration"
+        q += get_upsert(
+            f"{sensor}_type",
+            sensor_type,
+            (f"{sensor}_model", "manufacturer"),
+            f"{staging} AS s {STATION}",
+            update=False,
+        )
+
+        q += get_upsert(
+            sensor,
+            {
+                "model": "s.model",
+                "manufacturer": "s.manufacturer",
+                "serial_number": "s.serial_number",
+            },
+            ("model", "manufacturer", "serial_number"),
+            f"{staging} AS s {STATION}",
+        )
+
+        sensor_log = {
+            "station_id": "si.station_id",
+            f"{sensor}_id": f"x.{sensor}_id",
+        }
+        if kind in SENSOR_KINDS:
+            sensor_log["data_sampling_interval"] = "s.data_sampling_interval"
+        else:
+            sensor_log["distance_to_antenna"] = "s.distance_to_antenna"
+        sensor_log.update(
+            {
+                "delta_h": "s.delta_h",
+                "calibration_date": "s.calibration_date",
+                "effective_date_start": "s.effective_date_start",
+                "effective_date_end": "s.effective_date_end",
+                "notes": "s.notes",
+            }
+        )
+        q += get_upsert(
+            f"{sensor}_log",
+            sensor_log,
+            ("station_id", f"{sensor}_id", "effective_date_start"),
+            f"{staging} AS s {STATION} "
+            f"JOIN {sensor} AS x ON x.model = s.model AND x.manufacturer = s.manufacturer "
+            "AND x.serial_number = s.serial_number",
+        )
+
+    return q
+
+
+def number(v):
+    # values the parser could not read as numbers are left out instead of failing the whole COPY
+    return (
+        v if isinstance(v, (int, decimal.Decimal)) and not isinstance(v, bool) else None
+    )
+
+
+def get_serial_number(serial_number: str, nine_char_id: str, date_installed) -> str:
+    # the database marks missing serial numbers with "unknown"; one per installation, so they are not merged
+    return (
+        serial_number
+        or f"unknown {nine_char_id} {templates.short_date(date_installed, return_placeholder=False)}".rstrip()
+    )
+
+
+def get_rows(nine_char_id: str, log: dict):
+    # (staging table, row) for every entry of a parsed site log
+    for r in log["receivers"]:
+        yield "staging_receiver_log", (
+            nine_char_id,
+            r.receiver_type.rstrip(),
+            get_serial_number(r.serial_number, nine_char_id, r.date_installed),
+            *(r.satellite_system.get(k, False) for k in sitelog.SATELLITE_SYSTEMS),
+            r.receiver_fw_version or "unknown",
+            r.me_fw_version,
+            number(r.elevation_cutoff),
+            r.date_installed,
+            r.date_removed,
+            None
+            if r.temperature_stabilization.lower() in ("", "none")
+            else r.temperature_stabilization,
+            r.additional_information or None,
+        )
+
+    for a in log["antennas"]:
+        yield "staging_antenna_log", (
+            nine_char_id,
+            a.antenna_type.rstrip(),
+            get_serial_number(a.serial_number, nine_char_id, a.date_installed),
+            a.arp or None,
+            a.radome_type or "NONE",
+            a.radome_serial_number or None,
+            number(a.delta_h),
+            number(a.delta_n),
+            number(a.delta_e),
+            number(a.alignment),
+            a.cable_type or None,
+            number(a.cable_length),
+            a.date_installed,
+            a.date_removed,
+            a.additional_information or None,
+        )
+
+    for lt in log["local_ties"]:
+        yield "staging_local_tie", (
+            nine_char_id,
+            None,
+            lt.tied_marker_name,
+            lt.tied_marker_usage or None,
+            lt.tied_marker_cdp_number or None,
+            lt.tied_marker_domes_number or None,
+            number(lt.dx),
+            number(lt.dy),
+            number(lt.dz),
+            number(lt.accuracy),
+            lt.survey_method or None,
+            lt.date_measured,
+            lt.additional_information or None,
+        )
+
+    for kind in SENSOR_KINDS:
+        for s in log[f"{kind}_sensors"]:
+            yield f"staging_{kind}_sensor_log", (
+                nine_char_id,
+                s.sensor_model,
+                s.manufacturer,
+                s.serial_number,
+                number(sitelog.to_decimal(s.accuracy)),
+                getattr(s, "aspiration", None) or None,
+                number(s.data_sampling_interval),
+                number(s.delta_h),
+                s.calibration_date,
+                *s.effective_dates,
+                s.notes or None,
+            )
+
+    for wvr in log["water_vapor_radiometers"]:
+        yield "staging_water_vapor_radiometer_log", (
+            nine_char_id,
+            wvr.sensor_model,
+            wvr.manufacturer,
+            wvr.serial_number,
+            number(wvr.distance_to_antenna),
+            number(wvr.delta_h),
+            wvr.calibration_date,
+            *wvr.effective_dates,
+            wvr.notes or None,
+        )
+
+
+def to_copy_value(v) -> str:
+    # COPY text format
+    if v is None:
+        return "\\N"
+    if isinstance(v, bool):
+        return "t" if v else "f"
+
+    return (
+        str(v)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def get_nine_char_id(file_path: str, log: dict) -> str:
+    if log["header"] is not None:
+        return log["header"].site_name.upper()
+
+    return os.path.basename(file_path)[:9].upper()
+
+
+def get_log_order(file_path: str, log: dict) -> tuple:
+    # date prepared, then the file name, which ends with the date in the IGS naming convention
+    date_prepared = log["form"].date_prepared if log["form"] is not None else None
+    return date_prepared or datetime.date.min, os.path.basename(file_path)
+
+
+def ingest(
+    db_connection: "psycopg2.extensions.connection",
+    logs,
+    dry_run: bool = False,
+) -> dict:
+    # all logs in one transaction: COPY into temporary staging tables, then one upsert per table
+    stations = {
+        s.nine_char_id.upper()
+        for s in database.execute_query(db_connection, queries.station_list, ())
+    }
+
+    counts = {
+        "logs": 0,
+        "unknown_stations": [],
+        "older_logs": [],
+        "staged": dict.fromkeys(STAGING, 0),
+    }
+
+    # every log holds the whole history of its station, so of several logs of a station (an archive)
+    # only the newest is imported; the upserts could not tell which staged row is the current one
+    newest = {}
+    for file_path, log in logs:
+        nine_char_id = get_nine_char_id(file_path, log)
+        if nine_char_id not in stations:
+            counts["unknown_stations"].append(nine_char_id)
+            continue
+
+        key = get_log_order(file_path, log)
+        if nine_char_id in newest:
+            if newest[nine_char_id][0] > key:
+                counts["older_logs"].append(file_path)
+                continue
+            counts["older_logs"].append(newest[nine_char_id][1])
+        newest[nine_char_id] = (key, file_path, log)
+
+    buffers = {table: io.StringIO() for table in STAGING}
+    for nine_char_id, (_, _, log) in newest.items():
+        counts["logs"] += 1
+        for table, row in get_rows(nine_char_id, log):
+            buffers[table].write("\t".join(map(to_copy_value, row)) + "\n")
+            counts["staged"][table] += 1
+
+    cur = db_connection.cursor()  # type: psycopg2.extensions.cursor
+    try:
+        for table, columns in STAGING.items():
+            cur.execute(
+                f"CREATE TEMPORARY TABLE {table} ({', '.join(columns)}) ON COMMIT DROP"
+            )
+            buffers[table].seek(0)
+            cur.copy_expert(f"COPY {table} FROM STDIN", buffers[table])
+
+        for table, action, q in get_ingest_queries():
+            cur.execute(q)
+            counts.setdefault(table, {})[action] = cur.rowcount
+    except database.get_psycopg2().Error:
+        db_connection.rollback()
+        raise
+    finally:
+        cur.close()
+
+    if dry_run:
+        db_connection.rollback()
+    else:
+        db_connection.commit()
+
+    return counts
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+
+    arg_parser.add_argument(
+        "log_dir", help="Directory of IGS site logs (*.log) to import.", type=str
+    )
+
+    arg_parser.add_argument(
+        "-c",
+        "--config",
+        help="Database connection settings file.",
+        type=str,
+        default="database.ini",
+    )
+
+    arg_parser.add_argument(
+        "-j",
+        "--jobs",
+        help="Number of processes parsing the site logs (default: 1).",
+        type=int,
+        default=1,
+    )
+
+    arg_parser.add_argument(
+        "--dry_run",
+        help="Run the whole import, then roll it back instead of committing.",
+        action="store_true",
+    )
+
+    input_arguments = arg_parser.parse_args()
+
+    if not os.path.isdir(input_arguments.log_dir):
+        print(f"Directory {input_arguments.log_dir} does not exist.")
+        sys.exit(-1)
+
+    start = time.perf_counter()
+
+    connection = database.connect(input_arguments.config)
+    results = ingest(
+        connection,
+        sitelog.parse_directory(input_arguments.log_dir, input_arguments.jobs),
+        dry_run=input_arguments.dry_run,
+    )
+    connection.close()
+
+    for nine_char_id in results["unknown_stations"]:
+        print(f"Station {nine_char_id} does not exist, site log skipped.")
+
+    for file_path in results["older_logs"]:
+        print(
+            f"Site log {os.path.basename(file_path)} skipped, a newer log of the station is imported."
+        )
+
+    for table, actions in results.items():
+        if isinstance(actions, dict) and table != "staged":
+            print(
+                f"{table}: {', '.join(f'{n} {action}' for action, n in actions.items())}"
+            )
+
+    print(
+        f"{results['logs']} site logs {'checked' if input_arguments.dry_run else 'imported'} "
+        f"in {time.perf_counter() - start:.3f} s."
+    )
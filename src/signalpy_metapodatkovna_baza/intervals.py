@@ -0,0 +1,212 @@
+import argparse
+import bisect
+import datetime
+import heapq
+import itertools
+
+from signalpy_metapodatkovna_baza import database, queries, templates
+
+# stand in for a missing installation or removal date, so open intervals compare like closed ones
+OPEN_START = datetime.datetime.min
+OPEN_END = datetime.datetime.max
+
+
+class StationHistory(object):
+    # install/removal intervals [date_installed, date_removed) of one station, sorted by date_installed;
+    # real site logs may overlap them (a removal after the next installation, an entry left open),
+    # then the lookups scan all entries and the most recently installed entry wins
+    def __init__(self, entries: list):
+        self.entries = sorted(entries, key=lambda e: e.date_installed or OPEN_START)
+        self.starts = [e.date_installed or OPEN_START for e in self.entries]
+        self.ends = [e.date_removed or OPEN_END for e in self.entries]
+
+        # without overlaps the ends are sorted as well and the lookups can bisect both lists
+        self.disjoint = all(
+            start <= end for start, end in zip(self.starts, self.ends)
+        ) and all(end <= start for end, start in zip(self.ends, self.starts[1:]))
+
+    def at(self, epoch: datetime.datetime):
+        if not self.disjoint:
+            installed = [
+                e
+                for e, start, end in zip(self.entries, self.starts, self.ends)
+                if start <= epoch < end
+            ]
+            return installed[-1] if installed else None
+
+        i = bisect.bisect_right(self.starts, epoch) - 1
+        if i < 0 or epoch >= self.ends[i]:
+            return None
+
+        return self.entries[i]
+
+    def between(self, start: datetime.datetime, end: datetime.datetime) -> list:
+        # every entry installed at some time in [start, end)
+        if not self.disjoint:
+            return [
+                e
+                for e, e_start, e_end in zip(self.entries, self.starts, self.ends)
+                if e_start < end and e_end > start
+            ]
+
+        first = bisect.bisect_right(self.ends, start)
+        last = bisect.bisect_left(self.starts, end)
+
+        return self.entries[first:last]
+
+
+def merge_histories(receivers: StationHistory, antennas: StationHistory) -> list:
+    # (start, end, receiver, antenna) for every interval between two consecutive receiver or antenna changes,
+    # found in one sweep over both sorted histories; end is None for the open interval
+    if not (receivers.disjoint and antennas.disjoint):
+        return merge_overlapping_histories(receivers, antennas)
+
+    epochs = []
+    for epoch in heapq.merge(
+        receivers.starts, receivers.ends, antennas.starts, antennas.ends
+    ):
+        if not epochs or epoch != epochs[-1]:
+            epochs.append(epoch)
+
+    merged = []
+    i = j = 0
+    for start, end in zip(epochs, epochs[1:] + [OPEN_END]):
+        if start == OPEN_END:
+            break
+
+        while i < len(receivers.entries) and receivers.ends[i] <= start:
+            i += 1
+        while j < len(antennas.entries) and antennas.ends[j] <= start:
+            j += 1
+
+        receiver = (
+            receivers.entries[i]
+            if i < len(receivers.entries) and receivers.starts[i] <= start
+            else None
+        )
+        antenna = (
+            antennas.entries[j]
+            if j < len(antennas.entries) and antennas.starts[j] <= start
+            else None
+        )
+        if receiver is not None or antenna is not None:
+            merged.append((start, None if end == OPEN_END else end, receiver, antenna))
+
+    return merged
+
+
+def merge_overlapping_histories(
+    receivers: StationHistory, antennas: StationHistory
+) -> list:
+    # same intervals as merge_histories, with a lookup per interval instead of the sweep
+    epochs = sorted(
+        set(receivers.starts + receivers.ends + antennas.starts + antennas.ends)
+    )
+
+    merged = []
+    for start, end in zip(epochs, epochs[1:] + [OPEN_END]):
+        if start == OPEN_END:
+            break
+
+        receiver = receivers.at(start)
+        antenna = antennas.at(start)
+        if receiver is not None or antenna is not None:
+            merged.append((start, None if end == OPEN_END else end, receiver, antenna))
+
+    return merged
+
+
+class EquipmentIndex(object):
+    def __init__(self, receivers: dict, antennas: dict):
+        # nine_char_id -> StationHistory
+        self.receivers = receivers
+        self.antennas = antennas
+
+    @staticmethod
+    def group(history_qr, from_query) -> dict:
+        stations = {}
+        for nine_char_id, rows in itertools.groupby(
+            history_qr, key=lambda row: row.nine_char_id
+        ):
+            stations[nine_char_id] = StationHistory(
+                [from_query(row, i) for i, row in enumerate(rows, start=1)]
+            )
+
+        return stations
+
+    @classmethod
+    def from_query(cls, receivers_qr, antennas_qr):
+        return cls(
+            cls.group(receivers_qr, templates.Receiver.from_query),
+            cls.group(antennas_qr, templates.Antenna.from_query),
+        )
+
+    def receiver_at(self, nine_char_id: str, epoch: datetime.datetime):
+        history = self.receivers.get(nine_char_id)
+        return history.at(epoch) if history else None
+
+    def antenna_at(self, nine_char_id: str, epoch: datetime.datetime):
+        history = self.antennas.get(nine_char_id)
+        return history.at(epoch) if history else None
+
+    def combined(self, nine_char_id: str) -> list:
+        return merge_histories(
+            self.receivers.get(nine_char_id, StationHistory([])),
+            self.antennas.get(nine_char_id, StationHistory([])),
+        )
+
+    def receivers_between(
+        self, nine_char_id: str, start: datetime.datetime, end: datetime.datetime
+    ) -> list:
+        history = self.receivers.get(nine_char_id)
+        return history.between(start, end) if history else []
+
+    def antennas_between(
+        self, nine_char_id: str, start: datetime.datetime, end: datetime.datetime
+    ) -> list:
+        history = self.antennas.get(nine_char_id)
+        return history.between(start, end) if history else []
+
+
+def load_equipment_index(db_connection) -> EquipmentIndex:
+    # two queries for the whole network instead of two per station
+    receivers_qr = database.execute_query(
+        db_connection, queries.receiver_history_all, ()
+    )
+    antennas_qr = database.execute_query(db_connection, queries.antenna_history_all, ())
+
+    return EquipmentIndex.from_query(receivers_qr, antennas_qr)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+
+    arg_parser.add_argument(
+        "station_name", help="Long station name (e.g. GSR100SVN).", type=str
+    )
+
+    arg_parser.add_argument(
+        "epoch",
+        help="Epoch (e.g. 2020-01-01 or 2020-01-01T12:00:00).",
+        type=datetime.datetime.fromisoformat,
+    )
+
+    arg_parser.add_argument(
+        "-s",
+        "--snapshot",
+        help="Read station data from a local SQLite snapshot (see snapshot.py) instead of the database.",
+        type=str,
+        default=None,
+    )
+
+    input_arguments = arg_parser.parse_args()
+
+    connection = database.connect("database.ini", input_arguments.snapshot)
+    index = load_equipment_index(connection)
+    connection.close()
+
+    receiver = index.receiver_at(input_arguments.station_name, input_arguments.epoch)
+    antenna = index.antenna_at(input_arguments.station_name, input_arguments.epoch)
+
+    print(receiver.print_to_log() if receiver else "No receiver installed.\n")
+    print(antenna.print_to_log() if antenna else "No antenna installed.\n")
@@ -0,0 +1,105 @@
+import datetime
+import hashlib
+import json
+import os
+
+from signalpy_metapodatkovna_baza import atomic
+
+MANIFEST_FILE_NAME = "manifest.json"
+
+
+def to_json(o):
+    # templates objects by their attributes, Decimal and datetime as text
+    if hasattr(o, "__dict__"):
+        return vars(o)
+
+    return str(o)
+
+
+def get_source_fingerprint(data) -> str:
+    # sha256 of the database content a file is rendered from; the form and file dates are not part of it
+    return hashlib.sha256(
+        json.dumps(data, default=to_json, sort_keys=True).encode("UTF-8")
+    ).hexdigest()
+
+
+def read_manifest(file_path: str) -> dict:
+    if not os.path.exists(file_path):
+        return {}
+
+    with open(file_path, "r", encoding="UTF-8") as f:
+        return json.load(f).get("files", {})
+
+
+class Manifest(object):
+    # file name -> size, sha256 and source fingerprint of every output file in save_dir
+    def __init__(self, save_dir: str, file_name: str = MANIFEST_FILE_NAME):
+        self.save_dir = save_dir
+        self.file_path = os.path.join(save_dir, file_name)
+        self.previous = read_manifest(self.file_path)
+        self.files = {}
+
+    def add(self, file_path: str, fingerprint: str, **fields) -> None:
+        name = os.path.basename(file_path)
+        stat = os.stat(file_path)
+
+        # unchanged files (same size and mtime as in the manifest) are not hashed again
+        previous = self.files.get(name) or self.previous.get(name, {})
+        if (
+            previous.get("size") == stat.st_size
+            and previous.get("mtime_ns") == stat.st_mtime_ns
+        ):
+            sha256 = previous["sha256"]
+        else:
+            sha256 = atomic.get_file_hash(file_path)
+
+        self.files[name] = {
+            **fields,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": sha256,
+            "fingerprint": fingerprint,
+        }
+
+    def is_current(self, file_path: str, fingerprint: str) -> bool:
+        # the file was rendered from the same source and has not been modified since
+        entry = self.files.get(os.path.basename(file_path)) or self.previous.get(
+            os.path.basename(file_path)
+        )
+        if not entry or entry.get("fingerprint") != fingerprint:
+            return False
+
+        stat = os.stat(file_path)
+        return (
+            entry.get("size") == stat.st_size
+            and entry.get("mtime_ns") == stat.st_mtime_ns
+        )
+
+    def write(self) -> None:
+        # entries of other runs and sinks are kept, entries of deleted files are dropped
+        files = {
+            name: entry
+            for name, entry in {**read_manifest(self.file_path), **self.files}.items()
+            if os.path.exists(os.path.join(self.save_dir, name))
+        }
+
+        atomic.write_file(
+            self.file_path,
+            json.dumps(
+                {
+                    "updated": datetime.datetime.now().isoformat(timespec="seconds"),
+                    "files": dict(sorted(files.items())),
+                },
+                indent=2,
+            )
+            + "\n",
+        )
+
+
+def write_network_file(file_path: str, fingerprints: list) -> None:
+    # a file with many stations is fingerprinted by the fingerprints of its stations
+    output_manifest = Manifest(os.path.dirname(file_path) or ".")
+    output_manifest.add(
+        file_path, get_source_fingerprint(fingerprints), stations=len(fingerprints)
+    )
+    output_manifest.write()
@@ -0,0 +1,139 @@
+import json
+import os
+import sys
+import time
+
+try:
+    import resource
+except ModuleNotFoundError:
+    # not available on Windows; peak RSS is then not reported
+    resource = None
+
+# summary key -> help text; every value describes the last run, so all are gauges
+PROMETHEUS_METRICS = {
+    "run_started_timestamp_seconds": "Start of the last run (unix time).",
+    "run_seconds": "Wall time of the last run.",
+    "db_round_trips": "Database queries issued.",
+    "db_rows": "Rows fetched from the database.",
+    "bytes_written": "Bytes written to output files.",
+    "files_written": "Output files written.",
+    "stations": "Stations exported.",
+    "stations_per_second": "Export throughput.",
+    "peak_rss_bytes": "Peak resident set size.",
+}
+
+
+class Collector(object):
+    def __init__(self, job: str):
+        self.job = job
+        self.started = time.time()
+        self.stopped = None
+
+        self.round_trips = 0
+        self.rows = 0
+        self.bytes_written = 0
+        self.files_written = 0
+        self.stations = 0
+
+    def query(self, rows: int) -> None:
+        self.round_trips += 1
+        self.rows += rows
+
+    def written(self, text: str, stations: int = 1) -> None:
+        self.file_written(len(text.encode("UTF-8")), stations)
+
+    def file_written(self, size: int, stations: int = 1) -> None:
+        self.bytes_written += size
+        self.files_written += 1
+        self.stations += stations
+
+    def stop(self) -> None:
+        self.stopped = time.time()
+
+    @staticmethod
+    def peak_rss_bytes():
+        if resource is None:
+            return None
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return peak if sys.platform == "darwin" else peak * 1024
+
+    def summary(self) -> dict:
+        seconds = (self.stopped or time.time()) - self.started
+        return {
+            "job": self.job,
+            "run_started_timestamp_seconds": self.started,
+            "run_seconds": seconds,
+            "db_round_trips": self.round_trips,
+            "db_rows": self.rows,
+            "bytes_written": self.bytes_written,
+            "files_written": self.files_written,
+            "stations": self.stations,
+            "stations_per_second": self.stations / seconds if seconds else 0.0,
+            "peak_rss_bytes": self.peak_rss_bytes(),
+        }
+
+    def to_prometheus(self) -> str:
+        s = self.summary()
+
+        lines = []
+        for key, description in PROMETHEUS_METRICS.items():
+            if s[key] is None:
+                continue
+            lines.append(f"# HELP signalpy_{key} {description}")
+            lines.append(f"# TYPE signalpy_{key} gauge")
+            lines.append(f'signalpy_{key}{{job="{self.job}"}} {s[key]}')
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, prometheus_file=None, json_file=None) -> None:
+        if prometheus_file:
+            # node_exporter may read the directory at any time, so write aside and rename
+            tmp_file = prometheus_file + ".tmp"
+            with open(tmp_file, "w", encoding="UTF-8") as f:
+                f.write(self.to_prometheus())
+            os.replace(tmp_file, prometheus_file)
+
+        if json_file:
+            with open(json_file, "w", encoding="UTF-8") as f:
+                json.dump(self.summary(), f, indent=2)
+
+
+_collector = None
+
+
+def start(job: str) -> Collector:
+    global _collector
+    _collector = Collector(job)
+
+    return _collector
+
+
+def stop(prometheus_file=None, json_file=None) -> None:
+    global _collector
+    if _collector is None:
+        return
+
+    _collector.stop()
+    _collector.write(prometheus_file, json_file)
+    _collector = None
+
+
+def enabled() -> bool:
+    return _collector is not None
+
+
+def query(rows: int) -> None:
+    if _collector is not None:
+        _collector.query(rows)
+
+
+def written(text: str, stations: int = 1) -> None:
+    if _collector is not None:
+        _collector.written(text, stations)
+
+
+def file_written(size: int, stations: int = 1) -> None:
+    if _collector is not None:
+        _collector.file_written(size, stations)
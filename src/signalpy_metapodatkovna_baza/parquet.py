@@ -0,0 +1,228 @@
+import argparse
+import itertools
+import os
+import sys
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ModuleNotFoundError:
+    print("Module pyarrow not installed. pip install pyarrow")
+    sys.exit(-1)
+
+from signalpy_metapodatkovna_baza import profiling, queries
+from signalpy_metapodatkovna_baza.database import connect, iterate_query
+
+# IGS names, codes and other short vocabularies repeat on almost every row, so they are dictionary encoded
+DICTIONARY = pa.dictionary(pa.int32(), pa.string())
+
+STATION_ID = ("station_id", pa.int32())
+NINE_CHAR_ID = ("nine_char_id", DICTIONARY)
+
+# file name -> (query, columns in the order the query selects them)
+TABLES = {
+    "stations": (
+        queries.parquet_stations,
+        [
+            STATION_ID,
+            ("nine_char_id", pa.string()),
+            ("four_char_id", pa.string()),
+            ("country_iso3_code", DICTIONARY),
+            ("country_name", DICTIONARY),
+            ("site_name", pa.string()),
+            ("domes_number", pa.string()),
+            ("monument_description", DICTIONARY),
+            ("monument_height", pa.float64()),
+            ("foundation_depth", pa.float64()),
+            ("date_installed", pa.timestamp("us")),
+            ("city", pa.string()),
+            ("state_province", DICTIONARY),
+            ("tectonic_plate", DICTIONARY),
+            ("X", pa.float64()),
+            ("Y", pa.float64()),
+            ("Z", pa.float64()),
+            ("reference_frame", DICTIONARY),
+            ("valid_from", pa.timestamp("us")),
+        ],
+    ),
+    "receivers": (
+        queries.parquet_receivers,
+        [
+            STATION_ID,
+            NINE_CHAR_ID,
+            ("receiver_igs_name", DICTIONARY),
+            ("serial_number", pa.string()),
+            ("receiver_fw_version", DICTIONARY),
+            ("me_fw_version", DICTIONARY),
+            ("gps", pa.bool_()),
+            ("glo", pa.bool_()),
+            ("gal", pa.bool_()),
+            ("bds", pa.bool_()),
+            ("qzss", pa.bool_()),
+            ("irnss", pa.bool_()),
+            ("sbas", pa.bool_()),
+            ("elevation_cutoff", pa.int32()),
+            ("date_installed", pa.timestamp("us")),
+            ("date_removed", pa.timestamp("us")),
+            ("temperature_stabilization", pa.string()),
+        ],
+    ),
+    "antennas": (
+        queries.parquet_antennas,
+        [
+            STATION_ID,
+            NINE_CHAR_ID,
+            ("antenna_igs_name", DICTIONARY),
+            ("serial_number", pa.string()),
+            ("radome_igs_code", DICTIONARY),
+            ("radome_serial_number", pa.string()),
+            ("arp_code", DICTIONARY),
+            ("delta_h", pa.float64()),
+            ("delta_n", pa.float64()),
+            ("delta_e", pa.float64()),
+            ("alignment_from_north", pa.int32()),
+            ("cable_type", DICTIONARY),
+            ("cable_length", pa.int32()),
+            ("date_installed", pa.timestamp("us")),
+            ("date_removed", pa.timestamp("us")),
+        ],
+    ),
+    "met_sensors": (
+        queries.parquet_met_sensors,
+        [
+            STATION_ID,
+            NINE_CHAR_ID,
+            ("sensor", DICTIONARY),
+            ("model", DICTIONARY),
+            ("manufacturer", DICTIONARY),
+            ("serial_number", pa.string()),
+            ("data_sampling_interval", pa.int32()),
+            ("accuracy", pa.float64()),
+            ("delta_h", pa.float64()),
+            ("calibration_date", pa.date32()),
+            ("effective_date_start", pa.date32()),
+            ("effective_date_end", pa.date32()),
+        ],
+    ),
+}
+
+
+def get_schema(columns: list) -> pa.Schema:
+    return pa.schema([pa.field(name, arrow_type) for name, arrow_type in columns])
+
+
+def to_array(values: tuple, arrow_type: pa.DataType) -> pa.Array:
+    if arrow_type == DICTIONARY:
+        return pa.array(values, type=pa.string()).dictionary_encode()
+    if arrow_type == pa.float64():
+        # numeric columns arrive as Decimal
+        return pa.array(
+            [None if v is None else float(v) for v in values], type=arrow_type
+        )
+
+    return pa.array(values, type=arrow_type)
+
+
+def get_record_batches(rows, columns: list, batch_size: int):
+    schema = get_schema(columns)
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            return
+
+        yield pa.RecordBatch.from_arrays(
+            [
+                to_array(values, arrow_type)
+                for values, (_, arrow_type) in zip(zip(*batch), columns)
+            ],
+            schema=schema,
+        )
+
+
+def write_table(
+    file_path: str,
+    db_connection,
+    name: str,
+    batch_size: int = 50000,
+    compression: str = "zstd",
+) -> int:
+    # rows come from a server-side cursor and leave as record batches; one batch is in memory at a time
+    q, columns = TABLES[name]
+    n = 0
+    with profiling.stage("write", os.path.basename(file_path)):
+        with pq.ParquetWriter(
+            file_path, get_schema(columns), compression=compression
+        ) as writer:
+            for batch in get_record_batches(
+                iterate_query(db_connection, q, (), f"parquet_{name}", batch_size),
+                columns,
+                batch_size,
+            ):
+                writer.write_batch(batch)
+                n += batch.num_rows
+
+    return n
+
+
+def write_parquet_files(
+    db_connection, tables: list = None, save_dir: str = "", batch_size: int = 50000
+) -> dict:
+    # file path -> number of rows
+    written = {}
+    for name in tables or TABLES:
+        file_path = os.path.join(save_dir, f"{name}.parquet")
+        written[file_path] = write_table(file_path, db_connection, name, batch_size)
+
+    return written
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+
+    arg_parser.add_argument(
+        "-t",
+        "--tables",
+        help=f"Tables to export ({', '.join(TABLES)}). If not set, all are exported.",
+        nargs="+",
+        choices=list(TABLES),
+        default=None,
+    )
+
+    arg_parser.add_argument(
+        "-o",
+        "--out_dir",
+        help="Saving directory. If not set, files are saved in the script directory.",
+        type=str,
+        default=".",
+    )
+
+    arg_parser.add_argument(
+        "-b",
+        "--batch_size",
+        help="Rows per record batch and per server-side cursor fetch (default: 50000).",
+        type=int,
+        default=50000,
+    )
+
+    arg_parser.add_argument(
+        "-s",
+        "--snapshot",
+        help="Read station data from a local SQLite snapshot (see snapshot.py) instead of the database.",
+        type=str,
+        default=None,
+    )
+
+    input_arguments = arg_parser.parse_args()
+
+    connection = connect("database.ini", input_arguments.snapshot)
+    written = write_parquet_files(
+        connection,
+        input_arguments.tables,
+        input_arguments.out_dir,
+        input_arguments.batch_size,
+    )
+    connection.close()
+
+    for file_path, n in written.items():
+        print(f"File {os.path.basename(file_path)} with {n} rows successfully saved.")
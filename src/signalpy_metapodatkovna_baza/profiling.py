@@ -0,0 +1,161 @@
+import contextlib
+import functools
+import json
+import time
+
+from signalpy_metapodatkovna_baza import queries, templates
+
+# SQL text -> name in queries.py, used as the label of query stages (identical queries share a label)
+QUERY_NAMES = {}
+for name, q in vars(queries).items():
+    if isinstance(q, str) and not name.startswith("_"):
+        QUERY_NAMES[q] = f"{QUERY_NAMES[q]}/{name}" if q in QUERY_NAMES else name
+
+# template methods timed per section class; everything that is not from_query counts as rendering
+TEMPLATE_METHODS = (
+    "from_query",
+    "from_crux_view",
+    "to_txt",
+    "print_to_log",
+    "print_to_crux",
+    "print_eccentricities_to_crux",
+    "print_blank_to_log",
+    "blank_entry",
+)
+
+
+class Profiler(object):
+    def __init__(self, cprofile_file=None):
+        self.records = []
+        self.started = time.perf_counter()
+        self.stopped = None
+
+        self.cprofile_file = cprofile_file
+        self.cprofile = None
+        if cprofile_file:
+            # only loaded when a dump is asked for
+            import cProfile
+
+            self.cprofile = cProfile.Profile()
+
+        self.patched = []
+
+    @contextlib.contextmanager
+    def stage(self, stage: str, label: str):
+        record = {"stage": stage, "label": label, "seconds": 0.0, "rows": None}
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = time.perf_counter() - start
+            self.records.append(record)
+
+    def timed(self, stage: str, label: str, f):
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            with self.stage(stage, label):
+                return f(*args, **kwargs)
+
+        return wrapper
+
+    def patch(self, owner, name: str, stage: str, label: str) -> None:
+        original = owner.__dict__[name]
+        if isinstance(original, (classmethod, staticmethod)):
+            patched = type(original)(self.timed(stage, label, original.__func__))
+        else:
+            patched = self.timed(stage, label, original)
+
+        setattr(owner, name, patched)
+        self.patched.append((owner, name, original))
+
+    def start(self) -> None:
+        for cls in vars(templates).values():
+            if not isinstance(cls, type) or cls.__module__ != templates.__name__:
+                continue
+            for method in TEMPLATE_METHODS:
+                if method in cls.__dict__:
+                    stage = "from_query" if method.startswith("from_") else "render"
+                    self.patch(cls, method, stage, f"{cls.__name__}.{method}")
+
+        if self.cprofile:
+            self.cprofile.enable()
+
+    def stop(self) -> None:
+        if self.cprofile:
+            self.cprofile.disable()
+
+        for owner, name, original in reversed(self.patched):
+            setattr(owner, name, original)
+        self.patched = []
+
+        self.stopped = time.perf_counter()
+
+    def report(self) -> dict:
+        stages = {}
+        for record in self.records:
+            key = (record["stage"], record["label"])
+            if key not in stages:
+                stages[key] = {
+                    "stage": record["stage"],
+                    "label": record["label"],
+                    "calls": 0,
+                    "seconds": 0.0,
+                    "max_seconds": 0.0,
+                    "rows": None,
+                }
+            s = stages[key]
+            s["calls"] += 1
+            s["seconds"] += record["seconds"]
+            s["max_seconds"] = max(s["max_seconds"], record["seconds"])
+            if record["rows"] is not None:
+                s["rows"] = (s["rows"] or 0) + record["rows"]
+
+        totals = {}
+        for s in stages.values():
+            totals[s["stage"]] = totals.get(s["stage"], 0.0) + s["seconds"]
+
+        return {
+            "wall_seconds": (self.stopped or time.perf_counter()) - self.started,
+            "stage_seconds": totals,
+            "stages": sorted(stages.values(), key=lambda s: -s["seconds"]),
+        }
+
+    def write_report(self, report_file: str) -> None:
+        with open(report_file, "w", encoding="UTF-8") as f:
+            json.dump(self.report(), f, indent=2)
+
+        if self.cprofile:
+            # pstats format; readable by snakeviz, flameprof, gprof2dot
+            self.cprofile.dump_stats(self.cprofile_file)
+
+
+_profiler = None
+
+
+def start(cprofile_file=None) -> Profiler:
+    global _profiler
+    _profiler = Profiler(cprofile_file)
+    _profiler.start()
+
+    return _profiler
+
+
+def stop(report_file: str) -> None:
+    global _profiler
+    if _profiler is None:
+        return
+
+    _profiler.stop()
+    _profiler.write_report(report_file)
+    _profiler = None
+
+
+def stage(stage: str, label: str):
+    if _profiler is None:
+        return contextlib.nullcontext({})
+
+    return _profiler.stage(stage, label)
+
+
+def query_stage(q: str):
+    return stage("query", QUERY_NAMES.get(q, q))
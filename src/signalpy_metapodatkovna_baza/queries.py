@@ -1,9 +1,59 @@
+# every table read by the queries below
+tables = (
+    "station_information",
+    "country",
+    "coordinates",
+    "receiver_log",
+    "receiver",
+    "antenna_log",
+    "antenna",
+    "antenna_type",
+    "surveyed_local_ties",
+    "surveyed_local_ties_to_station_information",
+    "frequency_standard_log",
+    "collocation_information",
+    "collocation_information_to_station_information",
+    "humidity_sensor_log",
+    "humidity_sensor",
+    "humidity_sensor_type",
+    "pressure_sensor_log",
+    "pressure_sensor",
+    "pressure_sensor_type",
+    "temperature_sensor_log",
+    "temperature_sensor",
+    "temperature_sensor_type",
+    "water_vapor_radiometer_log",
+    "water_vapor_radiometer",
+    "water_vapor_radiometer_type",
+    "other_meteorological_instrumentation_log",
+    "radio_interference_log",
+    "multipath_source_log",
+    "signal_obstruction_log",
+    "local_episodic_effect_log",
+    "point_of_contact_agency_log",
+    "agency",
+    "contact",
+    "more_information_log",
+)
+
 station_data = (
     "SELECT si.*, c.country_name "
     "FROM station_information AS si, country AS c "
     "WHERE si.country_iso3_code = c.country_iso3_code AND si.nine_char_id = %s"
 )
 
+station_data_by_id = (
+    "SELECT si.*, c.country_name "
+    "FROM station_information AS si, country AS c "
+    "WHERE si.country_iso3_code = c.country_iso3_code AND si.station_id = %s"
+)
+
+station_list = (
+    "SELECT station_id, nine_char_id "
+    "FROM station_information "
+    "ORDER BY country_iso3_code, four_char_id"
+)
+
 station_coordinates = (
     "SELECT * " "FROM coordinates " "WHERE station_id = %s AND valid_to is null"
 )
@@ -22,6 +72,29 @@ antenna_history = (
     "ORDER BY date_installed ASC"
 )
 
+station_coordinates_all = (
+    'SELECT si.station_id, si.nine_char_id, si.four_char_id, c."X", c."Y", c."Z" '
+    "FROM station_information AS si, coordinates AS c "
+    "WHERE si.station_id = c.station_id AND c.valid_to is null "
+    "ORDER BY si.nine_char_id ASC"
+)
+
+# whole-network histories, grouped by station
+receiver_history_all = (
+    "SELECT rl.*, r.receiver_igs_name, r.serial_number, si.nine_char_id, si.four_char_id "
+    "FROM receiver_log AS rl, receiver AS r, station_information AS si "
+    "WHERE rl.receiver_id = r.receiver_id AND rl.station_id = si.station_id "
+    "ORDER BY si.nine_char_id ASC, rl.date_installed ASC"
+)
+
+antenna_history_all = (
+    "SELECT al.*, a.antenna_igs_name, a.serial_number, a.radome_igs_code, a.radome_serial_number, at.arp_code, "
+    "si.nine_char_id, si.four_char_id "
+    "FROM antenna_log AS al, antenna AS a, antenna_type AS at, station_information AS si "
+    "WHERE al.antenna_id = a.antenna_id AND a.antenna_igs_name = at.antenna_igs_name AND al.station_id = si.station_id "
+    "ORDER BY si.nine_char_id ASC, al.date_installed ASC"
+)
+
 surveyed_local_ties = (
     "SELECT slt.*, slt2si.station_id "
     "FROM surveyed_local_ties AS slt, surveyed_local_ties_to_station_information AS slt2si "
@@ -123,3 +196,214 @@ agency = (
 )
 
 more_information = "SELECT * " "FROM more_information_log " "WHERE station_id = %s"
+
+# SITE/ID rows of every station with current coordinates (sinex.py)
+site_id_all = (
+    'SELECT si.nine_char_id, si.four_char_id, si.domes_number, si.city, c.country_name, co."X", co."Y", co."Z" '
+    "FROM station_information AS si, country AS c, coordinates AS co "
+    "WHERE si.country_iso3_code = c.country_iso3_code AND si.station_id = co.station_id AND co.valid_to is null "
+    "ORDER BY si.nine_char_id ASC"
+)
+
+# whole-network versions of the station queries above, for loading every station at once (export.py);
+# rows are grouped by station_id, within a station they keep the order of the single-station query
+station_data_all = (
+    "SELECT si.*, c.country_name "
+    "FROM station_information AS si, country AS c "
+    "WHERE si.country_iso3_code = c.country_iso3_code "
+    "ORDER BY si.country_iso3_code, si.four_char_id, si.station_id"
+)
+
+coordinates_all = "SELECT * " "FROM coordinates " "WHERE valid_to is null"
+
+surveyed_local_ties_all = (
+    "SELECT slt.*, slt2si.station_id "
+    "FROM surveyed_local_ties AS slt, surveyed_local_ties_to_station_information AS slt2si "
+    "WHERE slt.local_tie_id = slt2si.local_tie_id "
+    "ORDER BY local_tie_id asc"
+)
+
+frequency_standard_history_all = (
+    "SELECT * FROM frequency_standard_log " "ORDER BY effective_date_start ASC"
+)
+
+collocation_information_all = (
+    "SELECT ci.*, cisi.station_id "
+    "FROM collocation_information AS ci, collocation_information_to_station_information AS cisi "
+    "WHERE ci.collocation_id = cisi.collocation_id"
+)
+
+humidity_sensor_all = (
+    "SELECT hsl.*, hs.serial_number, hst.* "
+    "FROM humidity_sensor_log AS hsl, humidity_sensor AS hs, humidity_sensor_type AS hst "
+    "WHERE hsl.humidity_sensor_id = hs.humidity_sensor_id AND hs.model = hst.humidity_sensor_model AND "
+    "hs.manufacturer = hst.manufacturer "
+    "ORDER BY effective_date_start ASC"
+)
+
+pressure_sensor_all = (
+    "SELECT psl.*, ps.serial_number, pst.* "
+    "FROM pressure_sensor_log AS psl, pressure_sensor AS ps, pressure_sensor_type AS pst "
+    "WHERE psl.pressure_sensor_id = ps.pressure_sensor_id AND ps.model = pst.pressure_sensor_model AND "
+    "ps.manufacturer = pst.manufacturer "
+    "ORDER BY effective_date_start ASC"
+)
+
+temperature_sensor_all = (
+    "SELECT tsl.*, ts.serial_number, tst.* "
+    "FROM temperature_sensor_log AS tsl, temperature_sensor AS ts, temperature_sensor_type AS tst "
+    "WHERE tsl.temperature_sensor_id = ts.temperature_sensor_id AND "
+    "ts.model = tst.temperature_sensor_model AND ts.manufacturer = tst.manufacturer "
+    "ORDER BY effective_date_start ASC"
+)
+
+water_vapor_radiometer_all = (
+    "SELECT wvrl.*, wvr.serial_number, wvrt.* "
+    "FROM water_vapor_radiometer_log AS wvrl, water_vapor_radiometer AS wvr, water_vapor_radiometer_type AS wvrt "
+    "WHERE wvrl.water_vapor_radiometer_id = wvr.water_vapor_radiometer_id AND "
+    "wvr.model = wvrt.water_vapor_radiometer_model AND wvr.manufacturer = wvrt.manufacturer "
+    "ORDER BY effective_date_start ASC"
+)
+
+other_meteorological_instrumentation_all = (
+    "SELECT omil.* "
+    "FROM other_meteorological_instrumentation_log AS omil "
+    "ORDER BY instrument_id ASC"
+)
+
+radio_interference_all = (
+    "SELECT * " "FROM radio_interference_log " "ORDER BY effective_date_start ASC"
+)
+
+multipath_source_all = (
+    "SELECT * " "FROM multipath_source_log " "ORDER BY effective_date_start ASC"
+)
+
+signal_obstruction_all = (
+    "SELECT * " "FROM signal_obstruction_log " "ORDER BY effective_date_start ASC"
+)
+
+local_episodic_effect_all = (
+    "SELECT * " "FROM local_episodic_effect_log " "ORDER BY date_start ASC, event ASC"
+)
+
+agency_all = (
+    "SELECT * "
+    "FROM point_of_contact_agency_log AS poc, agency AS a "
+    "WHERE poc.point_of_contact_agency_id=a.agency_id"
+)
+
+contact_all = "SELECT * " "FROM contact"
+
+more_information_all = "SELECT * " "FROM more_information_log"
+
+# materialized view holding everything the crux writer needs, one row per receiver/antenna interval
+crux_view_select = (
+    "SELECT si.station_id, si.country_iso3_code, si.four_char_id, si.domes_number, "
+    'c."X", c."Y", c."Z", ag.abbreviation AS agency_abbreviation, '
+    "e.equipment, e.date_installed, e.date_removed, e.serial_number, e.igs_name, e.radome_igs_code, "
+    "e.receiver_fw_version, e.me_fw_version, e.delta_h, e.delta_n, e.delta_e "
+    "FROM station_information AS si "
+    "JOIN coordinates AS c ON c.station_id = si.station_id AND c.valid_to is null "
+    "LEFT JOIN LATERAL ("
+    "SELECT a.abbreviation "
+    "FROM point_of_contact_agency_log AS poc, agency AS a "
+    "WHERE poc.station_id = si.station_id AND poc.point_of_contact_agency_id=a.agency_id "
+    "LIMIT 1"
+    ") AS ag ON TRUE "
+    "LEFT JOIN ("
+    "SELECT rl.station_id, 'receiver' AS equipment, rl.date_installed, rl.date_removed, r.serial_number, "
+    "r.receiver_igs_name AS igs_name, NULL AS radome_igs_code, rl.receiver_fw_version, rl.me_fw_version, "
+    "NULL AS delta_h, NULL AS delta_n, NULL AS delta_e "
+    "FROM receiver_log AS rl, receiver AS r "
+    "WHERE rl.receiver_id = r.receiver_id "
+    "UNION ALL "
+    "SELECT al.station_id, 'antenna' AS equipment, al.date_installed, al.date_removed, a.serial_number, "
+    "a.antenna_igs_name AS igs_name, a.radome_igs_code, NULL, NULL, al.delta_h, al.delta_n, al.delta_e "
+    "FROM antenna_log AS al, antenna AS a, antenna_type AS at "
+    "WHERE al.antenna_id = a.antenna_id AND a.antenna_igs_name = at.antenna_igs_name"
+    ") AS e ON e.station_id = si.station_id "
+    "ORDER BY si.country_iso3_code, si.four_char_id, si.station_id, e.equipment DESC, e.date_installed ASC"
+)
+
+crux_view_create = (
+    "CREATE MATERIALIZED VIEW IF NOT EXISTS crux_export AS " + crux_view_select
+)
+
+# REFRESH ... CONCURRENTLY requires a unique index on the view
+crux_view_index = (
+    "CREATE UNIQUE INDEX IF NOT EXISTS crux_export_key "
+    "ON crux_export (station_id, equipment, date_installed)"
+)
+
+crux_view_refresh = "REFRESH MATERIALIZED VIEW CONCURRENTLY crux_export"
+
+crux_view_data = (
+    "SELECT * "
+    "FROM crux_export "
+    "ORDER BY country_iso3_code, four_char_id, station_id, equipment DESC, date_installed ASC"
+)
+
+# intervals installed or removed since a date, plus the current ones of stations whose coordinates changed since then
+crux_view_data_since = (
+    "SELECT * "
+    "FROM crux_export "
+    "WHERE date_installed >= %s OR date_removed >= %s OR (date_removed is null AND station_id IN ("
+    "SELECT station_id FROM coordinates WHERE valid_to is null AND valid_from >= %s)) "
+    "ORDER BY country_iso3_code, four_char_id, station_id, equipment DESC, date_installed ASC"
+)
+
+# column-typed tables for the Parquet export (parquet.py); the column order matches parquet.TABLES
+parquet_stations = (
+    "SELECT si.station_id, si.nine_char_id, si.four_char_id, si.country_iso3_code, c.country_name, si.site_name, "
+    "si.domes_number, si.monument_description, si.monument_height, si.foundation_depth, si.date_installed, "
+    'si.city, si.state_province, si.tectonic_plate, co."X", co."Y", co."Z", co.reference_frame, co.valid_from '
+    "FROM station_information AS si "
+    "JOIN country AS c ON si.country_iso3_code = c.country_iso3_code "
+    "LEFT JOIN coordinates AS co ON co.station_id = si.station_id AND co.valid_to is null "
+    "ORDER BY si.nine_char_id ASC"
+)
+
+parquet_receivers = (
+    "SELECT rl.station_id, si.nine_char_id, r.receiver_igs_name, r.serial_number, rl.receiver_fw_version, "
+    "rl.me_fw_version, rl.gps, rl.glo, rl.gal, rl.bds, rl.qzss, rl.irnss, rl.sbas, rl.elevation_cutoff, "
+    "rl.date_installed, rl.date_removed, rl.temperature_stabilization "
+    "FROM receiver_log AS rl, receiver AS r, station_information AS si "
+    "WHERE rl.receiver_id = r.receiver_id AND rl.station_id = si.station_id "
+    "ORDER BY si.nine_char_id ASC, rl.date_installed ASC"
+)
+
+parquet_antennas = (
+    "SELECT al.station_id, si.nine_char_id, a.antenna_igs_name, a.serial_number, a.radome_igs_code, "
+    "a.radome_serial_number, at.arp_code, al.delta_h, al.delta_n, al.delta_e, al.alignment_from_north, "
+    "al.cable_type, al.cable_length, al.date_installed, al.date_removed "
+    "FROM antenna_log AS al, antenna AS a, antenna_type AS at, station_information AS si "
+    "WHERE al.antenna_id = a.antenna_id AND a.antenna_igs_name = at.antenna_igs_name AND al.station_id = si.station_id "
+    "ORDER BY si.nine_char_id ASC, al.date_installed ASC"
+)
+
+parquet_met_sensors = (
+    "SELECT sl.station_id, si.nine_char_id, 'humidity_sensor' AS sensor, s.model, s.manufacturer, s.serial_number, "
+    "sl.data_sampling_interval, st.accuracy, sl.delta_h, sl.calibration_date, sl.effective_date_start, sl.effective_date_end "
+    "FROM humidity_sensor_log AS sl, humidity_sensor AS s, humidity_sensor_type AS st, station_information AS si "
+    "WHERE sl.humidity_sensor_id = s.humidity_sensor_id AND s.model = st.humidity_sensor_model AND "
+    "s.manufacturer = st.manufacturer AND sl.station_id = si.station_id "
+    "UNION ALL "
+    "SELECT sl.station_id, si.nine_char_id, 'pressure_sensor', s.model, s.manufacturer, s.serial_number, "
+    "sl.data_sampling_interval, st.accuracy, sl.delta_h, sl.calibration_date, sl.effective_date_start, sl.effective_date_end "
+    "FROM pressure_sensor_log AS sl, pressure_sensor AS s, pressure_sensor_type AS st, station_information AS si "
+    "WHERE sl.pressure_sensor_id = s.pressure_sensor_id AND s.model = st.pressure_sensor_model AND "
+    "s.manufacturer = st.manufacturer AND sl.station_id = si.station_id "
+    "UNION ALL "
+    "SELECT sl.station_id, si.nine_char_id, 'temperature_sensor', s.model, s.manufacturer, s.serial_number, "
+    "sl.data_sampling_interval, st.accuracy, sl.delta_h, sl.calibration_date, sl.effective_date_start, sl.effective_date_end "
+    "FROM temperature_sensor_log AS sl, temperature_sensor AS s, temperature_sensor_type AS st, station_information AS si "
+    "WHERE sl.temperature_sensor_id = s.temperature_sensor_id AND s.model = st.temperature_sensor_model AND "
+    "s.manufacturer = st.manufacturer AND sl.station_id = si.station_id "
+    "UNION ALL "
+    "SELECT sl.station_id, si.nine_char_id, 'water_vapor_radiometer', s.model, s.manufacturer, s.serial_number, "
+    "NULL, NULL, sl.delta_h, sl.calibration_date, sl.effective_date_start, sl.effective_date_end "
+    "FROM water_vapor_radiometer_log AS sl, water_vapor_radiometer AS s, station_information AS si "
+    "WHERE sl.water_vapor_radiometer_id = s.water_vapor_radiometer_id AND sl.station_id = si.station_id "
+    "ORDER BY nine_char_id ASC, sensor ASC, effective_date_start ASC"
+)
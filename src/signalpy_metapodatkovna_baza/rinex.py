@@ -0,0 +1,300 @@
+import argparse
+import concurrent.futures
+import contextlib
+import csv
+import datetime
+import gzip
+import math
+import os
+import re
+import sys
+
+from signalpy_metapodatkovna_baza import database, intervals, queries
+
+# observation files: RINEX 2 short names (.20o, .20d) and RINEX 3 long names (_MO.rnx, _MO.crx), optionally gzipped
+OBSERVATION_FILE = re.compile(r"(\.\d\d[od]|_MO\.(rnx|crx))(\.gz)?$", re.IGNORECASE)
+LONG_NAME = re.compile(r"^[A-Z0-9]{4}\d\d[A-Z]{3}_", re.IGNORECASE)
+
+MAX_HEADER_LINES = 1000
+
+# filled in every worker by init_worker
+_index = None  # type: intervals.EquipmentIndex
+_stations = None
+
+
+def read_header(file_path: str) -> dict:
+    # only the header is read; gzip decompresses no further than END OF HEADER
+    header = {}
+    opener = gzip.open if file_path.lower().endswith(".gz") else open
+    with opener(file_path, "rt", encoding="ascii", errors="replace") as f:
+        for n, line in enumerate(f):
+            label = line[60:80].strip()
+            if label == "END OF HEADER" or n > MAX_HEADER_LINES:
+                break
+
+            if label == "RINEX VERSION / TYPE":
+                header["version"] = line[:9].strip()
+            elif label == "MARKER NAME":
+                header["marker_name"] = line[:60].strip()
+            elif label == "REC # / TYPE / VERS":
+                header["receiver_serial_number"] = line[:20].strip()
+                header["receiver_type"] = line[20:40].strip()
+                header["receiver_fw_version"] = line[40:60].strip()
+            elif label == "ANT # / TYPE":
+                header["antenna_serial_number"] = line[:20].strip()
+                header["antenna_type"] = line[20:36].strip()
+                header["radome_type"] = line[36:40].strip() or "NONE"
+            elif label == "APPROX POSITION XYZ":
+                header["xyz"] = tuple(float(line[i : i + 14]) for i in (0, 14, 28))
+            elif label == "ANTENNA: DELTA H/E/N":
+                header["delta_hen"] = tuple(
+                    float(line[i : i + 14]) for i in (0, 14, 28)
+                )
+            elif label == "TIME OF FIRST OBS":
+                seconds = float(line[30:43])
+                header["epoch"] = datetime.datetime(
+                    *(int(line[i : i + 6]) for i in (0, 6, 12, 18, 24))
+                ) + datetime.timedelta(seconds=seconds)
+
+    return header
+
+
+def get_nine_char_id(file_path: str, header: dict):
+    name = os.path.basename(file_path)
+    if LONG_NAME.match(name):
+        nine_char_id = name[:9].upper()
+        return nine_char_id if nine_char_id in _stations["nine_char_id"] else None
+
+    # short names and marker names only carry the four character id
+    four_char_id = name[:4].upper()
+    if four_char_id not in _stations["four_char_id"]:
+        four_char_id = header.get("marker_name", "")[:4].upper()
+
+    return _stations["four_char_id"].get(four_char_id)
+
+
+def compare(mismatches: list, field: str, expected, found) -> None:
+    if found is not None and expected != found:
+        mismatches.append((field, str(expected), str(found)))
+
+
+def validate_header(header: dict, nine_char_id: str, xyz_tolerance: float) -> list:
+    # (field, expected, found) for every header record that disagrees with the database
+    mismatches = []
+    epoch = header.get("epoch")
+    if epoch is None:
+        return [("TIME OF FIRST OBS", "epoch", "missing")]
+
+    four_char_id, xyz = _stations["nine_char_id"][nine_char_id]
+    if header.get("marker_name", "").upper() not in (four_char_id, nine_char_id):
+        mismatches.append(("MARKER NAME", four_char_id, header.get("marker_name", "")))
+
+    if "xyz" in header and xyz is not None:
+        if math.dist(header["xyz"], xyz) > xyz_tolerance:
+            mismatches.append(
+                (
+                    "APPROX POSITION XYZ",
+                    " ".join(f"{c:.4f}" for c in xyz),
+                    " ".join(f"{c:.4f}" for c in header["xyz"]),
+                )
+            )
+
+    receiver = _index.receiver_at(nine_char_id, epoch)
+    if receiver is None:
+        mismatches.append(("REC # / TYPE / VERS", "no receiver installed", epoch))
+    else:
+        fw = (
+            f"{receiver.receiver_fw_version} / {receiver.me_fw_version}"
+            if receiver.me_fw_version
+            else f"{receiver.receiver_fw_version}"
+        )
+        compare(
+            mismatches,
+            "REC # / TYPE",
+            receiver.receiver_type.rstrip(),
+            header.get("receiver_type"),
+        )
+        if receiver.serial_number:
+            compare(
+                mismatches,
+                "REC #",
+                receiver.serial_number,
+                header.get("receiver_serial_number"),
+            )
+        compare(mismatches, "REC VERS", fw, header.get("receiver_fw_version"))
+
+    antenna = _index.antenna_at(nine_char_id, epoch)
+    if antenna is None:
+        mismatches.append(("ANT # / TYPE", "no antenna installed", epoch))
+    else:
+        compare(
+            mismatches,
+            "ANT TYPE",
+            antenna.antenna_type.rstrip(),
+            header.get("antenna_type"),
+        )
+        compare(
+            mismatches,
+            "ANT RADOME",
+            antenna.radome_type or "NONE",
+            header.get("radome_type"),
+        )
+        if antenna.serial_number:
+            compare(
+                mismatches,
+                "ANT #",
+                antenna.serial_number,
+                header.get("antenna_serial_number"),
+            )
+        if "delta_hen" in header and antenna.delta_h is not None:
+            compare(
+                mismatches,
+                "ANTENNA: DELTA H/E/N",
+                f"{antenna.delta_h:.4f} {antenna.delta_e:.4f} {antenna.delta_n:.4f}",
+                " ".join(f"{d:.4f}" for d in header["delta_hen"]),
+            )
+
+    return mismatches
+
+
+def validate_file(file_path: str, xyz_tolerance: float) -> list:
+    try:
+        header = read_header(file_path)
+    except (OSError, EOFError, ValueError) as e:
+        return [(file_path, "", "header", "readable RINEX header", str(e))]
+
+    nine_char_id = get_nine_char_id(file_path, header)
+    if nine_char_id is None:
+        return [(file_path, "", "station", "known station", header.get("marker_name"))]
+
+    return [
+        (file_path, nine_char_id, field, expected, found)
+        for field, expected, found in validate_header(
+            header, nine_char_id, xyz_tolerance
+        )
+    ]
+
+
+def init_worker(index: intervals.EquipmentIndex, stations: dict) -> None:
+    global _index, _stations
+    _index = index
+    _stations = stations
+
+
+def _validate_file(args) -> list:
+    return validate_file(*args)
+
+
+def find_observation_files(archive_dir: str):
+    for root, _, files in os.walk(archive_dir):
+        for name in files:
+            if OBSERVATION_FILE.search(name):
+                yield os.path.join(root, name)
+
+
+def load_stations(db_connection) -> dict:
+    stations_qr = database.execute_query(
+        db_connection, queries.station_coordinates_all, ()
+    )
+    # plain tuples, so the lookup tables can be pickled to workers
+    return {
+        "nine_char_id": {
+            s.nine_char_id.upper(): (
+                s.four_char_id.upper(),
+                (float(s.X), float(s.Y), float(s.Z)) if s.X is not None else None,
+            )
+            for s in stations_qr
+        },
+        "four_char_id": {
+            s.four_char_id.upper(): s.nine_char_id.upper() for s in stations_qr
+        },
+    }
+
+
+def validate_archive(
+    archive_dir: str,
+    db_connection,
+    jobs: int = None,
+    xyz_tolerance: float = 5.0,
+    chunksize: int = 256,
+):
+    # bulk-load station histories once; each worker gets a copy and only reads headers
+    index = intervals.load_equipment_index(db_connection)
+    stations = load_stations(db_connection)
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=jobs, initializer=init_worker, initargs=(index, stations)
+    ) as executor:
+        for mismatches in executor.map(
+            _validate_file,
+            ((f, xyz_tolerance) for f in find_observation_files(archive_dir)),
+            chunksize=chunksize,
+        ):
+            yield from mismatches
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+
+    arg_parser.add_argument(
+        "archive_dir",
+        help="Directory searched recursively for RINEX observation files.",
+        type=str,
+    )
+
+    arg_parser.add_argument(
+        "-o",
+        "--out",
+        help="Write mismatches to this CSV file instead of printing them.",
+        type=str,
+        default=None,
+    )
+
+    arg_parser.add_argument(
+        "-j",
+        "--jobs",
+        help="Number of worker processes (default: number of CPUs).",
+        type=int,
+        default=None,
+    )
+
+    arg_parser.add_argument(
+        "--xyz_tolerance",
+        help="Allowed distance (m) between APPROX POSITION XYZ and the station coordinates.",
+        type=float,
+        default=5.0,
+    )
+
+    arg_parser.add_argument(
+        "-s",
+        "--snapshot",
+        help="Read station data from a local SQLite snapshot (see snapshot.py) instead of the database.",
+        type=str,
+        default=None,
+    )
+
+    input_arguments = arg_parser.parse_args()
+
+    connection = database.connect("database.ini", input_arguments.snapshot)
+    results = validate_archive(
+        input_arguments.archive_dir,
+        connection,
+        jobs=input_arguments.jobs,
+        xyz_tolerance=input_arguments.xyz_tolerance,
+    )
+
+    n = 0
+    with (
+        open(input_arguments.out, "w", encoding="UTF-8", newline="")
+        if input_arguments.out
+        else contextlib.nullcontext(sys.stdout)
+    ) as f:
+        writer = csv.writer(f)
+        writer.writerow(("file", "station", "field", "expected", "found"))
+        for mismatch in results:
+            writer.writerow(mismatch)
+            n += 1
+
+    connection.close()
+
+    print(f"{n} mismatches found.", file=sys.stderr)
@@ -0,0 +1,280 @@
+import argparse
+import collections
+import contextlib
+import datetime
+import hashlib
+import http.server
+import os
+import threading
+import urllib.parse
+
+from signalpy_metapodatkovna_baza import daemon, database, db2crux, db2log, templates
+
+
+class RenderCache(object):
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        # key -> (station_id, etag, body); station_id None marks documents spanning the whole network
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+        # increased by every invalidation; station_id -> generation of its last invalidation,
+        # None -> generation of the last clear()
+        self.generation = 0
+        self.invalidated = {}
+
+    def get_generation(self) -> int:
+        # taken before the data of an entry is read, and passed to put()
+        with self.lock:
+            return self.generation
+
+    def get(self, key):
+        with self.lock:
+            try:
+                self.entries.move_to_end(key)
+            except KeyError:
+                return None
+            return self.entries[key]
+
+    def is_stale(self, station_id, generation: int) -> bool:
+        # called with the lock held
+        if station_id is None:
+            return self.generation > generation
+        return (
+            max(self.invalidated.get(station_id, 0), self.invalidated.get(None, 0))
+            > generation
+        )
+
+    def put(self, key, station_id, text: str, generation: int):
+        body = text.encode("UTF-8")
+        entry = (station_id, f'"{hashlib.sha256(body).hexdigest()}"', body)
+        with self.lock:
+            # invalidated while the data was read: the entry is served, but not cached
+            if self.is_stale(station_id, generation):
+                return entry
+
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, station_id: int) -> None:
+        with self.lock:
+            self.generation += 1
+            self.invalidated[station_id] = self.generation
+            for key in [
+                key
+                for key, entry in self.entries.items()
+                if entry[0] is None or entry[0] == station_id
+            ]:
+                del self.entries[key]
+
+    def clear(self) -> None:
+        with self.lock:
+            self.generation += 1
+            self.invalidated[None] = self.generation
+            self.entries.clear()
+
+
+class SiteLogServer(http.server.ThreadingHTTPServer):
+    def __init__(
+        self,
+        address,
+        config_file="database.ini",
+        gra_file="antenna.gra",
+        prepared_by="",
+        max_connections=8,
+        max_entries=1024,
+    ):
+        super().__init__(address, RequestHandler)
+        self.config_file = config_file
+        self.gra_file = gra_file
+        self.prepared_by = prepared_by
+        self.cache = RenderCache(max_entries)
+        # (cache generation, date) of the last crux_export refresh
+        self.view_refreshed = None
+        self.view_lock = threading.Lock()
+
+        self.pool = database.get_psycopg2().pool.ThreadedConnectionPool(
+            1, max_connections, **database.get_connection_settings(config_file)
+        )
+        # the pool raises instead of blocking when exhausted
+        self.pool_slots = threading.BoundedSemaphore(max_connections)
+
+        # warm antenna.gra index
+        if os.path.exists(gra_file):
+            db2log.read_antenna_gra(gra_file)
+
+    @contextlib.contextmanager
+    def connection(self):
+        with self.pool_slots:
+            db_connection = self.pool.getconn()
+            try:
+                yield db_connection
+            finally:
+                db_connection.rollback()
+                self.pool.putconn(db_connection)
+
+    def get_sitelog(self, nine_char_id: str):
+        key = ("sitelog", nine_char_id, datetime.date.today())
+        entry = self.cache.get(key)
+        if entry:
+            return entry
+
+        generation = self.cache.get_generation()
+        with self.connection() as db_connection:
+            data = db2log.get_station_data(db_connection, nine_char_id)
+
+        if data is None:
+            return None
+
+        header = templates.Header(site_name=nine_char_id)
+        form = db2log.get_form(self.prepared_by)
+        text = db2log.get_log_text(header, form, data, self.gra_file)
+
+        return self.cache.put(key, data["station_id"], text, generation)
+
+    def refresh_crux_view(self, db_connection, generation: int) -> None:
+        # the view is refreshed on demand: on the first request of the day and after stations changed
+        with self.view_lock:
+            if self.view_refreshed != (generation, datetime.date.today()):
+                db2crux.refresh_crux_view(db_connection)
+                self.view_refreshed = (generation, datetime.date.today())
+
+    def get_crux(self):
+        key = ("crux_file", datetime.date.today())
+        entry = self.cache.get(key)
+        if entry:
+            return entry
+
+        generation = self.cache.get_generation()
+        with self.connection() as db_connection:
+            self.refresh_crux_view(db_connection, generation)
+            # one scan of the view instead of several queries per station
+            network = db2crux.get_network_data(db_connection)
+
+        text = db2crux.get_crux_header() + "".join(
+            db2crux.get_crux_block(data) for data in network
+        )
+
+        return self.cache.put(key, None, text, generation)
+
+    def listen_for_changes(self) -> None:
+        psycopg2 = database.get_psycopg2()
+        while True:
+            try:
+                listen_connection = daemon.listen(self.config_file)
+                # anything may have changed while not listening
+                self.cache.clear()
+                while True:
+                    for station_id in daemon.wait_for_changes(
+                        listen_connection, debounce=0.1, max_delay=1.0
+                    ):
+                        self.cache.invalidate(station_id)
+            except psycopg2.OperationalError as e:
+                print(f"Lost listen connection: {e}. Reconnecting.")
+                threading.Event().wait(5)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match is * or a list of entity tags, compared without their weak W/ prefix
+    if if_none_match.strip() == "*":
+        return True
+
+    return etag in {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+
+
+class RequestHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = urllib.parse.urlsplit(self.path).path.rstrip("/")
+
+        if path.startswith("/sitelog/"):
+            entry = self.server.get_sitelog(urllib.parse.unquote(path[9:]))
+        elif path == "/crux":
+            entry = self.server.get_crux()
+        else:
+            entry = None
+
+        if entry is None:
+            self.send_error(404)
+            return
+
+        _, etag, body = entry
+        if etag_matches(self.headers.get("If-None-Match", ""), etag):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+
+    arg_parser.add_argument(
+        "--host", help="Address to bind to.", type=str, default="127.0.0.1"
+    )
+
+    arg_parser.add_argument(
+        "-p", "--port", help="Port to listen on.", type=int, default=8080
+    )
+
+    arg_parser.add_argument(
+        "-c",
+        "--config",
+        help="Database connection settings file.",
+        type=str,
+        default="database.ini",
+    )
+
+    arg_parser.add_argument(
+        "-a",
+        "--author",
+        help="Value for " "Prepared by" " field in log files.",
+        type=str,
+        default="",
+    )
+
+    arg_parser.add_argument(
+        "--connections",
+        help="Maximum number of pooled database connections.",
+        type=int,
+        default=8,
+    )
+
+    arg_parser.add_argument(
+        "--cache_size",
+        help="Maximum number of rendered documents kept in memory.",
+        type=int,
+        default=1024,
+    )
+
+    arg_parser.add_argument(
+        "-l",
+        "--listen",
+        help="Invalidate cached stations on notifications from the triggers installed by daemon.py.",
+        action="store_true",
+    )
+
+    input_arguments = arg_parser.parse_args()
+
+    server = SiteLogServer(
+        (input_arguments.host, input_arguments.port),
+        config_file=input_arguments.config,
+        prepared_by=input_arguments.author,
+        max_connections=input_arguments.connections,
+        max_entries=input_arguments.cache_size,
+    )
+
+    if input_arguments.listen:
+        threading.Thread(target=server.listen_for_changes, daemon=True).start()
+
+    print(f"Serving on http://{input_arguments.host}:{input_arguments.port}")
+    server.serve_forever()
@@ -0,0 +1,181 @@
+import argparse
+import datetime
+import os
+
+from signalpy_metapodatkovna_baza import profiling, queries, templates
+from signalpy_metapodatkovna_baza.database import connect, iterate_query
+from utils import transformations
+
+SINEX_VERSION = "2.02"
+
+# blocks in the order they are written; each is streamed from its own query
+BLOCKS = ("SITE/ID", "SITE/RECEIVER", "SITE/ANTENNA", "SITE/ECCENTRICITY")
+
+BLOCK_HEADERS = {
+    "SITE/ID": "*CODE PT __DOMES__ T _STATION DESCRIPTION__ APPROX_LON_ APPROX_LAT_ _APP_H_\n",
+    "SITE/RECEIVER": "*CODE PT SOLN T _DATA START_ __DATA_END__ ___RECEIVER_TYPE____ _S/N_ _FIRMWARE__\n",
+    "SITE/ANTENNA": "*CODE PT SOLN T _DATA START_ __DATA_END__ ____ANTENNA_TYPE____ _S/N_\n",
+    "SITE/ECCENTRICITY": (
+        "*                                             UP______ NORTH___ EAST____\n"
+        "*CODE PT SOLN T _DATA START_ __DATA_END__ AXE ARP->BENCHMARK(M)_________\n"
+    ),
+}
+
+# point code, solution number (---- = all solutions) and observation technique (P = GNSS)
+POINT_CODE = "A"
+SOLUTION = "----"
+TECHNIQUE = "P"
+
+
+def sinex_date(date: datetime.datetime) -> str:
+    # YY:DOY:SSSSS, 00:000:00000 for an open end
+    if date is None:
+        return "00:000:00000"
+
+    seconds = date.hour * 3600 + date.minute * 60 + date.second
+    return f"{date.year % 100:02d}:{date.timetuple().tm_yday:03d}:{seconds:05d}"
+
+
+def sinex_angle(degrees: float) -> str:
+    # I3 degrees, I2 minutes, F4.1 seconds, rounded in tenths of a second so 60.0" never appears
+    tenths = round(abs(degrees) * 36000)
+    d, tenths = divmod(tenths, 36000)
+    m, tenths = divmod(tenths, 600)
+    # the sign is on the degrees, so it is kept as -0 for angles between -1 and 0 degrees
+    d = f"-{d}" if degrees < 0 else f"{d}"
+    return f"{d:>3} {m:2d} {tenths / 10:4.1f}"
+
+
+def get_header(agency: str, created: datetime.datetime) -> str:
+    return (
+        f"%=SNX {SINEX_VERSION} {agency:3.3} {sinex_date(created)} {agency:3.3} "
+        f"00:000:00000 00:000:00000 {TECHNIQUE} 00000 0\n"
+    )
+
+
+def get_site_id_line(site_qr) -> str:
+    llh = transformations.ecef2geodetic(
+        float(site_qr.X),
+        float(site_qr.Y),
+        float(site_qr.Z),
+        unit="deg",
+        ellipsoid=transformations.GRS80,
+    )
+    description = ", ".join(s for s in (site_qr.city, site_qr.country_name) if s)
+    return (
+        f" {site_qr.four_char_id:4.4} {POINT_CODE:>2} {templates.xstr(site_qr.domes_number):9.9} "
+        f"{TECHNIQUE} {description:22.22} {sinex_angle(llh['lon'] % 360)} "
+        f"{sinex_angle(llh['lat'])} {llh['h']:7.1f}\n"
+    )
+
+
+def get_interval(four_char_id: str, equipment) -> str:
+    return (
+        f" {four_char_id:4.4} {POINT_CODE:>2} {SOLUTION:>4} {TECHNIQUE} "
+        f"{sinex_date(equipment.date_installed)} {sinex_date(equipment.date_removed)}"
+    )
+
+
+def get_receiver_line(four_char_id: str, receiver: templates.Receiver) -> str:
+    fw = templates.merge_fw_versions(
+        receiver.receiver_fw_version, receiver.me_fw_version
+    )
+    return (
+        f"{get_interval(four_char_id, receiver)} {receiver.receiver_type.rstrip():20.20} "
+        f"{receiver.serial_number or '-----':5.5} {fw:11.11}\n"
+    )
+
+
+def get_antenna_line(four_char_id: str, antenna: templates.Antenna) -> str:
+    # antenna type is the IGS antenna code (A15 + blank) followed by the radome code (A4)
+    antenna_type = (
+        f"{antenna.antenna_type.rstrip():16.16}{antenna.radome_type or 'NONE':4.4}"
+    )
+    return (
+        f"{get_interval(four_char_id, antenna)} {antenna_type} "
+        f"{antenna.serial_number or '-----':5.5}\n"
+    )
+
+
+def get_eccentricity_line(four_char_id: str, antenna: templates.Antenna) -> str:
+    return (
+        f"{get_interval(four_char_id, antenna)} UNE "
+        f"{antenna.delta_h:8.4f} {antenna.delta_n:8.4f} {antenna.delta_e:8.4f}\n"
+    )
+
+
+def get_block_lines(db_connection, block: str):
+    # one row in, one line out; nothing is kept between rows
+    if block == "SITE/ID":
+        for site_qr in iterate_query(db_connection, queries.site_id_all, (), "site_id"):
+            yield get_site_id_line(site_qr)
+
+    elif block == "SITE/RECEIVER":
+        for rl in iterate_query(
+            db_connection, queries.receiver_history_all, (), "site_receiver"
+        ):
+            yield get_receiver_line(rl.four_char_id, templates.Receiver.from_query(rl))
+
+    elif block == "SITE/ANTENNA":
+        for al in iterate_query(
+            db_connection, queries.antenna_history_all, (), "site_antenna"
+        ):
+            yield get_antenna_line(al.four_char_id, templates.Antenna.from_query(al))
+
+    elif block == "SITE/ECCENTRICITY":
+        for al in iterate_query(
+            db_connection, queries.antenna_history_all, (), "site_eccentricity"
+        ):
+            yield get_eccentricity_line(
+                al.four_char_id, templates.Antenna.from_query(al)
+            )
+
+
+def write_sinex_file(file_path: str, db_connection, agency: str = "SIG") -> None:
+    with profiling.stage("write", os.path.basename(file_path)):
+        with open(file_path, "w", encoding="ascii", errors="replace") as snx:
+            snx.write(get_header(agency, datetime.datetime.now()))
+
+            for block in BLOCKS:
+                snx.write(f"+{block}\n")
+                snx.write(BLOCK_HEADERS[block])
+                snx.writelines(get_block_lines(db_connection, block))
+                snx.write(f"-{block}\n")
+
+            snx.write("%ENDSNX\n")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+
+    arg_parser.add_argument(
+        "-o",
+        "--out",
+        help="SINEX file to write (default: SI-CORS.snx in the script directory).",
+        type=str,
+        default="SI-CORS.snx",
+    )
+
+    arg_parser.add_argument(
+        "-g",
+        "--agency",
+        help="Three character agency code written in the SINEX header (default: SIG).",
+        type=str,
+        default="SIG",
+    )
+
+    arg_parser.add_argument(
+        "-s",
+        "--snapshot",
+        help="Read station data from a local SQLite snapshot (see snapshot.py) instead of the database.",
+        type=str,
+        default=None,
+    )
+
+    input_arguments = arg_parser.parse_args()
+
+    connection = connect("database.ini", input_arguments.snapshot)
+    write_sinex_file(input_arguments.out, connection, input_arguments.agency)
+    connection.close()
+
+    print(f"SINEX file {os.path.basename(input_arguments.out)} successfully saved.")
@@ -0,0 +1,589 @@
+import argparse
+import datetime
+import decimal
+import hashlib
+import os
+import sys
+import time
+
+from signalpy_metapodatkovna_baza import templates
+
+# in every "Label : value" line the colon is in column 31, continuation lines leave the label empty
+VALUE_COLUMN = 30
+
+SATELLITE_SYSTEMS = ("GPS", "GLO", "GAL", "BDS", "QZSS", "IRNSS", "SBAS")
+
+CONTACT_LABELS = (
+    "Contact Name",
+    "Telephone (primary)",
+    "Telephone (secondary)",
+    "Fax",
+    "E-mail",
+)
+
+# sections 1., 2., 11., 12. and 13. are written as one block of fields
+SECTIONS = {
+    "0": "form",
+    "1": "station_info",
+    "2": "station_info",
+    "11": "point_of_contact_agency",
+    "12": "responsible_agency",
+    "13": "more_information",
+}
+
+# numbered entries (3.1, 8.1.1, 10.1, ...) of the list sections
+ENTRIES = {
+    "3": "receivers",
+    "4": "antennas",
+    "5": "local_ties",
+    "6": "frequency_standards",
+    "7": "collocations",
+    "8.1": "humidity_sensors",
+    "8.2": "pressure_sensors",
+    "8.3": "temperature_sensors",
+    "8.4": "water_vapor_radiometers",
+    "8.5": "other_meteorological_instrumentation",
+    "9.1": "radio_interferences",
+    "9.2": "multipath_sources",
+    "9.3": "signal_obstructions",
+    "10": "local_episodic_effects",
+}
+
+ENTRY_ID_CHARACTERS = frozenset("0123456789.x")
+
+
+def strip_unit(s: str, unit: str) -> str:
+    return s[: -len(unit)].rstrip() if s.endswith(" " + unit) else s
+
+
+def to_decimal(s: str, unit: str = None):
+    s = strip_unit(s, unit) if unit else s
+    if not s or s == "None":
+        return None
+    try:
+        return decimal.Decimal(s)
+    except decimal.InvalidOperation:
+        return s
+
+
+def to_int(s: str, unit: str = None):
+    s = strip_unit(s, unit) if unit else s
+    if not s or s == "None":
+        return None
+    try:
+        return int(s)
+    except ValueError:
+        return s
+
+
+def to_datetime(s: str):
+    # fixed-width CCYY-MM-DDThh:mmZ, fromisoformat is much faster than strptime
+    if not s or s.startswith(("CCYY", "(")) or s == "None":
+        return None
+    return datetime.datetime.fromisoformat(s[:16] if s[10:11] == "T" else s[:10])
+
+
+def to_date(s: str):
+    if not s or s.startswith(("CCYY", "(")) or s == "None":
+        return None
+    return datetime.date.fromisoformat(s[:10])
+
+
+def to_dates(s: str) -> tuple:
+    start, _, end = s.partition("/")
+    return to_date(start.strip()), to_date(end.strip())
+
+
+def to_dms(s: str, degree_digits: int) -> tuple:
+    # +DDMMSS.ssssss / +DDDMMSS.ssssss
+    return (
+        int(s[: degree_digits + 1]),
+        int(s[degree_digits + 1 : degree_digits + 3]),
+        float(s[degree_digits + 3 :]),
+    )
+
+
+def to_satellite_systems(s: str) -> dict:
+    systems = set(s.split("+"))
+    satellite_system = {k: k in systems for k in SATELLITE_SYSTEMS}
+    for k in s.split("+"):
+        if k and k not in satellite_system:
+            satellite_system[k] = True
+
+    return satellite_system
+
+
+def get_form(f: dict) -> templates.Form:
+    return templates.Form(
+        prepared_by=f.get("Prepared by (full name)", ""),
+        date_prepared=to_date(f.get("Date Prepared", "")),
+        report_type=f.get("Report Type", ""),
+        previous_site_log=f.get("Previous Site Log", ""),
+        modified_added_sections=f.get("Modified/Added Sections", ""),
+    )
+
+
+def get_site(f: dict, site_name: str) -> templates.Site:
+    four_char_id = f.get("Four Character ID") or f.get("Nine Character ID", "")[:4]
+    position_xyz = {
+        "X": float(f["X coordinate (m)"]) if f.get("X coordinate (m)") else None,
+        "Y": float(f["Y coordinate (m)"]) if f.get("Y coordinate (m)") else None,
+        "Z": float(f["Z coordinate (m)"]) if f.get("Z coordinate (m)") else None,
+        "reference_frame": f.get("reference_frame"),
+    }
+    position_llh = (
+        {
+            "lat": to_dms(f["Latitude (N is +)"], 2),
+            "lon": to_dms(f["Longitude (E is +)"], 3),
+            "h": float(f.get("Elevation (m,ellips.)") or 0),
+        }
+        if f.get("Latitude (N is +)") and f.get("Longitude (E is +)")
+        else None
+    )
+
+    return templates.Site(
+        site_name=f.get("Site Name", site_name),
+        four_char_id=four_char_id,
+        monument_inscription=f.get("Monument Inscription", ""),
+        domes_number=f.get("IERS DOMES Number", ""),
+        cdp_number=f.get("CDP Number", ""),
+        monument_description=f.get("Monument Description", ""),
+        monument_height=to_decimal(f.get("Height of the Monument", ""), "m"),
+        monument_foundation=f.get("Monument Foundation", ""),
+        foundation_depth=to_decimal(f.get("Foundation Depth", ""), "m"),
+        marker_description=f.get("Marker Description", ""),
+        date_installed=to_datetime(f.get("Date Installed", "")),
+        geologic_characteristic=f.get("Geologic Characteristic", ""),
+        bedrock_type=f.get("Bedrock Type", ""),
+        bedrock_condition=f.get("Bedrock Condition", ""),
+        fracture_spacing=f.get("Fracture Spacing", ""),
+        fault_zones_nearby=f.get("Fault zones nearby", ""),
+        distance_activity=f.get("Distance/activity", ""),
+        additional_information_1=f.get("Additional Information", ""),
+        city=f.get("City or Town", ""),
+        state=f.get("State or Province", ""),
+        country=f.get("Country", ""),
+        tectonic_plate=f.get("Tectonic Plate", ""),
+        position_xyz=position_xyz,
+        position_llh=position_llh,
+        additional_information_2=f.get("Additional Information 2", ""),
+    )
+
+
+def get_receiver(i: int, f: dict) -> templates.Receiver:
+    fw, separator, me_fw = f.get("Firmware Version", "").partition(" / ")
+    return templates.Receiver(
+        i=i,
+        receiver_type=f.get("Receiver Type", ""),
+        satellite_system=to_satellite_systems(f.get("Satellite System", "")),
+        serial_number=f.get("Serial Number", ""),
+        receiver_fw_version=fw,
+        me_fw_version=me_fw if separator else None,
+        elevation_cutoff=to_int(f.get("Elevation Cutoff Setting", ""), "deg"),
+        date_installed=to_datetime(f.get("Date Installed", "")),
+        date_removed=to_datetime(f.get("Date Removed", "")),
+        temperature_stabilization=f.get("Temperature Stabiliz.", ""),
+        additional_information=f.get("Additional Information", ""),
+    )
+
+
+def get_antenna(i: int, f: dict) -> templates.Antenna:
+    # "Antenna Type" holds the IGS name and the radome, the name may be padded with spaces
+    radome_type = f.get("Antenna Radome Type", "")
+    antenna_type = f.get("Antenna Type", "")
+    if radome_type and antenna_type.endswith(" " + radome_type):
+        antenna_type = antenna_type[: -len(radome_type) - 1].rstrip()
+
+    return templates.Antenna(
+        i=i,
+        antenna_type=antenna_type,
+        serial_number=f.get("Serial Number", ""),
+        arp=f.get("Antenna Reference Point", ""),
+        delta_h=to_decimal(f.get("Marker->ARP Up Ecc. (m)", "")),
+        delta_n=to_decimal(f.get("Marker->ARP North Ecc(m)", "")),
+        delta_e=to_decimal(f.get("Marker->ARP East Ecc(m)", "")),
+        alignment=to_int(f.get("Alignment from True N", ""), "deg"),
+        radome_type=radome_type,
+        radome_serial_number=f.get("Radome Serial Number", ""),
+        cable_type=f.get("Antenna Cable Type", ""),
+        cable_length=to_decimal(f.get("Antenna Cable Length", ""), "m"),
+        date_installed=to_datetime(f.get("Date Installed", "")),
+        date_removed=to_datetime(f.get("Date Removed", "")),
+        additional_information=f.get("Additional Information", ""),
+    )
+
+
+def get_local_tie(i: int, f: dict) -> templates.LocalTie:
+    return templates.LocalTie(
+        i=i,
+        tied_marker_name=f.get("Tied Marker Name", ""),
+        tied_marker_usage=f.get("Tied Marker Usage", ""),
+        tied_marker_cdp_number=f.get("Tied Marker CDP Number", ""),
+        tied_marker_domes_number=f.get("Tied Marker DOMES Number", ""),
+        dx=to_decimal(f.get("dx (m)", ""), "m"),
+        dy=to_decimal(f.get("dy (m)", ""), "m"),
+        dz=to_decimal(f.get("dz (m)", ""), "m"),
+        accuracy=to_decimal(f.get("Accuracy (mm)", ""), "mm"),
+        survey_method=f.get("Survey method", ""),
+        date_measured=to_datetime(f.get("Date Measured", "")),
+        additional_information=f.get("Additional Information", ""),
+    )
+
+
+def get_frequency_standard(i: int, f: dict) -> templates.FrequencyStandard:
+    return templates.FrequencyStandard(
+        i=i,
+        standard_type=f.get("Standard Type", ""),
+        input_frequency=f.get("Input Frequency", ""),
+        effective_dates=to_dates(f.get("Effective Dates", "")),
+        notes=f.get("Notes", ""),
+    )
+
+
+def get_collocation(i: int, f: dict) -> templates.CollocationInformation:
+    return templates.CollocationInformation(
+        i=i,
+        instrumentation_type=f.get("Instrumentation Type", ""),
+        status=f.get("Status", ""),
+        effective_dates=to_dates(f.get("Effective Dates", "")),
+        notes=f.get("Notes", ""),
+    )
+
+
+def get_humidity_sensor(i: int, f: dict) -> templates.HumiditySensor:
+    return templates.HumiditySensor(
+        i=i,
+        sensor_model=f.get("Humidity Sensor Model", ""),
+        manufacturer=f.get("Manufacturer", ""),
+        serial_number=f.get("Serial Number", ""),
+        data_sampling_interval=to_int(f.get("Data Sampling Interval", ""), "sec"),
+        accuracy=f.get("Accuracy (% rel h)", ""),
+        aspiration=f.get("Aspiration", ""),
+        delta_h=to_decimal(f.get("Height Diff to Ant", ""), "m"),
+        calibration_date=to_date(f.get("Calibration date", "")),
+        effective_dates=to_dates(f.get("Effective Dates", "")),
+        notes=f.get("Notes", ""),
+    )
+
+
+def get_pressure_sensor(i: int, f: dict) -> templates.PressureSensor:
+    return templates.PressureSensor(
+        i=i,
+        sensor_model=f.get("Pressure Sensor Model", ""),
+        manufacturer=f.get("Manufacturer", ""),
+        serial_number=f.get("Serial Number", ""),
+        data_sampling_interval=to_int(f.get("Data Sampling Interval", ""), "sec"),
+        accuracy=f.get("Accuracy", ""),
+        delta_h=to_decimal(f.get("Height Diff to Ant", ""), "m"),
+        calibration_date=to_date(f.get("Calibration date", "")),
+        effective_dates=to_dates(f.get("Effective Dates", "")),
+        notes=f.get("Notes", ""),
+    )
+
+
+def get_temperature_sensor(i: int, f: dict) -> templates.TemperatureSensor:
+    return templates.TemperatureSensor(
+        i=i,
+        sensor_model=f.get("Temp. Sensor Model", ""),
+        manufacturer=f.get("Manufacturer", ""),
+        serial_number=f.get("Serial Number", ""),
+        data_sampling_interval=to_int(f.get("Data Sampling Interval", ""), "sec"),
+        accuracy=f.get("Accuracy", ""),
+        aspiration=f.get("Aspiration", ""),
+        delta_h=to_decimal(f.get("Height Diff to Ant", ""), "m"),
+        calibration_date=to_date(f.get("Calibration date", "")),
+        effective_dates=to_dates(f.get("Effective Dates", "")),
+        notes=f.get("Notes", ""),
+    )
+
+
+def get_water_vapor_radiometer(i: int, f: dict) -> templates.WaterVaporRadiometer:
+    return templates.WaterVaporRadiometer(
+        i=i,
+        sensor_model=f.get("Water Vapor Radiometer", ""),
+        manufacturer=f.get("Manufacturer", ""),
+        serial_number=f.get("Serial Number", ""),
+        distance_to_antenna=to_decimal(f.get("Distance to Antenna", ""), "m"),
+        delta_h=to_decimal(f.get("Height Diff to Ant", ""), "m"),
+        calibration_date=to_date(f.get("Calibration date", "")),
+        effective_dates=to_dates(f.get("Effective Dates", "")),
+        notes=f.get("Notes", ""),
+    )
+
+
+def get_other_instrumentation(
+    i: int, f: dict
+) -> templates.OtherMeteorologicalInstrumentation:
+    return templates.OtherMeteorologicalInstrumentation(
+        i=i, description=f.get("Other Instrumentation", "")
+    )
+
+
+def get_radio_interference(i: int, f: dict) -> templates.RadioInterference:
+    return templates.RadioInterference(
+        i=i,
+        source=f.get("Radio Interferences", ""),
+        observed_degradations=f.get("Observed Degradations", ""),
+        effective_dates=to_dates(f.get("Effective Dates", "")),
+        additional_information=f.get("Additional Information", ""),
+    )
+
+
+def get_multipath_source(i: int, f: dict) -> templates.MultipathSource:
+    return templates.MultipathSource(
+        i=i,
+        source=f.get("Multipath Sources", ""),
+        effective_dates=to_dates(f.get("Effective Dates", "")),
+        additional_information=f.get("Additional Information", ""),
+    )
+
+
+def get_signal_obstruction(i: int, f: dict) -> templates.SignalObstruction:
+    return templates.SignalObstruction(
+        i=i,
+        source=f.get("Signal Obstructions", ""),
+        effective_dates=to_dates(f.get("Effective Dates", "")),
+        additional_information=f.get("Additional Information", ""),
+    )
+
+
+def get_local_episodic_effect(i: int, f: dict) -> templates.LocalEpisodicEffect:
+    return templates.LocalEpisodicEffect(
+        i=i, dates=to_dates(f.get("Date", "")), event=f.get("Event", "")
+    )
+
+
+def get_agency(f: dict) -> templates.Agency:
+    return templates.Agency(
+        agency=f.get("Agency", ""),
+        abbreviation=f.get("Preferred Abbreviation", ""),
+        address=f.get("Mailing Address", ""),
+        contact_name_1=f.get("Primary Contact Name", ""),
+        telephone_primary_1=f.get("Primary Telephone (primary)", ""),
+        telephone_secondary_1=f.get("Primary Telephone (secondary)", ""),
+        fax_1=f.get("Primary Fax", ""),
+        email_1=f.get("Primary E-mail", ""),
+        contact_name_2=f.get("Secondary Contact Name", ""),
+        telephone_primary_2=f.get("Secondary Telephone (primary)", ""),
+        telephone_secondary_2=f.get("Secondary Telephone (secondary)", ""),
+        fax_2=f.get("Secondary Fax", ""),
+        email_2=f.get("Secondary E-mail", ""),
+        additional_information=f.get("Additional Information", ""),
+    )
+
+
+def get_more_information(f: dict) -> templates.MoreInformation:
+    return templates.MoreInformation(
+        primary_data_center=f.get("Primary Data Center", ""),
+        secondary_data_center=f.get("Secondary Data Center", ""),
+        url_more_info=f.get("URL for More Information", ""),
+        site_map=f.get("Site Map", ""),
+        site_diagram=f.get("Site Diagram", ""),
+        horizon_mask=f.get("Horizon Mask", ""),
+        monument_description=f.get("Monument Description", ""),
+        site_pictures=f.get("Site Pictures", ""),
+        additional_information=f.get("Additional Information", ""),
+    )
+
+
+ENTRY_BUILDERS = {
+    "receivers": get_receiver,
+    "antennas": get_antenna,
+    "local_ties": get_local_tie,
+    "frequency_standards": get_frequency_standard,
+    "collocations": get_collocation,
+    "humidity_sensors": get_humidity_sensor,
+    "pressure_sensors": get_pressure_sensor,
+    "temperature_sensors": get_temperature_sensor,
+    "water_vapor_radiometers": get_water_vapor_radiometer,
+    "other_meteorological_instrumentation": get_other_instrumentation,
+    "radio_interferences": get_radio_interference,
+    "multipath_sources": get_multipath_source,
+    "signal_obstructions": get_signal_obstruction,
+    "local_episodic_effects": get_local_episodic_effect,
+}
+
+
+def get_entry_id_length(line: str) -> int:
+    # "3.   GNSS Receiver Information" -> 2, "3.1  Receiver Type ..." -> 3, "8.1.x Humidity ..." -> 5
+    n = 1
+    while n < len(line) and line[n] in ENTRY_ID_CHARACTERS:
+        n += 1
+
+    return n
+
+
+def get_section_hashes(lines) -> dict:
+    # sha256 of every section (1., 2., 11., ...) and numbered entry (3.1, 8.1.1, 10.1, ...);
+    # 0. Form changes with every log, blank x entries never do and the antenna graphics follow from 4.
+    hashes = {}
+    h = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not line:
+            continue
+
+        if line[0].isdigit():
+            entry_id = line[: get_entry_id_length(line)]
+            if entry_id == "0." or entry_id.endswith(".x"):
+                h = None
+            else:
+                h = hashes[entry_id] = hashlib.sha256()
+        elif line.strip() == "Antenna Graphics with Dimensions":
+            break
+
+        if h is not None:
+            h.update(line.encode("UTF-8"))
+
+    return {entry_id: h.hexdigest() for entry_id, h in hashes.items()}
+
+
+def parse_log(lines) -> dict:
+    # one pass over the lines: every line either starts a section or an entry, sets a field,
+    # continues the previous field or is skipped; blank "x" entries and the antenna graphics are ignored
+    site_name = None
+    blocks = {key: {} for key in set(SECTIONS.values())}
+    entries = {key: [] for key in ENTRIES.values()}
+
+    section = None
+    fields = None  # dict the current line is written to, None while skipping
+    label = None
+    contact = None
+
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not line:
+            continue
+
+        if line[0].isdigit():
+            n = get_entry_id_length(line)
+            entry_id = line[:n].rstrip(".")
+            prefix, _, number = entry_id.rpartition(".")
+
+            if line[n - 1] == ".":
+                # section title, e.g. "3.   GNSS Receiver Information"
+                section = entry_id
+                fields = blocks.get(SECTIONS.get(section))
+                contact = None
+                continue
+
+            if number == "x" or prefix not in ENTRIES:
+                fields = None
+                continue
+
+            fields = {}
+            entries[ENTRIES[prefix]].append((int(number), fields))
+            key = line[n:VALUE_COLUMN].strip()
+        elif len(line) > VALUE_COLUMN and line[VALUE_COLUMN] == ":":
+            key = line[:VALUE_COLUMN].strip()
+        else:
+            heading = line.strip()
+            if section is None and "Site Information Form" in heading:
+                site_name = heading.split()[0]
+            elif heading.startswith("Approximate Position ("):
+                blocks["station_info"]["reference_frame"] = heading[22:-1]
+            elif heading in ("Primary Contact", "Secondary Contact"):
+                contact = heading.split()[0]
+            elif heading == "Antenna Graphics with Dimensions":
+                break
+            continue
+
+        if fields is None:
+            continue
+
+        value = line[VALUE_COLUMN + 1 :].strip()
+        if not key:
+            # continuation of a multi-line value
+            if label is not None:
+                fields[label] += "\n" + value
+            continue
+
+        if contact and key in CONTACT_LABELS:
+            key = f"{contact} {key}"
+        elif section == "2" and key == "Additional Information":
+            key = "Additional Information 2"
+
+        label = key
+        fields[label] = value
+
+    log = {
+        "header": templates.Header(site_name=site_name) if site_name else None,
+        "form": get_form(blocks["form"]) if blocks["form"] else None,
+        "station_info": get_site(blocks["station_info"], site_name)
+        if blocks["station_info"]
+        else None,
+    }
+    for key, builder in ENTRY_BUILDERS.items():
+        log[key] = [builder(i, f) for i, f in entries[key]]
+    for key in ("point_of_contact_agency", "responsible_agency"):
+        log[key] = get_agency(blocks[key]) if blocks[key] else None
+    log["more_information"] = (
+        get_more_information(blocks["more_information"])
+        if blocks["more_information"]
+        else None
+    )
+
+    return log
+
+
+def parse_file(file_path: str) -> dict:
+    with open(file_path, "r", encoding="UTF-8", errors="replace") as f:
+        return parse_log(f)
+
+
+def find_log_files(log_dir: str):
+    for name in sorted(os.listdir(log_dir)):
+        if name.lower().endswith(".log"):
+            yield os.path.join(log_dir, name)
+
+
+def parse_directory(log_dir: str, jobs: int = 1, chunksize: int = 64):
+    # (file_path, log) for every .log file in log_dir
+    files = list(find_log_files(log_dir))
+    if jobs == 1:
+        yield from zip(files, map(parse_file, files))
+        return
+
+    # only loaded for parallel parsing; db2log imports this module for the section hashes
+    import concurrent.futures
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from zip(files, executor.map(parse_file, files, chunksize=chunksize))
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+
+    arg_parser.add_argument(
+        "path", help="Site log file or directory of site logs.", type=str
+    )
+
+    arg_parser.add_argument(
+        "-j",
+        "--jobs",
+        help="Number of worker processes for a directory (default: 1).",
+        type=int,
+        default=1,
+    )
+
+    input_arguments = arg_parser.parse_args()
+
+    if not os.path.exists(input_arguments.path):
+        print(f"{input_arguments.path} does not exist.")
+        sys.exit(-1)
+
+    start = time.perf_counter()
+    if os.path.isdir(input_arguments.path):
+        logs = parse_directory(input_arguments.path, input_arguments.jobs)
+    else:
+        logs = [(input_arguments.path, parse_file(input_arguments.path))]
+
+    n = 0
+    for file_path, log in logs:
+        name = log["header"].site_name if log["header"] else "?"
+        print(
+            f"{os.path.basename(file_path)}: {name}, {len(log['receivers'])} receivers, {len(log['antennas'])} antennas"
+        )
+        n += 1
+
+    print(f"{n} site logs parsed in {time.perf_counter() - start:.3f} s.")
@@ -0,0 +1,95 @@
+import argparse
+import os
+import sqlite3
+import typing
+
+if typing.TYPE_CHECKING:
+    import psycopg2.extensions
+
+from signalpy_metapodatkovna_baza import database, queries
+
+
+def copy_relation(
+    db_connection: "psycopg2.extensions.connection",
+    snapshot_connection: sqlite3.Connection,
+    name: str,
+    q: str,
+    batch_size: int = 5000,
+) -> int:
+    # server-side cursor, so large tables are streamed instead of loaded at once
+    cur = db_connection.cursor(
+        name=f"snapshot_{name}"
+    )  # type: psycopg2.extensions.cursor
+    cur.itersize = batch_size
+    cur.execute(q)
+
+    rows = cur.fetchmany(batch_size)
+    columns = ", ".join(
+        f'"{d.name}" {database.SQLITE_TYPES.get(d.type_code, "TEXT")}'
+        for d in cur.description
+    )
+    snapshot_connection.execute(f'CREATE TABLE "{name}" ({columns})')
+
+    insert = f'INSERT INTO "{name}" VALUES ({", ".join("?" * len(cur.description))})'
+    n = 0
+    while rows:
+        snapshot_connection.executemany(insert, rows)
+        n += len(rows)
+        rows = cur.fetchmany(batch_size)
+
+    cur.close()
+
+    return n
+
+
+def make_snapshot(
+    db_connection: "psycopg2.extensions.connection", snapshot_file: str
+) -> None:
+    # build next to the target and rename, so readers never see a half written snapshot
+    tmp_file = snapshot_file + ".tmp"
+    if os.path.exists(tmp_file):
+        os.remove(tmp_file)
+
+    snapshot_connection = sqlite3.connect(tmp_file)
+
+    for table in queries.tables:
+        n = copy_relation(
+            db_connection, snapshot_connection, table, f"SELECT * FROM {table}"
+        )
+        print(f"{table}: {n} rows")
+
+    # crux_export is copied from its defining query, so the snapshot does not depend on the view being refreshed
+    n = copy_relation(
+        db_connection, snapshot_connection, "crux_export", queries.crux_view_select
+    )
+    print(f"crux_export: {n} rows")
+
+    snapshot_connection.commit()
+    snapshot_connection.close()
+    db_connection.rollback()
+
+    os.replace(tmp_file, snapshot_file)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+
+    arg_parser.add_argument(
+        "snapshot_file", help="SQLite file to write (e.g. snapshot.sqlite).", type=str
+    )
+
+    arg_parser.add_argument(
+        "-c",
+        "--config",
+        help="Database connection settings file.",
+        type=str,
+        default="database.ini",
+    )
+
+    input_arguments = arg_parser.parse_args()
+
+    connection = database.connect(input_arguments.config)
+    make_snapshot(connection, input_arguments.snapshot_file)
+    connection.close()
+
+    print(f"Snapshot {input_arguments.snapshot_file} successfully saved.")
@@ -0,0 +1,235 @@
+import argparse
+import datetime
+import os
+import re
+
+from signalpy_metapodatkovna_baza import intervals, profiling, queries, templates
+from signalpy_metapodatkovna_baza.database import connect, execute_query
+
+BERNESE_HEADER = (
+    "STATION INFORMATION FILE FOR BERNESE GNSS SOFTWARE 5.2           {created}\n"
+    "--------------------------------------------------------------------------------\n"
+    "\n"
+    "FORMAT VERSION: 1.01\n"
+    "TECHNIQUE:      GNSS\n"
+    "\n"
+)
+
+BERNESE_TYPE_001 = (
+    "TYPE 001: RENAMING OF STATIONS\n"
+    "------------------------------\n"
+    "\n"
+    "STATION NAME          FLG          FROM                   TO         OLD STATION NAME      REMARK\n"
+    "****************      ***  YYYY MM DD HH MM SS  YYYY MM DD HH MM SS  ********************  ************************\n"
+)
+
+BERNESE_TYPE_002 = (
+    "TYPE 002: STATION INFORMATION\n"
+    "-----------------------------\n"
+    "\n"
+    "STATION NAME          FLG          FROM                   TO         RECEIVER TYPE         RECEIVER SERIAL NBR   REC #   "
+    "ANTENNA TYPE          ANTENNA SERIAL NBR    ANT #    NORTH      EAST      UP      AZIMUTH  LONG NAME  DESCRIPTION             REMARK\n"
+    "****************      ***  YYYY MM DD HH MM SS  YYYY MM DD HH MM SS  ********************  ********************  ******  "
+    "********************  ********************  ******  ***.****  ***.****  ***.****  ****.*  *********  **********************  ************************\n"
+)
+
+# the remaining types are not filled from the database, but Bernese expects them to be present
+BERNESE_OTHER_TYPES = (
+    "TYPE 003: HANDLING OF STATION PROBLEMS\n"
+    "--------------------------------------\n"
+    "\n"
+    "STATION NAME          FLG          FROM                   TO         REMARK\n"
+    "****************      ***  YYYY MM DD HH MM SS  YYYY MM DD HH MM SS  ************************************************************\n"
+    "\n\n"
+    "TYPE 004: STATION COORDINATES AND VELOCITIES (ADDNEQ)\n"
+    "-----------------------------------------------------\n"
+    "                                            RELATIVE CONSTR. POSITION     RELATIVE CONSTR. VELOCITY\n"
+    "STATION NAME 1        STATION NAME 2        NORTH     EAST      UP        NORTH     EAST      UP\n"
+    "****************      ****************      **.*****  **.*****  **.*****  **.*****  **.*****  **.*****\n"
+    "\n\n"
+    "TYPE 005: HANDLING STATION TYPES\n"
+    "--------------------------------\n"
+    "\n"
+    "STATION NAME          FLG  FROM                 TO                   MARKER TYPE           REMARK\n"
+    "****************      ***  YYYY MM DD HH MM SS  YYYY MM DD HH MM SS  ********************  ************************\n"
+)
+
+GAMIT_HEADER = (
+    "* station.info written {created}\n"
+    "*\n"
+    "*SITE  Station Name      Session Start      Session Stop       Ant Ht   HtCod  Ant N    Ant E    "
+    "Receiver Type         Vers                  SwVer  Receiver SN           Antenna Type     Dome   Antenna SN\n"
+)
+
+FORMATS = {
+    "bernese": "SI-CORS.STA",
+    "gamit": "station.info",
+}
+
+
+def bernese_date(date: datetime.datetime) -> str:
+    return date.strftime("%Y %m %d %H %M %S") if date else " " * 19
+
+
+def gamit_date(date: datetime.datetime) -> str:
+    return date.strftime("%Y %j %H %M %S") if date else "9999 999 00 00 00"
+
+
+def serial_digits(serial_number: str) -> int:
+    # Bernese REC #/ANT # are the last six digits of the serial number, 999999 if it has none
+    digits = re.sub(r"\D", "", serial_number or "")
+    return int(digits[-6:]) if digits else 999999
+
+
+def firmware(receiver: templates.Receiver) -> str:
+    return templates.merge_fw_versions(
+        receiver.receiver_fw_version, receiver.me_fw_version
+    )
+
+
+def software_version(receiver: templates.Receiver) -> float:
+    # GAMIT SwVer is the leading number of the firmware version
+    match = re.match(r"\d+(\.\d+)?", receiver.receiver_fw_version or "")
+    return float(match.group()) if match else 0.0
+
+
+def get_station_name(site_qr) -> str:
+    return f"{site_qr.four_char_id} {templates.xstr(site_qr.domes_number)}".strip()
+
+
+def get_description(site_qr) -> str:
+    return ", ".join(s for s in (site_qr.city, site_qr.country_name) if s)
+
+
+def get_bernese_renaming_line(site_qr) -> str:
+    return (
+        f"{get_station_name(site_qr):16.16}      001  {bernese_date(None)}  {bernese_date(None)}  "
+        f"{site_qr.four_char_id + '*':20.20}"
+    ).rstrip() + "\n"
+
+
+def get_bernese_line(site_qr, interval: tuple) -> str:
+    start, end, receiver, antenna = interval
+    antenna_type = (
+        f"{antenna.antenna_type.rstrip():16.16}{antenna.radome_type or 'NONE':4.4}"
+    )
+    return (
+        f"{get_station_name(site_qr):16.16}      001  {bernese_date(start)}  {bernese_date(end)}  "
+        f"{receiver.receiver_type.rstrip():20.20}  {receiver.serial_number:20.20}  "
+        f"{serial_digits(receiver.serial_number):6d}  "
+        f"{antenna_type:20.20}  {antenna.serial_number:20.20}  {serial_digits(antenna.serial_number):6d}  "
+        f"{antenna.delta_n:8.4f}  {antenna.delta_e:8.4f}  {antenna.delta_h:8.4f}  {0.0:6.1f}  "
+        f"{site_qr.nine_char_id:9.9}  {get_description(site_qr):22.22}  {firmware(receiver):24.24}"
+    ).rstrip() + "\n"
+
+
+def get_gamit_line(site_qr, interval: tuple) -> str:
+    start, end, receiver, antenna = interval
+    return (
+        f" {site_qr.four_char_id:4.4}  {templates.xstr(site_qr.city):16.16}  {gamit_date(start)}  {gamit_date(end)}  "
+        f"{antenna.delta_h:7.4f}  DHARP  {antenna.delta_n:7.4f}  {antenna.delta_e:7.4f}  "
+        f"{receiver.receiver_type.rstrip():20.20}  {firmware(receiver):20.20}  "
+        f"{software_version(receiver):5.2f}  {receiver.serial_number:20.20}  "
+        f"{antenna.antenna_type.rstrip():15.15}  {antenna.radome_type or 'NONE':5.5}  "
+        f"{antenna.serial_number:20.20}"
+    ).rstrip() + "\n"
+
+
+def get_station_intervals(index: intervals.EquipmentIndex, sites_qr):
+    # both formats describe receiver and antenna together, intervals missing either are left out
+    for site_qr in sites_qr:
+        yield site_qr, [
+            interval
+            for interval in index.combined(site_qr.nine_char_id.upper())
+            if interval[2] is not None and interval[3] is not None
+        ]
+
+
+def write_bernese_file(file_path: str, index, sites_qr) -> None:
+    created = datetime.datetime.now().strftime("%d-%b-%y %H:%M").upper()
+    with profiling.stage("write", os.path.basename(file_path)):
+        with open(file_path, "w", encoding="ascii", errors="replace") as sta:
+            sta.write(BERNESE_HEADER.format(created=created))
+            sta.write(BERNESE_TYPE_001)
+            for site_qr in sites_qr:
+                sta.write(get_bernese_renaming_line(site_qr))
+            sta.write("\n\n")
+
+            sta.write(BERNESE_TYPE_002)
+            for site_qr, station_intervals in get_station_intervals(index, sites_qr):
+                for interval in station_intervals:
+                    sta.write(get_bernese_line(site_qr, interval))
+            sta.write("\n\n")
+
+            sta.write(BERNESE_OTHER_TYPES)
+            sta.write("\n\n")
+
+
+def write_gamit_file(file_path: str, index, sites_qr) -> None:
+    created = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+    with profiling.stage("write", os.path.basename(file_path)):
+        with open(file_path, "w", encoding="ascii", errors="replace") as info:
+            info.write(GAMIT_HEADER.format(created=created))
+            for site_qr, station_intervals in get_station_intervals(index, sites_qr):
+                for interval in station_intervals:
+                    info.write(get_gamit_line(site_qr, interval))
+
+
+WRITERS = {
+    "bernese": write_bernese_file,
+    "gamit": write_gamit_file,
+}
+
+
+def write_station_info_files(db_connection, formats: list, save_dir: str = "") -> list:
+    # the network history is loaded once (three queries) and shared by every format
+    index = intervals.load_equipment_index(db_connection)
+    sites_qr = execute_query(db_connection, queries.site_id_all, ())
+
+    file_paths = []
+    for name in formats:
+        file_path = os.path.join(save_dir, FORMATS[name])
+        WRITERS[name](file_path, index, sites_qr)
+        file_paths.append(file_path)
+
+    return file_paths
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+
+    arg_parser.add_argument(
+        "formats",
+        help=f"Output formats ({', '.join(FORMATS)}).",
+        nargs="+",
+        choices=list(FORMATS),
+    )
+
+    arg_parser.add_argument(
+        "-o",
+        "--out_dir",
+        help="Saving directory. If not set, files are saved in the script directory.",
+        type=str,
+        default=".",
+    )
+
+    arg_parser.add_argument(
+        "-s",
+        "--snapshot",
+        help="Read station data from a local SQLite snapshot (see snapshot.py) instead of the database.",
+        type=str,
+        default=None,
+    )
+
+    input_arguments = arg_parser.parse_args()
+
+    connection = connect("database.ini", input_arguments.snapshot)
+    file_paths = write_station_info_files(
+        connection,
+        list(dict.fromkeys(input_arguments.formats)),
+        input_arguments.out_dir,
+    )
+    connection.close()
+
+    for file_path in file_paths:
+        print(f"File {os.path.basename(file_path)} successfully saved.")
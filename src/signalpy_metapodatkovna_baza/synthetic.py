@@ -0,0 +1,804 @@
+import argparse
+import datetime
+import decimal
+import math
+import os
+import random
+import sqlite3
+import string
+import sys
+import typing
+
+from signalpy_metapodatkovna_baza import database, db2crux, queries
+from utils import transformations
+
+if typing.TYPE_CHECKING:
+    import psycopg2.extensions
+
+# tables used by queries.py; column types as snapshot.py declares them in sqlite,
+# equipment ids are generated like the database's serial columns, so ingest.py can add rows
+SCHEMA = {
+    "country": ["country_iso3_code TEXT", "country_name TEXT"],
+    "station_information": [
+        "station_id INTEGER",
+        "nine_char_id TEXT",
+        "four_char_id TEXT",
+        "country_iso3_code TEXT",
+        "site_name TEXT",
+        "monument_inscription TEXT",
+        "domes_number TEXT",
+        "cdp_number TEXT",
+        "monument_description TEXT",
+        "monument_height DECIMAL TEXT",
+        "monument_foundation TEXT",
+        "foundation_depth DECIMAL TEXT",
+        "marker_description TEXT",
+        "date_installed TIMESTAMP",
+        "geologic_characteristic TEXT",
+        "bedrock_type TEXT",
+        "bedrock_condition TEXT",
+        "fracture_spacing TEXT",
+        "fault_zones_nearby TEXT",
+        "fault_zones_distance_activity TEXT",
+        "additional_info_1 TEXT",
+        "city TEXT",
+        "state_province TEXT",
+        "tectonic_plate TEXT",
+        "additional_info_2 TEXT",
+    ],
+    "coordinates": [
+        "station_id INTEGER",
+        '"X" DECIMAL TEXT',
+        '"Y" DECIMAL TEXT',
+        '"Z" DECIMAL TEXT',
+        "reference_frame TEXT",
+        "valid_from TIMESTAMP",
+        "valid_to TIMESTAMP",
+    ],
+    "receiver": [
+        "receiver_id INTEGER PRIMARY KEY",
+        "receiver_igs_name TEXT",
+        "serial_number TEXT",
+    ],
+    "receiver_log": [
+        "station_id INTEGER",
+        "receiver_id INTEGER",
+        "gps BOOLEAN",
+        "glo BOOLEAN",
+        "gal BOOLEAN",
+        "bds BOOLEAN",
+        "qzss BOOLEAN",
+        "irnss BOOLEAN",
+        "sbas BOOLEAN",
+        "receiver_fw_version TEXT",
+        "me_fw_version TEXT",
+        "elevation_cutoff INTEGER",
+        "date_installed TIMESTAMP",
+        "date_removed TIMESTAMP",
+        "temperature_stabilization TEXT",
+        "additional_info TEXT",
+    ],
+    "antenna_type": ["antenna_igs_name TEXT", "arp_code TEXT"],
+    "antenna": [
+        "antenna_id INTEGER PRIMARY KEY",
+        "antenna_igs_name TEXT",
+        "serial_number TEXT",
+        "radome_igs_code TEXT",
+        "radome_serial_number TEXT",
+    ],
+    "antenna_log": [
+        "station_id INTEGER",
+        "antenna_id INTEGER",
+        "delta_h DECIMAL TEXT",
+        "delta_n DECIMAL TEXT",
+        "delta_e DECIMAL TEXT",
+        "alignment_from_north INTEGER",
+        "cable_type TEXT",
+        "cable_length INTEGER",
+        "date_installed TIMESTAMP",
+        "date_removed TIMESTAMP",
+        "additional_info TEXT",
+    ],
+    "surveyed_local_ties": [
+        "local_tie_id INTEGER PRIMARY KEY",
+        "marker_name TEXT",
+        "marker_usage TEXT",
+        "marker_cdp_number TEXT",
+        "marker_domes_number TEXT",
+        "dx DECIMAL TEXT",
+        "dy DECIMAL TEXT",
+        "dz DECIMAL TEXT",
+        "accuracy DECIMAL TEXT",
+        "survey_method TEXT",
+        "date_measured TIMESTAMP",
+        "additional_info TEXT",
+    ],
+    "surveyed_local_ties_to_station_information": [
+        "local_tie_id INTEGER",
+        "station_id INTEGER",
+    ],
+    "frequency_standard_log": [
+        "station_id INTEGER",
+        "type TEXT",
+        "input_frequency TEXT",
+        "effective_date_start DATE",
+        "effective_date_end DATE",
+        "notes TEXT",
+    ],
+    "collocation_information": [
+        "collocation_id INTEGER",
+        "instrumentation_type TEXT",
+        "status TEXT",
+        "effective_date_start DATE",
+        "effective_date_end DATE",
+        "notes TEXT",
+    ],
+    "collocation_information_to_station_information": [
+        "collocation_id INTEGER",
+        "station_id INTEGER",
+    ],
+}
+
+for kind in ("humidity", "pressure", "temperature"):
+    SCHEMA[f"{kind}_sensor_type"] = [
+        f"{kind}_sensor_model TEXT",
+        "manufacturer TEXT",
+        "accuracy DECIMAL TEXT",
+    ] + (["aspiration TEXT"] if kind != "pressure" else [])
+    SCHEMA[f"{kind}_sensor"] = [
+        f"{kind}_sensor_id INTEGER PRIMARY KEY",
+        "serial_number TEXT",
+        "model TEXT",
+        "manufacturer TEXT",
+    ]
+    SCHEMA[f"{kind}_sensor_log"] = [
+        "station_id INTEGER",
+        f"{kind}_sensor_id INTEGER",
+        "data_sampling_interval INTEGER",
+        "delta_h DECIMAL TEXT",
+        "calibration_date DATE",
+        "effective_date_start DATE",
+        "effective_date_end DATE",
+        "notes TEXT",
+    ]
+
+SCHEMA.update(
+    {
+        "water_vapor_radiometer_type": [
+            "water_vapor_radiometer_model TEXT",
+            "manufacturer TEXT",
+        ],
+        "water_vapor_radiometer": [
+            "water_vapor_radiometer_id INTEGER PRIMARY KEY",
+            "serial_number TEXT",
+            "model TEXT",
+            "manufacturer TEXT",
+        ],
+        "water_vapor_radiometer_log": [
+            "station_id INTEGER",
+            "water_vapor_radiometer_id INTEGER",
+            "distance_to_antenna DECIMAL TEXT",
+            "delta_h DECIMAL TEXT",
+            "calibration_date DATE",
+            "effective_date_start DATE",
+            "effective_date_end DATE",
+            "notes TEXT",
+        ],
+        "other_meteorological_instrumentation_log": [
+            "instrument_id INTEGER",
+            "station_id INTEGER",
+            "description TEXT",
+        ],
+        "radio_interference_log": [
+            "station_id INTEGER",
+            "radio_interference_source TEXT",
+            "observed_degradations TEXT",
+            "effective_date_start DATE",
+            "effective_date_end DATE",
+            "additional_information TEXT",
+        ],
+        "multipath_source_log": [
+            "station_id INTEGER",
+            "multipath_source TEXT",
+            "effective_date_start DATE",
+            "effective_date_end DATE",
+            "additional_information TEXT",
+        ],
+        "signal_obstruction_log": [
+            "station_id INTEGER",
+            "signal_obstruction_source TEXT",
+            "effective_date_start DATE",
+            "effective_date_end DATE",
+            "additional_information TEXT",
+        ],
+        "local_episodic_effect_log": [
+            "station_id INTEGER",
+            "date_start DATE",
+            "date_end DATE",
+            "event TEXT",
+        ],
+        "point_of_contact_agency_log": [
+            "station_id INTEGER",
+            "point_of_contact_agency_id INTEGER",
+        ],
+        "agency": [
+            "agency_id INTEGER",
+            "name TEXT",
+            "abbreviation TEXT",
+            "mailing_address TEXT",
+            "primary_contact_id INTEGER",
+            "secondary_contact_id INTEGER",
+            "additional_information TEXT",
+        ],
+        "contact": [
+            "contact_id INTEGER",
+            "name TEXT",
+            "telephone_primary TEXT",
+            "telephone_secondary TEXT",
+            "fax TEXT",
+            "email TEXT",
+        ],
+        "more_information_log": [
+            "station_id INTEGER",
+            "primary_data_center TEXT",
+            "secondary_data_center TEXT",
+            "url_more_info TEXT",
+            "site_map TEXT",
+            "site_diagram TEXT",
+            "horizon_mask TEXT",
+            "monument_description TEXT",
+            "site_pictures TEXT",
+            "additional_information TEXT",
+        ],
+    }
+)
+
+POSTGRES_TYPES = {
+    "INTEGER": "integer",
+    "INTEGER PRIMARY KEY": "serial PRIMARY KEY",
+    "TEXT": "text",
+    "BOOLEAN": "boolean",
+    "DATE": "date",
+    "TIMESTAMP": "timestamp",
+    "DECIMAL TEXT": "numeric",
+}
+
+CRUX_EXPORT = [
+    "station_id INTEGER",
+    "country_iso3_code TEXT",
+    "four_char_id TEXT",
+    "domes_number TEXT",
+    '"X" DECIMAL TEXT',
+    '"Y" DECIMAL TEXT',
+    '"Z" DECIMAL TEXT',
+    "agency_abbreviation TEXT",
+    "equipment TEXT",
+    "date_installed TIMESTAMP",
+    "date_removed TIMESTAMP",
+    "serial_number TEXT",
+    "igs_name TEXT",
+    "radome_igs_code TEXT",
+    "receiver_fw_version TEXT",
+    "me_fw_version TEXT",
+    "delta_h DECIMAL TEXT",
+    "delta_n DECIMAL TEXT",
+    "delta_e DECIMAL TEXT",
+]
+
+# sqlite has no LATERAL; the agency lookup becomes a correlated subquery, everything else is the view's query
+_lateral_agency = queries.crux_view_select[
+    queries.crux_view_select.index(
+        "LEFT JOIN LATERAL ("
+    ) : queries.crux_view_select.index("LEFT JOIN (SELECT rl.station_id")
+]
+crux_export_select = queries.crux_view_select.replace(_lateral_agency, "").replace(
+    "ag.abbreviation AS agency_abbreviation",
+    "(SELECT a.abbreviation FROM point_of_contact_agency_log AS poc, agency AS a "
+    "WHERE poc.station_id = si.station_id AND poc.point_of_contact_agency_id=a.agency_id "
+    "LIMIT 1) AS agency_abbreviation",
+)
+
+COUNTRIES = {
+    "SVN": ("Slovenia", 45.4, 46.9, 13.4, 16.6),
+    "HRV": ("Croatia", 42.4, 46.5, 13.5, 19.4),
+    "AUT": ("Austria", 46.4, 49.0, 9.5, 17.2),
+    "HUN": ("Hungary", 45.7, 48.6, 16.1, 22.9),
+    "ITA": ("Italy", 37.0, 46.5, 7.0, 18.5),
+}
+
+RECEIVERS = [
+    "LEICA GR25",
+    "LEICA GR50",
+    "LEICA GR30",
+    "TRIMBLE NETR9",
+    "TRIMBLE ALLOY",
+    "SEPT POLARX5",
+    "SEPT POLARX5TR",
+    "JAVAD TRE_3",
+    "JAVAD TRE_G3TH DELTA",
+    "ASHTECH UZ-12",
+]
+RADOMES = ["NONE", "NONE", "NONE", "LEIT", "SCIS", "SCIT", "TZGD"]
+
+HUMIDITY_SENSORS = [("HMP155", "Vaisala", decimal.Decimal("1.7"), "natural")]
+PRESSURE_SENSORS = [("PTB330", "Vaisala", decimal.Decimal("0.15"))]
+TEMPERATURE_SENSORS = [("HMP155", "Vaisala", decimal.Decimal("0.2"), "natural")]
+WATER_VAPOR_RADIOMETERS = [("WVR-1100", "Radiometrics")]
+
+ADDITIONAL_INFO = (
+    "Some long additional information text that should wrap over more than one line "
+    "in the site log, followed by a second paragraph.\nSecond paragraph."
+)
+
+START = datetime.datetime(1995, 1, 1)
+END = datetime.datetime(2025, 1, 1)
+
+
+def read_quick_reference(gra_file: str) -> list:
+    # (antenna name, ARP code) from the machine-readable section at the end of antenna.gra
+    antennas = []
+    quick_reference = False
+    with open(gra_file, "r", encoding="utf-8") as f:
+        for line in f:
+            if quick_reference and line.strip():
+                name, arp_code = line.split()[:2]
+                antennas.append((name, arp_code))
+            elif "Machine-readable quick reference section begins here." in line:
+                quick_reference = True
+
+    return antennas
+
+
+def get_four_char_id(i: int) -> str:
+    # letter followed by three base-36 digits, unique for up to 26 * 36^3 stations
+    digits = string.digits + string.ascii_uppercase
+    return (
+        string.ascii_uppercase[i // 36**3 % 26]
+        + digits[i // 36**2 % 36]
+        + digits[i // 36 % 36]
+        + digits[i % 36]
+    )
+
+
+def get_nine_char_id(i: int) -> str:
+    country = list(COUNTRIES)[i % len(COUNTRIES)]
+    return f"{get_four_char_id(i)}00{country}"
+
+
+def geodetic2ecef(lat: float, lon: float, h: float) -> tuple:
+    ellipsoid = transformations.GRS80
+    lat, lon = math.radians(lat), math.radians(lon)
+    n = ellipsoid.a / math.sqrt(1 - ellipsoid.ee * math.sin(lat) ** 2)
+    return (
+        (n + h) * math.cos(lat) * math.cos(lon),
+        (n + h) * math.cos(lat) * math.sin(lon),
+        (n * (1 - ellipsoid.ee) + h) * math.sin(lat),
+    )
+
+
+def get_intervals(rng: random.Random, n: int) -> list:
+    # n consecutive install/removal intervals between START and END on whole hours, the last one still open
+    seconds = int((END - START).total_seconds())
+    changes = sorted(rng.sample(range(3600, seconds, 3600), n - 1))
+    dates = [START] + [START + datetime.timedelta(seconds=s) for s in changes]
+
+    return list(zip(dates, dates[1:] + [None]))
+
+
+def generate(stations: int, history: int, antenna_types: list, seed: int = 0):
+    # yields (table, row); ids are dense and start at 1
+    rng = random.Random(seed)
+    d = decimal.Decimal
+
+    for iso3, (name, *_) in COUNTRIES.items():
+        yield "country", (iso3, name)
+
+    for antenna_igs_name, arp_code in antenna_types:
+        yield "antenna_type", (antenna_igs_name, arp_code)
+
+    for kind, sensors in (
+        ("humidity", HUMIDITY_SENSORS),
+        ("pressure", PRESSURE_SENSORS),
+        ("temperature", TEMPERATURE_SENSORS),
+    ):
+        for sensor in sensors:
+            yield f"{kind}_sensor_type", sensor
+    for radiometer in WATER_VAPOR_RADIOMETERS:
+        yield "water_vapor_radiometer_type", radiometer
+
+    agencies = max(1, stations // 50)
+    for agency_id in range(1, agencies + 1):
+        yield "contact", (
+            2 * agency_id - 1,
+            f"Contact {2 * agency_id - 1}",
+            f"+386 1 {agency_id:06d}",
+            None,
+            None,
+            f"contact{2 * agency_id - 1}@agency{agency_id}.example",
+        )
+        yield "contact", (
+            2 * agency_id,
+            f"Contact {2 * agency_id}",
+            f"+386 1 {agency_id:06d}",
+            None,
+            None,
+            f"contact{2 * agency_id}@agency{agency_id}.example",
+        )
+        yield "agency", (
+            agency_id,
+            f"Agency {agency_id}",
+            f"AG{agency_id}",
+            f"Street {agency_id}\nCity",
+            2 * agency_id - 1,
+            2 * agency_id,
+            None,
+        )
+
+    receiver_id = 0
+    antenna_id = 0
+    local_tie_id = 0
+    for i in range(1, stations + 1):
+        nine_char_id = get_nine_char_id(i)
+        four_char_id = nine_char_id[:4]
+        iso3 = nine_char_id[6:]
+        _, lat_min, lat_max, lon_min, lon_max = COUNTRIES[iso3]
+        installed = START + datetime.timedelta(days=rng.randrange(365))
+
+        yield "station_information", (
+            i,
+            nine_char_id,
+            four_char_id,
+            iso3,
+            f"Site {four_char_id}",
+            None,
+            f"{10000 + i % 90000}M{1 + i // 90000:03d}",
+            None,
+            "STEEL MAST",
+            d("1.500"),
+            "CONCRETE BLOCK",
+            d("2.0"),
+            "bolt",
+            installed,
+            "bedrock",
+            "limestone",
+            "fresh",
+            None,
+            "no",
+            None,
+            ADDITIONAL_INFO,
+            f"City {i}",
+            None,
+            "Eurasian",
+            None,
+        )
+
+        x, y, z = geodetic2ecef(
+            rng.uniform(lat_min, lat_max),
+            rng.uniform(lon_min, lon_max),
+            rng.uniform(100, 1500),
+        )
+        yield "coordinates", (
+            i,
+            d(f"{x:.4f}"),
+            d(f"{y:.4f}"),
+            d(f"{z:.4f}"),
+            "IGb14",
+            installed,
+            None,
+        )
+
+        for date_installed, date_removed in get_intervals(rng, history):
+            receiver_id += 1
+            yield "receiver", (
+                receiver_id,
+                rng.choice(RECEIVERS),
+                str(rng.randrange(10**6, 10**7)),
+            )
+            yield "receiver_log", (
+                i,
+                receiver_id,
+                True,
+                True,
+                rng.random() < 0.8,
+                rng.random() < 0.6,
+                False,
+                False,
+                rng.random() < 0.5,
+                f"{rng.randrange(1, 6)}.{rng.randrange(10)}",
+                None,
+                0,
+                date_installed,
+                date_removed,
+                None,
+                None,
+            )
+
+        for date_installed, date_removed in get_intervals(rng, history):
+            antenna_id += 1
+            antenna_igs_name, _ = rng.choice(antenna_types)
+            yield "antenna", (
+                antenna_id,
+                antenna_igs_name,
+                str(rng.randrange(10**5, 10**6)),
+                rng.choice(RADOMES),
+                None,
+            )
+            yield "antenna_log", (
+                i,
+                antenna_id,
+                d(f"{rng.uniform(0, 0.5):.4f}"),
+                d("0.0000"),
+                d("0.0000"),
+                0,
+                "LMR400",
+                rng.randrange(5, 60),
+                date_installed,
+                date_removed,
+                None,
+            )
+
+        for j in range(2):
+            local_tie_id += 1
+            yield "surveyed_local_ties", (
+                local_tie_id,
+                f"{four_char_id}_{j + 1}",
+                "SLR",
+                None,
+                None,
+                d(f"{rng.uniform(-50, 50):.3f}"),
+                d(f"{rng.uniform(-50, 50):.3f}"),
+                d(f"{rng.uniform(-5, 5):.3f}"),
+                d("1.0"),
+                "GPS CAMPAIGN",
+                installed,
+                None,
+            )
+            yield "surveyed_local_ties_to_station_information", (local_tie_id, i)
+
+        yield "frequency_standard_log", (
+            i,
+            "INTERNAL",
+            None,
+            installed.date(),
+            None,
+            None,
+        )
+
+        yield "collocation_information", (
+            i,
+            "SLR",
+            "PERMANENT",
+            installed.date(),
+            None,
+            None,
+        )
+        yield "collocation_information_to_station_information", (i, i)
+
+        for kind, sensors in (
+            ("humidity", HUMIDITY_SENSORS),
+            ("pressure", PRESSURE_SENSORS),
+            ("temperature", TEMPERATURE_SENSORS),
+        ):
+            model, manufacturer = rng.choice(sensors)[:2]
+            yield f"{kind}_sensor", (
+                i,
+                str(rng.randrange(10**5, 10**6)),
+                model,
+                manufacturer,
+            )
+            yield f"{kind}_sensor_log", (
+                i,
+                i,
+                60,
+                d("0.5"),
+                installed.date(),
+                installed.date(),
+                None,
+                None,
+            )
+
+        if i % 10 == 0:
+            model, manufacturer = rng.choice(WATER_VAPOR_RADIOMETERS)
+            yield "water_vapor_radiometer", (
+                i,
+                str(rng.randrange(10**5, 10**6)),
+                model,
+                manufacturer,
+            )
+            yield "water_vapor_radiometer_log", (
+                i,
+                i,
+                d("5.0"),
+                d("0.5"),
+                installed.date(),
+                installed.date(),
+                None,
+                None,
+            )
+
+        yield "other_meteorological_instrumentation_log", (i, i, "Rain gauge")
+        yield "radio_interference_log", (
+            i,
+            "TV transmitter",
+            "SNR",
+            installed.date(),
+            None,
+            None,
+        )
+        yield "multipath_source_log", (i, "metal roof", installed.date(), None, None)
+        yield "signal_obstruction_log", (i, "trees", installed.date(), None, None)
+        yield "local_episodic_effect_log", (
+            i,
+            installed.date(),
+            installed.date(),
+            "construction nearby",
+        )
+        yield "point_of_contact_agency_log", (i, 1 + i % agencies)
+        yield "more_information_log", (i, "GURS", None) + (None,) * 7
+
+
+def write_rows(db_connection, table: str, rows: list) -> None:
+    if isinstance(db_connection, sqlite3.Connection):
+        db_connection.executemany(
+            f'INSERT INTO "{table}" VALUES ({", ".join("?" * len(rows[0]))})', rows
+        )
+    else:
+        cur = db_connection.cursor()  # type: psycopg2.extensions.cursor
+        database.get_psycopg2().extras.execute_values(
+            cur, f'INSERT INTO "{table}" VALUES %s', rows, page_size=1000
+        )
+        cur.close()
+
+
+def create_schema(db_connection) -> None:
+    is_sqlite = isinstance(db_connection, sqlite3.Connection)
+    cur = db_connection.cursor()
+    for table, columns in SCHEMA.items():
+        if not is_sqlite:
+            columns = [
+                f"{c.split(' ', 1)[0]} {POSTGRES_TYPES[c.split(' ', 1)[1]]}"
+                for c in columns
+            ]
+        cur.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({", ".join(columns)})')
+
+        # keys the queries filter and join on; without an index each lookup is a full scan
+        for column in SCHEMA[table]:
+            name = column.split(" ", 1)[0]
+            if name.endswith("_id") or name == "nine_char_id":
+                cur.execute(
+                    f'CREATE INDEX IF NOT EXISTS "{table}_{name}" ON "{table}" ({name})'
+                )
+    cur.close()
+
+
+def has_stations(db_connection: "psycopg2.extensions.connection") -> bool:
+    cur = db_connection.cursor()  # type: psycopg2.extensions.cursor
+    cur.execute("SELECT to_regclass('station_information')")
+    exists = cur.fetchone()[0] is not None
+    if exists:
+        cur.execute("SELECT 1 FROM station_information LIMIT 1")
+        exists = cur.fetchone() is not None
+    cur.close()
+
+    return exists
+
+
+def fill(
+    db_connection,
+    stations: int,
+    history: int = 5,
+    gra_file: str = "antenna.gra",
+    seed: int = 0,
+    batch_size: int = 10000,
+) -> None:
+    create_schema(db_connection)
+
+    batches = {}
+    for table, row in generate(stations, history, read_quick_reference(gra_file), seed):
+        batch = batches.setdefault(table, [])
+        batch.append(row)
+        if len(batch) >= batch_size:
+            write_rows(db_connection, table, batch)
+            batches[table] = []
+
+    for table, batch in batches.items():
+        if batch:
+            write_rows(db_connection, table, batch)
+
+    if isinstance(db_connection, sqlite3.Connection):
+        # stands in for the materialized view, like in a snapshot
+        db_connection.execute(f'CREATE TABLE crux_export ({", ".join(CRUX_EXPORT)})')
+        db_connection.execute(f"INSERT INTO crux_export {crux_export_select}")
+        db_connection.commit()
+    else:
+        # the rows were written with explicit ids, move the sequences past them
+        cur = db_connection.cursor()  # type: psycopg2.extensions.cursor
+        for table, columns in SCHEMA.items():
+            for column in columns:
+                name, column_type = column.split(" ", 1)
+                if column_type == "INTEGER PRIMARY KEY":
+                    cur.execute(
+                        f"SELECT setval(pg_get_serial_sequence('{table}', '{name}'), "
+                        f'COALESCE(MAX({name}), 1)) FROM "{table}"'
+                    )
+        cur.close()
+        db_connection.commit()
+        db2crux.refresh_crux_view(db_connection)
+
+
+def make_snapshot(
+    snapshot_file: str, stations: int, history: int = 5, **kwargs
+) -> None:
+    if os.path.exists(snapshot_file):
+        os.remove(snapshot_file)
+
+    db_connection = sqlite3.connect(snapshot_file)
+    fill(db_connection, stations, history, **kwargs)
+    db_connection.close()
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+
+    arg_parser.add_argument("stations", help="Number of synthetic stations.", type=int)
+
+    arg_parser.add_argument(
+        "-H",
+        "--history",
+        help="Receiver and antenna history entries per station.",
+        type=int,
+        default=5,
+    )
+
+    arg_parser.add_argument(
+        "-s",
+        "--snapshot",
+        help="Write a SQLite snapshot file instead of filling the database.",
+        type=str,
+        default=None,
+    )
+
+    arg_parser.add_argument(
+        "-c",
+        "--config",
+        help="Database connection settings file.",
+        type=str,
+        default="database.ini",
+    )
+
+    arg_parser.add_argument(
+        "-g",
+        "--gra_file",
+        help="antenna.gra whose quick reference section provides antenna names.",
+        type=str,
+        default="antenna.gra",
+    )
+
+    arg_parser.add_argument("--seed", help="Random seed.", type=int, default=0)
+
+    input_arguments = arg_parser.parse_args()
+
+    if input_arguments.snapshot:
+        make_snapshot(
+            input_arguments.snapshot,
+            input_arguments.stations,
+            input_arguments.history,
+            gra_file=input_arguments.gra_file,
+            seed=input_arguments.seed,
+        )
+    else:
+        connection = database.connect(input_arguments.config)
+        if has_stations(connection):
+            print("Table station_information is not empty. Use an empty database.")
+            sys.exit(-1)
+
+        fill(
+            connection,
+            input_arguments.stations,
+            input_arguments.history,
+            gra_file=input_arguments.gra_file,
+            seed=input_arguments.seed,
+        )
+        connection.close()
+
+    print(f"{input_arguments.stations} synthetic stations successfully saved.")
@@ -219,47 +219,82 @@ class Site(object):
                 float(coordinates_qr[0].Y),
                 float(coordinates_qr[0].Z),
                 unit="dms",
-                ellipsoid_name="GRS80",
+                ellipsoid=transformations.GRS80,
             ),
             station_info_qr[0].additional_info_2,
         )
 
+    @classmethod
+    def from_crux_view(cls, crux_row):
+        return cls(
+            None,
+            crux_row.four_char_id,
+            None,
+            crux_row.domes_number,
+            None,
+            None,
+            None,
+            None,
+            None,
+            None,
+            None,
+            None,
+            None,
+            None,
+            None,
+            None,
+            None,
+            None,
+            None,
+            None,
+            None,
+            None,
+            {
+                "X": float(crux_row.X),
+                "Y": float(crux_row.Y),
+                "Z": float(crux_row.Z),
+                "reference_frame": None,
+            },
+            None,
+            None,
+        )
+
     def print_to_log(self):
         return (
-            "{get_title(1)}"
-            "     Site Name                : {xstr(self.site_name)}\n"
-            "     Four Character ID        : {xstr(self.four_char_id)}\n"
-            "     Monument Inscription     : {xstr(self.monument_inscription)}\n"
-            "     IERS DOMES Number        : {xstr(self.domes_number)}\n"
-            "     CDP Number               : {xstr(self.cdp_number)}\n"
-            "     Monument Description     : {xstr(self.monument_description).upper()}\n"
-            "       Height of the Monument : {xstr(add_unit(self.monument_height, 'm'))}\n"
-            "       Monument Foundation    : {xstr(self.monument_foundation).upper()}\n"
-            "       Foundation Depth       : {xstr(add_unit(self.foundation_depth, 'm'))}\n"
-            "     Marker Description       : {xstr(self.marker_description).upper()}\n"
-            "     Date Installed           : {long_date(self.date_installed)}\n"
-            "     Geologic Characteristic  : {xstr(self.geologic_characteristic).upper()}\n"
-            "       Bedrock Type           : {xstr(self.bedrock_type).upper()}\n"
-            "       Bedrock Condition      : {xstr(self.bedrock_condition).upper()}\n"
-            "       Fracture Spacing       : {xstr(self.fracture_spacing)}\n"
-            "       Fault zones nearby     : {xstr(self.fault_zones_nearby).upper()}\n"
-            "         Distance/activity    : {format_multiple_lines(self.distance_activity)}\n"
-            "     Additional Information   : {format_multiple_lines(self.additional_information_1)}\n"
-            "\n\n"
-            "{get_title(2)}"
-            "     City or Town             : {xstr(self.city)}\n"
-            "     State or Province        : {xstr(self.state)}\n"
-            "     Country                  : {xstr(self.country)}\n"
-            "     Tectonic Plate           : {xstr(self.tectonic_plate).upper()}\n"
-            "     Approximate Position ({self.position_XYZ['reference_frame']})\n"
-            "       X coordinate (m)       : {self.position_XYZ['X']:.4f}\n"
-            "       Y coordinate (m)       : {self.position_XYZ['Y']:.4f}\n"
-            "       Z coordinate (m)       : {self.position_XYZ['Z']:.4f}\n"
-            "       Latitude (N is +)      : {self.position_llh['lat'][0]:+03d}{self.position_llh['lat'][1]:02d}{self.position_llh['lat'][2]:09.6f}\n"
-            "       Longitude (E is +)     : {self.position_llh['lon'][0]:+04d}{self.position_llh['lon'][1]:02d}{self.position_llh['lon'][2]:09.6f}\n"
-            "       Elevation (m,ellips.)  : {self.position_llh['h']:10.4f}\n"
-            "     Additional Information   : {format_multiple_lines(self.additional_information_2)}\n"
-            "\n\n"
+            f"{get_title(1)}"
+            f"     Site Name                : {xstr(self.site_name)}\n"
+            f"     Four Character ID        : {xstr(self.four_char_id)}\n"
+            f"     Monument Inscription     : {xstr(self.monument_inscription)}\n"
+            f"     IERS DOMES Number        : {xstr(self.domes_number)}\n"
+            f"     CDP Number               : {xstr(self.cdp_number)}\n"
+            f"     Monument Description     : {xstr(self.monument_description).upper()}\n"
+            f"       Height of the Monument : {xstr(add_unit(self.monument_height, 'm'))}\n"
+            f"       Monument Foundation    : {xstr(self.monument_foundation).upper()}\n"
+            f"       Foundation Depth       : {xstr(add_unit(self.foundation_depth, 'm'))}\n"
+            f"     Marker Description       : {xstr(self.marker_description).upper()}\n"
+            f"     Date Installed           : {long_date(self.date_installed)}\n"
+            f"     Geologic Characteristic  : {xstr(self.geologic_characteristic).upper()}\n"
+            f"       Bedrock Type           : {xstr(self.bedrock_type).upper()}\n"
+            f"       Bedrock Condition      : {xstr(self.bedrock_condition).upper()}\n"
+            f"       Fracture Spacing       : {xstr(self.fracture_spacing)}\n"
+            f"       Fault zones nearby     : {xstr(self.fault_zones_nearby).upper()}\n"
+            f"         Distance/activity    : {format_multiple_lines(self.distance_activity)}\n"
+            f"     Additional Information   : {format_multiple_lines(self.additional_information_1)}\n"
+            f"\n\n"
+            f"{get_title(2)}"
+            f"     City or Town             : {xstr(self.city)}\n"
+            f"     State or Province        : {xstr(self.state)}\n"
+            f"     Country                  : {xstr(self.country)}\n"
+            f"     Tectonic Plate           : {xstr(self.tectonic_plate).upper()}\n"
+            f"     Approximate Position ({self.position_XYZ['reference_frame']})\n"
+            f"       X coordinate (m)       : {self.position_XYZ['X']:.4f}\n"
+            f"       Y coordinate (m)       : {self.position_XYZ['Y']:.4f}\n"
+            f"       Z coordinate (m)       : {self.position_XYZ['Z']:.4f}\n"
+            f"       Latitude (N is +)      : {self.position_llh['lat'][0]:+03d}{self.position_llh['lat'][1]:02d}{self.position_llh['lat'][2]:09.6f}\n"
+            f"       Longitude (E is +)     : {self.position_llh['lon'][0]:+04d}{self.position_llh['lon'][1]:02d}{self.position_llh['lon'][2]:09.6f}\n"
+            f"       Elevation (m,ellips.)  : {self.position_llh['h']:10.4f}\n"
+            f"     Additional Information   : {format_multiple_lines(self.additional_information_2)}\n"
+            f"\n\n"
         )
 
     def print_to_crux(self):
@@ -325,6 +360,24 @@ class Receiver(object):
             receiver_qr.additional_info,
         )
 
+    @classmethod
+    def from_crux_view(cls, crux_row, i=1):
+        return cls(
+            i,
+            crux_row.igs_name,
+            None,
+            crux_row.serial_number if "unknown" not in crux_row.serial_number else "",
+            crux_row.receiver_fw_version
+            if "unknown" not in crux_row.receiver_fw_version
+            else "",
+            crux_row.me_fw_version,
+            None,
+            crux_row.date_installed,
+            crux_row.date_removed,
+            None,
+            None,
+        )
+
     def print_to_log(self):
         return (
             f"3.{self.i:<3d}Receiver Type            : {self.receiver_type.rstrip()}\n"
@@ -424,6 +477,26 @@ class Antenna(object):
             antenna_qr.additional_info,
         )
 
+    @classmethod
+    def from_crux_view(cls, crux_row, i=1):
+        return cls(
+            i,
+            crux_row.igs_name,
+            crux_row.serial_number if "unknown" not in crux_row.serial_number else "",
+            None,
+            crux_row.delta_h,
+            crux_row.delta_n,
+            crux_row.delta_e,
+            None,
+            crux_row.radome_igs_code,
+            None,
+            None,
+            None,
+            crux_row.date_installed,
+            crux_row.date_removed,
+            None,
+        )
+
     def print_to_log(self):
         return (
             f"4.{self.i:<3d}Antenna Type             : {self.antenna_type} {self.radome_type}\n"
@@ -1193,6 +1266,25 @@ class Agency(object):
             agency_qr[0].additional_information if agency_qr else "",
         )
 
+    @classmethod
+    def from_crux_view(cls, crux_row):
+        return cls(
+            "",
+            xstr(crux_row.agency_abbreviation),
+            "",
+            "",
+            "",
+            "",
+            "",
+            "",
+            "",
+            "",
+            "",
+            "",
+            "",
+            "",
+        )
+
     def print_to_log(self):
         return (
             f"     Agency                   : {xstr(self.agency)}\n"
@@ -0,0 +1,77 @@
+import os
+
+import pytest
+
+from signalpy_metapodatkovna_baza import atomic
+
+
+def write_old(file_path) -> None:
+    file_path.write_text("old")
+    os.utime(file_path, ns=(0, 0))
+
+
+@pytest.mark.parametrize(
+    "overwrite, text, written, content",
+    [
+        ("always", "old", True, "old"),
+        ("always", "new", True, "new"),
+        ("never", "new", False, "old"),
+        ("if-changed", "old", False, "old"),
+        ("if-changed", "new", True, "new"),
+    ],
+)
+def test_write_file(tmp_path, overwrite, text, written, content):
+    file_path = tmp_path / "A.log"
+    write_old(file_path)
+
+    assert atomic.write_file(str(file_path), text, overwrite) == written
+    assert file_path.read_text() == content
+    # a file that is kept is not touched
+    assert (file_path.stat().st_mtime_ns != 0) == written
+    assert os.listdir(tmp_path) == ["A.log"]
+
+
+@pytest.mark.parametrize("overwrite", atomic.OVERWRITE)
+def test_write_new_file(tmp_path, overwrite):
+    file_path = tmp_path / "A.log"
+
+    assert atomic.write_file(str(file_path), "čšž", overwrite)
+    assert file_path.read_text(encoding="UTF-8") == "čšž"
+
+
+def test_keep_existing(tmp_path):
+    file_path = tmp_path / "A.log"
+    assert not atomic.keep_existing(str(file_path), "never")
+
+    write_old(file_path)
+    assert atomic.keep_existing(str(file_path), "never")
+    # if-changed has to render the file to compare it
+    assert not atomic.keep_existing(str(file_path), "if-changed")
+    assert not atomic.keep_existing(str(file_path), "always")
+
+
+@pytest.mark.parametrize("content", [b"old", b"new"])
+def test_writer_if_changed(tmp_path, content):
+    file_path = tmp_path / "A.log"
+    write_old(file_path)
+
+    writer = atomic.AtomicWriter(str(file_path), "if-changed")
+    with writer as f:
+        f.write(content)
+
+    assert writer.written == (content != b"old")
+    assert file_path.read_bytes() == content
+    assert os.listdir(tmp_path) == ["A.log"]
+
+
+def test_writer_discards_on_error(tmp_path):
+    file_path = tmp_path / "A.log"
+    write_old(file_path)
+
+    with pytest.raises(RuntimeError):
+        with atomic.AtomicWriter(str(file_path)) as f:
+            f.write(b"partial")
+            raise RuntimeError()
+
+    assert file_path.read_text() == "old"
+    assert os.listdir(tmp_path) == ["A.log"]
@@ -0,0 +1,216 @@
+import json
+import os
+import re
+import threading
+import time
+
+import pytest
+
+# a database.ini of a PostgreSQL database the tests may write to; they only create and drop their own schema
+DATABASE_INI = os.environ.get("SIGNALPY_TEST_DATABASE")
+if not DATABASE_INI:
+    pytest.skip(
+        "SIGNALPY_TEST_DATABASE (database.ini of a test database) not set",
+        allow_module_level=True,
+    )
+
+psycopg2 = pytest.importorskip("psycopg2")
+
+from signalpy_metapodatkovna_baza import (  # noqa: E402
+    atomic,
+    daemon,
+    database,
+    manifest,
+    synthetic,
+)
+
+GRA_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "antenna.gra"
+)
+SCHEMA = "signalpy_test_daemon"
+
+
+def connect():
+    return psycopg2.connect(
+        **database.get_connection_settings(DATABASE_INI),
+        options=f"-c search_path={SCHEMA}",
+    )
+
+
+@pytest.fixture(scope="module")
+def db():
+    admin = psycopg2.connect(**database.get_connection_settings(DATABASE_INI))
+    admin.autocommit = True
+    admin.cursor().execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    admin.cursor().execute(f"CREATE SCHEMA {SCHEMA}")
+
+    db_connection = connect()
+    # a failed fill must not leave the schema locked for the next run
+    try:
+        synthetic.fill(db_connection, stations=4, history=2, gra_file=GRA_FILE)
+        daemon.install_triggers(db_connection)
+
+        yield db_connection
+    finally:
+        db_connection.close()
+        admin.cursor().execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+        admin.close()
+
+
+@pytest.fixture
+def listen_connection(db):
+    listen_connection = daemon.listen(DATABASE_INI)
+    yield listen_connection
+    listen_connection.close()
+
+
+@pytest.fixture
+def regenerator(db, tmp_path):
+    regenerator = daemon.Regenerator(
+        db, save_dir=str(tmp_path), crux_dir=str(tmp_path), gra_file=GRA_FILE
+    )
+    regenerator.load_crux_blocks()
+
+    # station ids whose log and crux block were regenerated, one list per regenerate() call
+    regenerator.calls = []
+    regenerate = regenerator.regenerate
+    regenerate_log = regenerator.regenerate_log
+    update_crux_block = regenerator.update_crux_block
+
+    def record_regenerate(station_ids):
+        regenerator.calls.append({"logs": [], "crux_blocks": []})
+        regenerate(station_ids)
+
+    def record_log(station_id, log_manifest):
+        regenerator.calls[-1]["logs"].append(station_id)
+        return regenerate_log(station_id, log_manifest)
+
+    def record_crux_block(station_id):
+        regenerator.calls[-1]["crux_blocks"].append(station_id)
+        update_crux_block(station_id)
+
+    regenerator.regenerate = record_regenerate
+    regenerator.regenerate_log = record_log
+    regenerator.update_crux_block = record_crux_block
+
+    return regenerator
+
+
+def station_ids(db_connection) -> list:
+    cur = db_connection.cursor()
+    cur.execute("SELECT station_id FROM station_information ORDER BY station_id")
+    ids = [row[0] for row in cur.fetchall()]
+    cur.close()
+    db_connection.rollback()
+
+    return ids
+
+
+def change_receiver(db_connection, station_id: int, firmware: str) -> None:
+    # one receiver_log row of the station, in its own transaction
+    cur = db_connection.cursor()
+    cur.execute(
+        "UPDATE receiver_log SET receiver_fw_version = %s WHERE ctid = "
+        "(SELECT ctid FROM receiver_log WHERE station_id = %s LIMIT 1)",
+        (firmware, station_id),
+    )
+    cur.close()
+    db_connection.commit()
+
+
+def test_triggers_installed(db):
+    cur = db.cursor()
+    cur.execute(
+        "SELECT DISTINCT event_object_table FROM information_schema.triggers "
+        "WHERE trigger_name = 'signalpy_notify' AND trigger_schema = %s",
+        (SCHEMA,),
+    )
+    tables = {row[0] for row in cur.fetchall()}
+    cur.close()
+    db.rollback()
+
+    assert tables == set(daemon.TRIGGER_SOURCES)
+
+
+def test_receiver_change_regenerates_only_that_station(
+    db, listen_connection, regenerator, tmp_path
+):
+    station_id, *other_ids = station_ids(db)
+    crux_blocks = dict(regenerator.crux_blocks)
+
+    change_receiver(db, station_id, "9.99/TEST")
+    changed = daemon.wait_for_changes(
+        listen_connection, debounce=0.2, max_delay=5.0, timeout=5.0
+    )
+    assert changed == {station_id}
+
+    regenerator.regenerate(changed)
+
+    assert regenerator.calls == [{"logs": [station_id], "crux_blocks": [station_id]}]
+    assert "9.99/TEST" in regenerator.crux_blocks[station_id][1]
+    assert "9.99/TEST" not in crux_blocks[station_id][1]
+    for other_id in other_ids:
+        assert regenerator.crux_blocks[other_id] == crux_blocks[other_id]
+
+    logs = [f for f in os.listdir(tmp_path) if f.endswith(".log")]
+    assert len(logs) == 1
+    with open(os.path.join(tmp_path, logs[0]), encoding="UTF-8") as f:
+        assert "9.99/TEST" in f.read()
+    with open(os.path.join(tmp_path, "SI-CORS.crux"), encoding="UTF-8") as f:
+        assert "9.99/TEST" in f.read()
+
+
+def test_burst_is_debounced(db, listen_connection, regenerator):
+    ids = station_ids(db)[:2]
+
+    # separate transactions, each within the debounce interval of the previous one
+    def burst():
+        writer = connect()
+        for i in range(6):
+            change_receiver(writer, ids[i % 2], f"BURST {i}")
+            time.sleep(0.1)
+        writer.close()
+
+    thread = threading.Thread(target=burst)
+    thread.start()
+    changed = daemon.wait_for_changes(
+        listen_connection, debounce=0.5, max_delay=10.0, timeout=5.0
+    )
+    thread.join()
+
+    assert changed == set(ids)
+
+    regenerator.regenerate(changed)
+
+    assert regenerator.calls == [{"logs": sorted(ids), "crux_blocks": sorted(ids)}]
+    assert "BURST 5" in regenerator.crux_blocks[ids[1]][1]
+    # nothing of the burst is left for another regeneration
+    assert (
+        daemon.wait_for_changes(listen_connection, debounce=0.2, timeout=1.0) == set()
+    )
+
+
+def test_regenerated_log_is_diffed_and_in_manifest(db, regenerator, tmp_path):
+    station_id = station_ids(db)[0]
+    regenerator.regenerate({station_id})
+    (log_file,) = [f for f in os.listdir(tmp_path) if f.endswith(".log")]
+    nine_char_id = log_file.split("_")[0]
+    # yesterday's log, as the daemon wrote it before today's change
+    previous_log = f"{nine_char_id}_20000101.log"
+    os.rename(os.path.join(tmp_path, log_file), os.path.join(tmp_path, previous_log))
+
+    change_receiver(db, station_id, "9.98/TEST")
+    regenerator.regenerate({station_id})
+
+    with open(os.path.join(tmp_path, log_file), encoding="UTF-8") as f:
+        text = f.read()
+    assert f"Previous Site Log       : {previous_log}\n" in text
+    # only the changed receiver entry
+    assert re.search(r"Modified/Added Sections : 3\.\d+\n", text)
+    assert "vnesi rocno" not in text
+    with open(os.path.join(tmp_path, manifest.MANIFEST_FILE_NAME)) as f:
+        files = json.load(f)["files"]
+    assert files[log_file]["station"] == nine_char_id
+    assert files[log_file]["sha256"] == atomic.get_file_hash(
+        os.path.join(tmp_path, log_file)
+    )
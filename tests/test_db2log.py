@@ -0,0 +1,161 @@
+import datetime
+import json
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+from signalpy_metapodatkovna_baza import (
+    database,
+    db2log,
+    manifest,
+    sitelog,
+    synthetic,
+    templates,
+)
+
+GRA_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "antenna.gra"
+)
+
+STATION = synthetic.get_nine_char_id(1)
+DAY_1 = datetime.datetime(2000, 1, 1, 12)
+DAY_2 = datetime.datetime(2000, 1, 2, 12)
+
+
+@pytest.fixture
+def snapshot_file(tmp_path, monkeypatch):
+    snapshot_file = str(tmp_path / "synthetic.sqlite")
+    synthetic.make_snapshot(snapshot_file, stations=1, history=2, gra_file=GRA_FILE)
+
+    # site logs read antenna.gra from the working directory
+    shutil.copy(GRA_FILE, tmp_path / "antenna.gra")
+    monkeypatch.chdir(tmp_path)
+
+    return snapshot_file
+
+
+def update_receiver(snapshot_file: str) -> None:
+    db_connection = sqlite3.connect(snapshot_file)
+    db_connection.execute(
+        "UPDATE receiver_log SET receiver_fw_version = '9.99/TEST' "
+        "WHERE rowid = (SELECT min(rowid) FROM receiver_log)"
+    )
+    db_connection.commit()
+    db_connection.close()
+
+
+def write_log(snapshot_file: str, save_dir: str, date_prepared: datetime.datetime):
+    # like make_log_file, on the given day
+    db_connection = database.connect(snapshot_file=snapshot_file)
+    data = db2log.get_station_data(db_connection, STATION)
+    db_connection.close()
+
+    form = db2log.get_form()
+    form.date_prepared = date_prepared
+    log_manifest = manifest.Manifest(save_dir)
+    file_path = db2log.write_log_file(
+        STATION,
+        data,
+        templates.Header(site_name=STATION),
+        form,
+        save_dir,
+        overwrite="if-changed",
+        log_manifest=log_manifest,
+    )
+    if file_path:
+        log_manifest.add(file_path, manifest.get_source_fingerprint(data))
+        log_manifest.write()
+
+    return file_path
+
+
+def read_form(file_path: str) -> templates.Form:
+    with open(file_path, encoding="UTF-8") as f:
+        return sitelog.parse_log(f)["form"]
+
+
+def test_modified_sections():
+    previous = {"1.": "a", "3.1": "b", "3.2": "c", "4.1": "d"}
+    hashes = {"1.": "a", "3.1": "x", "3.2": "c", "3.3": "e"}
+
+    assert db2log.get_modified_sections(previous, hashes) == ["3.1", "3.3", "4.1"]
+    assert db2log.get_modified_sections(hashes, hashes) == []
+
+
+def test_unchanged_station_is_not_rendered_next_day(
+    tmp_path, snapshot_file, monkeypatch
+):
+    save_dir = str(tmp_path / "out")
+    day_1_log = write_log(snapshot_file, save_dir, DAY_1)
+    assert os.path.basename(day_1_log) == f"{STATION}_20000101.log"
+
+    # the manifest fingerprint matches, so the log is not even rendered
+    def render_log(*args, **kwargs):
+        raise AssertionError("unchanged log rendered")
+
+    monkeypatch.setattr(db2log, "render_log", render_log)
+
+    assert write_log(snapshot_file, save_dir, DAY_2) == day_1_log
+    assert sorted(os.listdir(save_dir)) == [
+        os.path.basename(day_1_log),
+        manifest.MANIFEST_FILE_NAME,
+    ]
+
+
+def test_unchanged_station_without_manifest_is_not_written(tmp_path, snapshot_file):
+    save_dir = str(tmp_path / "out")
+    day_1_log = write_log(snapshot_file, save_dir, DAY_1)
+    # e.g. logs copied from elsewhere; the section hashes still match
+    os.remove(os.path.join(save_dir, manifest.MANIFEST_FILE_NAME))
+
+    assert write_log(snapshot_file, save_dir, DAY_2) == day_1_log
+    assert not os.path.exists(os.path.join(save_dir, f"{STATION}_20000102.log"))
+
+
+def test_changed_station_fills_form(tmp_path, snapshot_file):
+    save_dir = str(tmp_path / "out")
+    day_1_log = write_log(snapshot_file, save_dir, DAY_1)
+    day_1_text = open(day_1_log, encoding="UTF-8").read()
+    update_receiver(snapshot_file)
+
+    day_2_log = write_log(snapshot_file, save_dir, DAY_2)
+
+    assert os.path.basename(day_2_log) == f"{STATION}_20000102.log"
+    # the previous log is left as it was
+    assert open(day_1_log, encoding="UTF-8").read() == day_1_text
+    form = read_form(day_2_log)
+    assert form.previous_site_log == os.path.basename(day_1_log)
+    assert form.modified_added_sections == ", ".join(
+        db2log.get_modified_sections(
+            db2log.read_section_hashes(day_1_log),
+            db2log.read_section_hashes(day_2_log),
+        )
+    )
+    assert form.modified_added_sections.startswith("3.")
+    assert "," not in form.modified_added_sections
+
+    with open(os.path.join(save_dir, manifest.MANIFEST_FILE_NAME)) as f:
+        files = json.load(f)["files"]
+    assert sorted(files) == sorted(os.path.basename(p) for p in (day_1_log, day_2_log))
+    assert files[os.path.basename(day_1_log)]["fingerprint"] != (
+        files[os.path.basename(day_2_log)]["fingerprint"]
+    )
+
+
+def test_edited_log_is_compared_again(tmp_path, snapshot_file):
+    save_dir = str(tmp_path / "out")
+    day_1_log = write_log(snapshot_file, save_dir, DAY_1)
+    # edited by hand after it was written, so the manifest no longer describes it
+    with open(day_1_log, encoding="UTF-8") as f:
+        lines = f.readlines()
+    i = next(i for i, line in enumerate(lines) if "Firmware Version" in line)
+    lines[i] = lines[i].rstrip("\n") + " (edited)\n"
+    with open(day_1_log, "w", encoding="UTF-8") as f:
+        f.writelines(lines)
+
+    day_2_log = write_log(snapshot_file, save_dir, DAY_2)
+
+    assert os.path.basename(day_2_log) == f"{STATION}_20000102.log"
+    assert read_form(day_2_log).modified_added_sections == "3.1"
@@ -0,0 +1,64 @@
+import os
+import shutil
+import sqlite3
+import tarfile
+
+import pytest
+
+from signalpy_metapodatkovna_baza import database, export, synthetic
+
+GRA_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "antenna.gra"
+)
+
+
+@pytest.fixture
+def snapshot_file(tmp_path, monkeypatch):
+    snapshot_file = str(tmp_path / "synthetic.sqlite")
+    synthetic.make_snapshot(snapshot_file, stations=3, history=2, gra_file=GRA_FILE)
+
+    # site logs read antenna.gra from the working directory
+    shutil.copy(GRA_FILE, tmp_path / "antenna.gra")
+    monkeypatch.chdir(tmp_path)
+
+    return snapshot_file
+
+
+def run_export(snapshot_file: str, sinks: list) -> None:
+    db_connection = database.connect(snapshot_file=snapshot_file)
+    export.export(db_connection, sinks)
+    db_connection.close()
+
+
+def test_archive_entries_match_logs(tmp_path, snapshot_file):
+    out_dir = tmp_path / "out"
+    run_export(snapshot_file, [export.LogSink(str(out_dir))])
+    # yesterday's logs, so today's are diffed against them
+    for name in os.listdir(out_dir):
+        if name.endswith(".log"):
+            os.rename(out_dir / name, out_dir / f"{name.split('_')[0]}_20000101.log")
+
+    db_connection = sqlite3.connect(snapshot_file)
+    db_connection.execute(
+        "UPDATE receiver_log SET receiver_fw_version = '9.99/TEST' "
+        "WHERE rowid = (SELECT min(rowid) FROM receiver_log)"
+    )
+    db_connection.commit()
+    db_connection.close()
+
+    run_export(
+        snapshot_file,
+        [export.LogSink(str(out_dir)), export.ArchiveSink(str(out_dir))],
+    )
+
+    with tarfile.open(out_dir / "SI-CORS_logs.tar.gz") as tar:
+        entries = {m.name: tar.extractfile(m).read() for m in tar.getmembers()}
+    assert len(entries) == 3
+    # only the changed station gets a new log, and its archive entry is the same file
+    (written,) = [name for name in entries if os.path.exists(out_dir / name)]
+    assert b"9.99/TEST" in entries[written]
+    assert (out_dir / written).read_bytes() == entries[written]
+    for name, content in entries.items():
+        previous_log = f"{name.split('_')[0]}_20000101.log"
+        assert f"Previous Site Log       : {previous_log}\n" in content.decode()
+        assert "vnesi rocno" not in content.decode()
@@ -0,0 +1,81 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+# rendering one station from a snapshot must not load any of these
+HEAVY_MODULES = (
+    "psycopg2",
+    "urllib.request",
+    "concurrent.futures",
+    "cProfile",
+    "tarfile",
+    "zstandard",
+    "paramiko",
+    "pyarrow",
+)
+
+# cumulative import time budget of a log/crux entry point, in microseconds
+IMPORT_BUDGET = 100_000
+
+
+def import_times(module: str) -> dict:
+    # imported module -> cumulative import time in microseconds, from python -X importtime
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, (SRC, env.get("PYTHONPATH"))))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+
+    return times
+
+
+def test_cli_loads_no_command_modules():
+    times = import_times("signalpy_metapodatkovna_baza.cli")
+
+    assert [
+        m
+        for m in times
+        if m.startswith("signalpy_metapodatkovna_baza.")
+        and m != "signalpy_metapodatkovna_baza.cli"
+    ] == []
+
+
+@pytest.mark.parametrize("module", ["db2log", "db2crux"])
+def test_no_heavy_modules(module):
+    times = import_times(f"signalpy_metapodatkovna_baza.{module}")
+
+    assert [m for m in HEAVY_MODULES if m in times] == []
+
+
+@pytest.mark.parametrize("module", ["db2log", "db2crux"])
+def test_import_time(module):
+    module = f"signalpy_metapodatkovna_baza.{module}"
+    # best of three, so a busy machine does not fail the test
+    best = min(import_times(module)[module] for _ in range(3))
+
+    assert best < IMPORT_BUDGET
+
+
+@pytest.mark.parametrize("module", ["daemon", "server", "ingest", "snapshot", "export"])
+def test_psycopg2_loaded_on_first_connection(module):
+    # database.get_psycopg2() loads it when a connection is made, not on import
+    times = import_times(f"signalpy_metapodatkovna_baza.{module}")
+
+    assert f"signalpy_metapodatkovna_baza.{module}" in times
+    assert "psycopg2" not in times
@@ -0,0 +1,91 @@
+import datetime
+import os
+
+import pytest
+
+# a database.ini of a PostgreSQL database the tests may write to; they only create and drop their own schema
+DATABASE_INI = os.environ.get("SIGNALPY_TEST_DATABASE")
+if not DATABASE_INI:
+    pytest.skip(
+        "SIGNALPY_TEST_DATABASE (database.ini of a test database) not set",
+        allow_module_level=True,
+    )
+
+psycopg2 = pytest.importorskip("psycopg2")
+
+from signalpy_metapodatkovna_baza import (  # noqa: E402
+    database,
+    db2log,
+    ingest,
+    sitelog,
+    synthetic,
+    templates,
+)
+
+GRA_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "antenna.gra"
+)
+SCHEMA = "signalpy_test_ingest"
+
+
+@pytest.fixture
+def db():
+    admin = psycopg2.connect(**database.get_connection_settings(DATABASE_INI))
+    admin.autocommit = True
+    admin.cursor().execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    admin.cursor().execute(f"CREATE SCHEMA {SCHEMA}")
+
+    db_connection = psycopg2.connect(
+        **database.get_connection_settings(DATABASE_INI),
+        options=f"-c search_path={SCHEMA}",
+    )
+    # a failed fill must not leave the schema locked for the next test
+    try:
+        synthetic.fill(db_connection, stations=1, history=2, gra_file=GRA_FILE)
+
+        yield db_connection
+    finally:
+        db_connection.close()
+        admin.cursor().execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+        admin.close()
+
+
+def get_firmware(db_connection) -> list:
+    cur = db_connection.cursor()
+    cur.execute("SELECT receiver_fw_version FROM receiver_log ORDER BY date_installed")
+    firmware = [row[0] for row in cur.fetchall()]
+    cur.close()
+    db_connection.rollback()
+
+    return firmware
+
+
+def write_log(db_connection, file_path, date_prepared, firmware: str) -> None:
+    # the station's log as of date_prepared, with every receiver on the given firmware
+    nine_char_id = synthetic.get_nine_char_id(1)
+    data = db2log.get_station_data(db_connection, nine_char_id)
+    for r in data["receivers"]:
+        r.receiver_fw_version, r.me_fw_version = firmware, None
+    form = db2log.get_form()
+    form.date_prepared = date_prepared
+    db_connection.rollback()
+
+    with open(file_path, "w", encoding="UTF-8") as f:
+        f.write(
+            db2log.get_log_text(
+                templates.Header(site_name=nine_char_id), form, data, GRA_FILE
+            )
+        )
+
+
+@pytest.mark.parametrize("newer_name", ["a.log", "b.log"])
+def test_newest_log_of_station_wins(db, tmp_path, newer_name):
+    older_name = "b.log" if newer_name == "a.log" else "a.log"
+    write_log(db, tmp_path / newer_name, datetime.datetime(2024, 6, 1), "NEW")
+    write_log(db, tmp_path / older_name, datetime.datetime(2020, 1, 1), "OLD")
+
+    counts = ingest.ingest(db, sitelog.parse_directory(str(tmp_path)))
+
+    assert counts["logs"] == 1
+    assert counts["older_logs"] == [str(tmp_path / older_name)]
+    assert set(get_firmware(db)) == {"NEW"}
@@ -0,0 +1,169 @@
+import datetime
+import random
+import types
+
+import pytest
+
+from signalpy_metapodatkovna_baza import intervals
+
+
+def d(year: int, month: int = 1, day: int = 1) -> datetime.datetime:
+    return datetime.datetime(year, month, day)
+
+
+def entry(name: str, installed, removed=None):
+    return types.SimpleNamespace(
+        name=name, date_installed=installed, date_removed=removed
+    )
+
+
+def names(entries) -> list:
+    return [e.name for e in entries]
+
+
+def at(history: intervals.StationHistory, epoch):
+    e = history.at(epoch)
+    return e.name if e else None
+
+
+@pytest.fixture
+def disjoint():
+    return intervals.StationHistory(
+        [
+            entry("a", d(2010), d(2012)),
+            entry("b", d(2012), d(2015)),
+            entry("c", d(2016)),
+        ]
+    )
+
+
+def test_disjoint_history_is_bisected(disjoint):
+    assert disjoint.disjoint
+
+
+@pytest.mark.parametrize(
+    "epoch, name",
+    [
+        (d(2009), None),
+        (d(2010), "a"),
+        # removal and installation on the same epoch: the new entry
+        (d(2012), "b"),
+        (d(2014, 12, 31), "b"),
+        # removed, nothing installed yet
+        (d(2015), None),
+        (d(2016), "c"),
+        # the open end
+        (d(2100), "c"),
+    ],
+)
+def test_at_boundaries(disjoint, epoch, name):
+    assert at(disjoint, epoch) == name
+
+
+def test_between_boundaries(disjoint):
+    assert names(disjoint.between(d(2012), d(2016))) == ["b"]
+    assert names(disjoint.between(d(2011), d(2012, 1, 2))) == ["a", "b"]
+    assert names(disjoint.between(d(2015), d(2015, 6, 1))) == []
+    assert names(disjoint.between(d(2000), d(2100))) == ["a", "b", "c"]
+
+
+def test_removed_after_next_installation():
+    # a removal date after the next installation, as written in real site logs
+    history = intervals.StationHistory(
+        [entry("a", d(2010), d(2012, 2, 1)), entry("b", d(2012), d(2015))]
+    )
+
+    assert not history.disjoint
+    assert at(history, d(2011)) == "a"
+    # both installed: the most recent one
+    assert at(history, d(2012, 1, 15)) == "b"
+    assert at(history, d(2013)) == "b"
+    assert names(history.between(d(2012, 1, 15), d(2012, 1, 16))) == ["a", "b"]
+    assert names(history.between(d(2012, 3, 1), d(2013))) == ["b"]
+
+
+def test_open_entry_in_the_middle():
+    # the removal date of a was never filled in
+    history = intervals.StationHistory(
+        [
+            entry("a", d(2010)),
+            entry("b", d(2012), d(2015)),
+            entry("c", d(2015)),
+        ]
+    )
+
+    assert not history.disjoint
+    assert at(history, d(2011)) == "a"
+    assert at(history, d(2013)) == "b"
+    assert at(history, d(2015)) == "c"
+    assert at(history, d(2009)) is None
+
+
+def test_entries_are_sorted_by_installation():
+    history = intervals.StationHistory(
+        [entry("b", d(2012), d(2015)), entry("a", d(2010), d(2012))]
+    )
+
+    assert history.disjoint
+    assert names(history.entries) == ["a", "b"]
+    assert at(history, d(2011)) == "a"
+
+
+def test_merge_overlapping_histories():
+    receivers = intervals.StationHistory(
+        [entry("r1", d(2010), d(2012, 2, 1)), entry("r2", d(2012))]
+    )
+    antennas = intervals.StationHistory([entry("a1", d(2011))])
+
+    merged = [
+        (start, end, r and r.name, a and a.name)
+        for start, end, r, a in intervals.merge_histories(receivers, antennas)
+    ]
+
+    assert merged == [
+        (d(2010), d(2011), "r1", None),
+        (d(2011), d(2012), "r1", "a1"),
+        (d(2012), d(2012, 2, 1), "r2", "a1"),
+        (d(2012, 2, 1), None, "r2", "a1"),
+    ]
+
+
+def random_history(rng: random.Random, n: int) -> list:
+    # disjoint intervals with gaps, shared boundaries and an open last entry
+    entries = []
+    t = d(2000)
+    for i in range(n):
+        t += datetime.timedelta(days=rng.choice([0, 10, 100]))
+        removed = t + datetime.timedelta(days=rng.randint(1, 400))
+        entries.append(entry(str(i), t, None if i == n - 1 else removed))
+        t = removed
+
+    return entries
+
+
+def test_bisect_and_scan_agree():
+    rng = random.Random(0)
+    for _ in range(50):
+        receivers = intervals.StationHistory(random_history(rng, rng.randint(1, 8)))
+        antennas = intervals.StationHistory(random_history(rng, rng.randint(1, 8)))
+        scan_receivers = intervals.StationHistory(receivers.entries)
+        scan_receivers.disjoint = False
+        scan_antennas = intervals.StationHistory(antennas.entries)
+        scan_antennas.disjoint = False
+
+        epochs = (
+            receivers.starts
+            + receivers.ends[:-1]
+            + [
+                d(2000) + datetime.timedelta(days=rng.randint(-10, 5000))
+                for _ in range(20)
+            ]
+        )
+        for epoch in epochs:
+            assert receivers.at(epoch) is scan_receivers.at(epoch)
+            end = epoch + datetime.timedelta(days=rng.randint(1, 300))
+            assert receivers.between(epoch, end) == scan_receivers.between(epoch, end)
+
+        assert intervals.merge_histories(
+            receivers, antennas
+        ) == intervals.merge_histories(scan_receivers, scan_antennas)
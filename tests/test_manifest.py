@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+from signalpy_metapodatkovna_baza import atomic, manifest
+
+
+@pytest.fixture
+def hashed(monkeypatch):
+    # names of the files hashed by Manifest.add
+    hashed = []
+    get_file_hash = atomic.get_file_hash
+
+    def record(file_path):
+        hashed.append(os.path.basename(file_path))
+        return get_file_hash(file_path)
+
+    monkeypatch.setattr(atomic, "get_file_hash", record)
+    return hashed
+
+
+def write_manifest(save_dir, names, fingerprint="f") -> None:
+    output_manifest = manifest.Manifest(str(save_dir))
+    for name in names:
+        output_manifest.add(str(save_dir / name), fingerprint)
+    output_manifest.write()
+
+
+def test_unchanged_files_are_not_hashed_again(tmp_path, hashed):
+    (tmp_path / "A.log").write_text("a")
+    (tmp_path / "B.log").write_text("b")
+    write_manifest(tmp_path, ["A.log", "B.log"])
+    assert sorted(hashed) == ["A.log", "B.log"]
+    previous = manifest.read_manifest(str(tmp_path / manifest.MANIFEST_FILE_NAME))
+
+    # same size, other mtime
+    (tmp_path / "B.log").write_text("c")
+    os.utime(tmp_path / "B.log", ns=(0, 0))
+    hashed.clear()
+    write_manifest(tmp_path, ["A.log", "B.log"])
+
+    assert hashed == ["B.log"]
+    files = manifest.read_manifest(str(tmp_path / manifest.MANIFEST_FILE_NAME))
+    assert files["A.log"] == previous["A.log"]
+    assert files["B.log"]["sha256"] == atomic.get_file_hash(str(tmp_path / "B.log"))
+    assert files["B.log"]["mtime_ns"] == 0
+
+
+def test_added_twice_in_one_run(tmp_path, hashed):
+    (tmp_path / "A.log").write_text("a")
+    output_manifest = manifest.Manifest(str(tmp_path))
+    output_manifest.add(str(tmp_path / "A.log"), "f")
+    output_manifest.add(str(tmp_path / "A.log"), "g")
+
+    assert hashed == ["A.log"]
+    assert output_manifest.files["A.log"]["fingerprint"] == "g"
+
+
+def test_write_keeps_other_entries(tmp_path):
+    for name in ("A.log", "B.log", "C.log"):
+        (tmp_path / name).write_text(name)
+    write_manifest(tmp_path, ["A.log", "B.log"])
+    os.remove(tmp_path / "B.log")
+
+    write_manifest(tmp_path, ["C.log"])
+
+    files = manifest.read_manifest(str(tmp_path / manifest.MANIFEST_FILE_NAME))
+    assert sorted(files) == ["A.log", "C.log"]
+
+
+def test_is_current(tmp_path):
+    (tmp_path / "A.log").write_text("a")
+    write_manifest(tmp_path, ["A.log"], fingerprint="f")
+    output_manifest = manifest.Manifest(str(tmp_path))
+
+    assert output_manifest.is_current(str(tmp_path / "A.log"), "f")
+    assert not output_manifest.is_current(str(tmp_path / "A.log"), "g")
+
+    os.utime(tmp_path / "A.log", ns=(0, 0))
+    assert not output_manifest.is_current(str(tmp_path / "A.log"), "f")
+
+
+def test_source_fingerprint():
+    data = {"b": [1, 2], "a": {"y": None, "x": 1.5}}
+
+    assert manifest.get_source_fingerprint(data) == manifest.get_source_fingerprint(
+        {"a": {"x": 1.5, "y": None}, "b": [1, 2]}
+    )
+    assert manifest.get_source_fingerprint(data) != manifest.get_source_fingerprint(
+        {"b": [2, 1], "a": {"y": None, "x": 1.5}}
+    )
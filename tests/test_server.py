@@ -0,0 +1,191 @@
+import os
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+pytest.importorskip("psycopg2")
+
+from signalpy_metapodatkovna_baza import (  # noqa: E402
+    database,
+    db2crux,
+    queries,
+    server,
+    synthetic,
+)
+
+# a database.ini of a PostgreSQL database the tests may write to; they only create and drop their own schema
+DATABASE_INI = os.environ.get("SIGNALPY_TEST_DATABASE")
+GRA_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "antenna.gra"
+)
+SCHEMA = "signalpy_test_server"
+
+ETAG = '"0123abcd"'
+
+
+@pytest.mark.parametrize(
+    "if_none_match",
+    [ETAG, f"W/{ETAG}", f'"other", {ETAG}', f'"other" ,W/{ETAG} ', "*", " * "],
+)
+def test_etag_matches(if_none_match):
+    assert server.etag_matches(if_none_match, ETAG)
+
+
+@pytest.mark.parametrize(
+    "if_none_match",
+    ["", '"other"', '"0123abcd0"', '"x0123abcd"', ETAG[1:-1], f'"0123abcd-{ETAG}"'],
+)
+def test_etag_does_not_match(if_none_match):
+    assert not server.etag_matches(if_none_match, ETAG)
+
+
+def test_cache_invalidates_station_and_network_entries():
+    cache = server.RenderCache()
+    generation = cache.get_generation()
+    cache.put("log 1", 1, "station 1", generation)
+    cache.put("log 2", 2, "station 2", generation)
+    cache.put("crux", None, "network", generation)
+
+    cache.invalidate(1)
+
+    assert cache.get("log 1") is None
+    assert cache.get("crux") is None
+    assert cache.get("log 2")[2] == b"station 2"
+
+
+def test_cache_does_not_keep_entries_invalidated_while_rendered():
+    cache = server.RenderCache()
+    generation = cache.get_generation()
+    # station 1 changes while its data is read
+    cache.invalidate(1)
+
+    # served once, but not cached
+    assert cache.put("log 1", 1, "old", generation)[2] == b"old"
+    assert cache.get("log 1") is None
+    cache.put("log 2", 2, "station 2", generation)
+    assert cache.get("log 2") is not None
+    cache.put("crux", None, "network", generation)
+    assert cache.get("crux") is None
+
+    generation = cache.get_generation()
+    cache.put("log 1", 1, "new", generation)
+    assert cache.get("log 1")[2] == b"new"
+
+
+def test_cache_clear_makes_all_pending_entries_stale():
+    cache = server.RenderCache()
+    generation = cache.get_generation()
+    cache.put("log 1", 1, "station 1", generation)
+    cache.clear()
+
+    assert cache.get("log 1") is None
+    cache.put("log 2", 2, "station 2", generation)
+    assert cache.get("log 2") is None
+
+
+def test_cache_evicts_least_recently_used():
+    cache = server.RenderCache(max_entries=2)
+    generation = cache.get_generation()
+    cache.put("a", 1, "a", generation)
+    cache.put("b", 2, "b", generation)
+    cache.get("a")
+    cache.put("c", 3, "c", generation)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def test_etag_is_content_hash():
+    cache = server.RenderCache()
+    _, etag, _ = cache.put("a", 1, "text", cache.get_generation())
+    _, same_etag, _ = cache.put("b", 2, "text", cache.get_generation())
+    _, other_etag, _ = cache.put("c", 3, "other", cache.get_generation())
+
+    assert etag == same_etag != other_etag
+    assert etag.startswith('"') and etag.endswith('"')
+
+
+@pytest.fixture
+def crux_server(monkeypatch):
+    if not DATABASE_INI:
+        pytest.skip("SIGNALPY_TEST_DATABASE (database.ini of a test database) not set")
+    psycopg2 = pytest.importorskip("psycopg2")
+
+    admin = psycopg2.connect(**database.get_connection_settings(DATABASE_INI))
+    admin.autocommit = True
+    admin.cursor().execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    admin.cursor().execute(f"CREATE SCHEMA {SCHEMA}")
+    # the server's pooled connections only take the settings of database.ini
+    monkeypatch.setenv("PGOPTIONS", f"-c search_path={SCHEMA}")
+
+    db_connection = psycopg2.connect(**database.get_connection_settings(DATABASE_INI))
+    httpd = None
+    try:
+        synthetic.fill(db_connection, stations=3, history=2, gra_file=GRA_FILE)
+
+        httpd = server.SiteLogServer(
+            ("127.0.0.1", 0), config_file=DATABASE_INI, gra_file=GRA_FILE
+        )
+        httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}"
+        httpd.db_connection = db_connection
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+        yield httpd
+    finally:
+        if httpd is not None:
+            httpd.shutdown()
+            httpd.pool.closeall()
+        db_connection.close()
+        admin.cursor().execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+        admin.close()
+
+
+def get(url: str, **headers):
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, headers=headers)) as r:
+            return r.status, r.headers["ETag"], r.read().decode("UTF-8")
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers["ETag"], None
+
+
+def get_live_crux(db_connection) -> str:
+    # the crux file from the tables, station by station
+    text = db2crux.get_crux_header() + "".join(
+        db2crux.get_crux_block(data)
+        for station in database.execute_query(db_connection, queries.station_list, ())
+        if (data := db2crux.get_station_data(db_connection, station.station_id))
+    )
+    db_connection.rollback()
+
+    return text
+
+
+def test_crux_is_read_from_refreshed_view(crux_server):
+    db_connection = crux_server.db_connection
+    status, etag, text = get(crux_server.url + "/crux")
+    assert status == 200
+    assert text == get_live_crux(db_connection)
+
+    assert get(crux_server.url + "/crux", **{"If-None-Match": etag})[0] == 304
+    assert (
+        get(crux_server.url + "/crux", **{"If-None-Match": f'"x{etag[1:]}'})[0] == 200
+    )
+
+    cur = db_connection.cursor()
+    cur.execute(
+        "UPDATE receiver_log SET receiver_fw_version = '9.99/TEST' "
+        "WHERE ctid = (SELECT ctid FROM receiver_log LIMIT 1) RETURNING station_id"
+    )
+    (station_id,) = cur.fetchone()
+    cur.close()
+    db_connection.commit()
+    crux_server.cache.invalidate(station_id)
+
+    status, new_etag, text = get(crux_server.url + "/crux", **{"If-None-Match": etag})
+    assert status == 200
+    assert new_etag != etag
+    assert "9.99/TEST" in text
+    assert text == get_live_crux(db_connection)
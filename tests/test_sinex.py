@@ -0,0 +1,54 @@
+import datetime
+import random
+
+import pytest
+
+from signalpy_metapodatkovna_baza import sinex
+
+
+def parse_angle(text: str) -> float:
+    # back to degrees; the sign is on the degrees, also when they are -0
+    d, m, s = text.split()
+    value = abs(int(d)) + int(m) / 60 + float(s) / 3600
+    return -value if d.startswith("-") else value
+
+
+@pytest.mark.parametrize(
+    "degrees, text",
+    [
+        (0, "  0  0  0.0"),
+        (45.5, " 45 30  0.0"),
+        (-45.5, "-45 30  0.0"),
+        (-0.5, " -0 30  0.0"),
+        (-0.0125, " -0  0 45.0"),
+        (46.0476, " 46  2 51.4"),
+        (359.5, "359 30  0.0"),
+        # rounded in tenths of a second, so 60.0" is carried into the minutes and degrees
+        (14.9999999, " 15  0  0.0"),
+        (-14.9999999, "-15  0  0.0"),
+    ],
+)
+def test_sinex_angle(degrees, text):
+    assert sinex.sinex_angle(degrees) == text
+
+
+def test_sinex_angle_round_trip():
+    rng = random.Random(0)
+    for _ in range(1000):
+        degrees = rng.uniform(-90, 360)
+        text = sinex.sinex_angle(degrees)
+
+        assert len(text) == 11
+        assert abs(parse_angle(text) - degrees) <= 0.05 / 3600 + 1e-9
+
+
+@pytest.mark.parametrize(
+    "date, text",
+    [
+        (None, "00:000:00000"),
+        (datetime.datetime(2021, 2, 1, 1, 0, 5), "21:032:03605"),
+        (datetime.datetime(2000, 12, 31, 23, 59, 59), "00:366:86399"),
+    ],
+)
+def test_sinex_date(date, text):
+    assert sinex.sinex_date(date) == text
@@ -0,0 +1,116 @@
+import os
+
+import pytest
+
+from signalpy_metapodatkovna_baza import database, db2log, sitelog, synthetic, templates
+
+GRA_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "antenna.gra"
+)
+
+STATIONS = 3
+
+
+@pytest.fixture(scope="module")
+def logs(tmp_path_factory):
+    # (data, text) of every station of a synthetic snapshot, rendered like db2log writes them
+    snapshot_file = str(tmp_path_factory.mktemp("snapshot") / "synthetic.sqlite")
+    synthetic.make_snapshot(
+        snapshot_file, stations=STATIONS, history=3, gra_file=GRA_FILE
+    )
+
+    db_connection = database.connect(snapshot_file=snapshot_file)
+    logs = []
+    for i in range(1, STATIONS + 1):
+        nine_char_id = synthetic.get_nine_char_id(i)
+        data = db2log.get_station_data(db_connection, nine_char_id)
+        header = templates.Header(site_name=nine_char_id)
+        text = db2log.get_log_text(header, db2log.get_form("tester"), data, GRA_FILE)
+        logs.append((data, text))
+    db_connection.close()
+
+    return logs
+
+
+def test_round_trip(logs):
+    for data, text in logs:
+        log = sitelog.parse_log(text.splitlines(keepends=True))
+
+        assert db2log.get_log_text(log["header"], log["form"], log, GRA_FILE) == text
+
+
+def test_parsed_fields(logs):
+    for data, text in logs:
+        log = sitelog.parse_log(text.splitlines())
+
+        assert log["header"].site_name == data["nine_char_id"]
+        assert log["form"].prepared_by == "tester"
+        assert log["station_info"].four_char_id == data["station_info"].four_char_id
+        for key in sitelog.ENTRY_BUILDERS:
+            if key == "other_meteorological_instrumentation":
+                # get_log_text writes only the blank 8.5.x entry
+                assert log[key] == []
+                continue
+            assert len(log[key]) == len(data[key]), key
+        for parsed, receiver in zip(log["receivers"], data["receivers"]):
+            assert parsed.receiver_type == receiver.receiver_type.rstrip()
+            assert parsed.date_installed == receiver.date_installed
+            assert parsed.date_removed == receiver.date_removed
+        for parsed, antenna in zip(log["antennas"], data["antennas"]):
+            # antenna names are padded to 20 characters in the log
+            assert parsed.antenna_type == antenna.antenna_type.rstrip()
+
+
+def test_blank_entries_and_continuation_lines():
+    lines = [
+        "     ABCD00SVN Site Information Form (site log)\n",
+        "\n",
+        "3.   GNSS Receiver Information\n",
+        "\n",
+        "3.1  Receiver Type            : TRIMBLE NETR9\n",
+        "     Serial Number            : 1234\n",
+        "     Additional Information   : first line\n",
+        "                              : second line\n",
+        "\n",
+        "3.x  Receiver Type            : (A20, from rcvr_ant.tab; see instructions)\n",
+        "     Serial Number            : (A20, but note the first A5 is used in SINEX)\n",
+        "\n",
+        "4.   GNSS Antenna Information\n",
+        "\n",
+        "Antenna Graphics with Dimensions\n",
+        "3.2  Receiver Type            : NOT PARSED\n",
+    ]
+
+    log = sitelog.parse_log(lines)
+
+    assert log["header"].site_name == "ABCD00SVN"
+    (receiver,) = log["receivers"]
+    assert receiver.receiver_type == "TRIMBLE NETR9"
+    assert receiver.serial_number == "1234"
+    assert receiver.additional_information == "first line\nsecond line"
+    assert log["antennas"] == []
+
+
+def test_section_hashes(logs):
+    data, text = logs[0]
+    lines = text.splitlines()
+    hashes = sitelog.get_section_hashes(lines)
+
+    assert "0." not in hashes
+    assert not [entry_id for entry_id in hashes if entry_id.endswith(".x")]
+    assert "3.1" in hashes and "4.1" in hashes
+
+    # the form, blank entries and antenna graphics do not change the hashes
+    edited = [
+        line + " edited"
+        if line.startswith(("0.", "3.x", "     Date Prepared"))
+        else line
+        for line in lines
+    ] + ["extra antenna graphics"]
+    assert sitelog.get_section_hashes(edited) == hashes
+
+    # one changed entry changes only its own hash
+    i = next(i for i, line in enumerate(lines) if line.startswith("3.1"))
+    edited = lines[:i] + [lines[i] + " edited"] + lines[i + 1 :]
+    changed = sitelog.get_section_hashes(edited)
+    assert [s for s in hashes if changed[s] != hashes[s]] == ["3.1"]